@@ -1,6 +1,9 @@
 #!/usr/bin/env python
+from array import array
 from collections import defaultdict
-from math import comb, prod
+from collections.abc import MutableMapping
+from math import comb, prod, factorial
+from operator import add, sub, mul
 import random
 
 from itertools import permutations
@@ -8,107 +11,428 @@ from itertools import permutations
 from game_theory_utils.util.convertutil import (tuple_from_dict, list_from_dict, get_type_count, insert_zeros)
 from game_theory_utils.util.iterutil import (powerset, froze_remove_one, sequence_from_types,
                                              distinct_permutations, sequence_counts)
+from game_theory_utils.util.maskutil import (mask_from_players, players_from_mask, mask_bits, submasks,
+                                             table_typecode, widen_table, subset_sums, mobius_transform)
+from game_theory_utils.util.bitsetutil import BitsetTable, pack_bits, swing_bits
+from game_theory_utils.coalitions.sampling import SamplingTarget, estimate_shapley_values
+from game_theory_utils.coalitions.core import mask_core_target, least_core, find_core_payoffs, nucleolus
+from game_theory_utils.coalitions.weighted_voting import VotingValuation
+from game_theory_utils.coalitions.typed_coalition import TypedCoalitionalGame
+from game_theory_utils.coalitions.power_indices import mask_power_indices
+from game_theory_utils.coalitions.owen import owen_values, union_indexes
+from game_theory_utils.coalitions.semivalue import semivalue_weights, mask_marginal_sums, semivalues_from_sums
+from game_theory_utils.coalitions.symmetry import find_symmetry_classes, reduce_symmetric_players, expand_type_values
+
+__all__ = ('CoalitionalGame', 'create_voting_game', 'create_game_from_table', 'create_game_from_valuation',
+           'create_game_from_dividends', 'shapley_from_dividends')
+
+class CoalitionValuesView(MutableMapping):
+    """Dictionary style view of the value table of a CoalitionalGame. Keys are frozensets of players.
+       Every coalition of the game's players has a value, so items can be changed but not added or deleted.
+       Changes go through CoalitionalGame.set_coalition_value."""
+
+    def __init__(self, game):
+        self.game = game
+
+    def __getitem__(self, key):
+        return self.game.table[self.game.get_mask(key)]
+
+    def __setitem__(self, key, val):
+        self.game.set_coalition_value(key, val)
+
+    def __delitem__(self, key):
+        raise TypeError('coalition values can not be deleted')
+
+    def __iter__(self):
+        for mask in range(len(self.game.table)):
+            yield players_from_mask(mask, self.game.player_order)
+
+    def __len__(self):
+        return len(self.game.table)
+
+    def __contains__(self, key):
+        try:
+            self.game.get_mask(key)
+        except KeyError:
+            return False
+        return True
 
-__all__ = ('CoalitionalGame', 'create_voting_game')
 
 class CoalitionalGame:
     """A coalitional game is defined as a set of players and a function giving the value of each subset of
       members, called a coalition.
+      Internally each player is assigned a bit position (player_bits) and the values are stored in a flat
+      array (table) indexed by the integer mask of the coalition. coalition_values gives a view of the
+      table keyed by frozensets of players.
     """
 
     def __init__(self, coalition_values, isCost=False):
         self.players = set()
-        self.coalition_values = {} # key = frozenset players, val = coalition value
+        self.player_order = [] # player at each bit position
         self.isCost = isCost
         self.verbose = False
+        self.shapley_totals = None # accumulators kept up to date by set_coalition_value once enabled
+        self.swing_counts = None
 
         for key in coalition_values:
             for elm in key:
-                self.players.add(elm)
-            self.coalition_values[frozenset(key)] = coalition_values[key]
-        self.fill_coalition_values()
-
-        
-    def fill_coalition_values(self):
-        """If self.coalition_values dict is mssing values, fill them in by assigning the highest value
-           of any subset that has a value."""
-        for elm in powerset(self.players):
-            elm = frozenset(elm)
-            if elm not in self.coalition_values:
-                if not elm:
-                    self.coalition_values[elm] = 0 # empty coalition has zero value
-                    continue
+                if elm not in self.players:
+                    self.players.add(elm)
+                    self.player_order.append(elm)
+        self.player_bits = {player:ii for ii, player in enumerate(self.player_order)}
+        typecode = table_typecode(coalition_values.values())
+        self.table = array(typecode, [0]) * (1 << len(self.player_order))
+        known = bytearray(len(self.table))
+        for key in coalition_values:
+            mask = self.get_mask(key)
+            self.table[mask] = coalition_values[key]
+            known[mask] = 1
+        self.fill_coalition_values(known)
+
+    @property
+    def coalition_values(self):
+        """View of the coalition values as a dict keyed by frozenset of players."""
+        return CoalitionValuesView(self)
+
+    def _set_table(self, player_order, table):
+        """Replace the players and value table."""
+        self.player_order = list(player_order)
+        self.players = set(self.player_order)
+        self.player_bits = {player:ii for ii, player in enumerate(self.player_order)}
+        self.table = table
+
+    def get_mask(self, coalition):
+        """Get the integer mask for an iterable of players."""
+        return mask_from_players(coalition, self.player_bits)
+
+    def get_coalition(self, mask):
+        """Get the frozenset of players for an integer mask."""
+        return players_from_mask(mask, self.player_order)
+
+    def _read_table(self):
+        """The table for loops that read it a value at a time. A BitsetTable is unpacked to a byte per
+           coalition, since each item read from it is a python call; the copy does not follow later changes."""
+        return self.table.unpack() if isinstance(self.table, BitsetTable) else self.table
+
+    def set_coalition_value(self, coalition, val):
+        """Change the value of a coalition given as an iterable of players. If incremental analysis is on
+           the shapley and banzhaf accumulators are updated for the change."""
+        self._set_mask_value(self.get_mask(coalition), val)
+
+    def _set_mask_value(self, mask, val):
+        old = self.table[mask]
+        self.table = widen_table(self.table, val)
+        if self.shapley_totals is not None:
+            self._update_accumulators(mask, old, val)
+        self.table[mask] = val
+
+    def enable_incremental(self):
+        """Calculate and keep the unnormalized shapley totals and banzhaf swing counts of each player, so that
+           after set_coalition_value changes a few values get_shapley_values and get_banzhaf_values do not
+           have to visit every coalition again. Values written straight to the table are not seen."""
+        self.shapley_totals = self._shapley_totals()
+        self.swing_counts = self._swing_counts()
+
+    def disable_incremental(self):
+        self.shapley_totals = None
+        self.swing_counts = None
+
+    def _update_accumulators(self, mask, old, new):
+        """Apply the change of the value of mask from old to new to the accumulators. The value of S only
+           appears in the marginal contributions of its members joining S less themselves, weighted by
+           (|S|-1)!(n-|S|)!, and of the other players joining S, weighted by |S|!(n-|S|-1)!; and a swing can
+           only start or stop for the same pairs. That is O(n) rather than a pass over every coalition."""
+        table = self.table
+        nplayers = len(self.player_order)
+        size = mask.bit_count()
+        delta = new - old
+        for ii in range(nplayers):
+            bit = 1 << ii
+            if mask & bit:
+                self.shapley_totals[ii] += factorial(size - 1) * factorial(nplayers - size) * delta
+                if not table[mask ^ bit]:
+                    self.swing_counts[ii] += bool(new) - bool(old)
+            else:
+                self.shapley_totals[ii] -= factorial(size) * factorial(nplayers - size - 1) * delta
+                if table[mask | bit]:
+                    self.swing_counts[ii] += (not new) - (not old)
+
+    def fill_coalition_values(self, known=None):
+        """If the value table is mssing values, fill them in by assigning the highest value
+           of any subset that has a value. known is a bytearray flagging the masks which were given
+           a value; if it is None all values are taken as given."""
+        if known is None:
+            return
+        table = self.table
+        if not known[0]:
+            table[0] = 0 # empty coalition has zero value
+        # masks are visited in increasing order so every subset is filled before its supersets
+        for mask in range(1, len(table)):
+            if not known[mask]:
                 max_ = None
-                for less, removed in froze_remove_one(elm):
-                    if max_ is None or self.coalition_values[less] > max_:
-                        max_ = self.coalition_values[less]
-                self.coalition_values[elm] = max_
+                rest = mask
+                while rest:
+                    bit = rest & -rest
+                    rest ^= bit
+                    if max_ is None or table[mask ^ bit] > max_:
+                        max_ = table[mask ^ bit]
+                table[mask] = max_
 
     def is_core(self, imputation):
         """The imputation is effectively a payoff assigned to each player. The imputation X is in the core
            if for all coalitions S, x(S) ≥ v(S)"""
-        for elm in powerset(self.players):
-            elm = frozenset(elm)
-            x = sum([imputation[player] for player in elm])
-            if self.coalition_values[elm] > x:
+        sums = subset_sums([imputation[player] for player in self.player_order])
+        for mask, val in enumerate(self.table):
+            if val > sums[mask]:
                 return False
         return True
 
 
+    def is_core_batch(self, imputations, tol=None):
+        """Test many imputations for core membership with one pass over the coalitions.
+           imputations is a sequence where each imputation is a dict of player:payoff or a sequence of
+           payoffs in player_order. Returns the pair (in_core, violations): in_core is a list of booleans
+           and violations gives, for each imputation, (coalition, excess) for the coalition with the
+           largest excess v(S) - x(S), or None if no excess is more than tol. By default tol is 1e-9 times
+           the largest coalition value or payoff (at least 1), so rounding in the sums does not reject an
+           imputation on the boundary of the core.
+           The coalitions are visited in Gray code order so each step adds or removes one player and the
+           coalition sums of the whole batch are updated with one vector operation."""
+        columns = []
+        for ii, player in enumerate(self.player_order):
+            columns.append([imputation[player] if isinstance(imputation, dict) else imputation[ii]
+                            for imputation in imputations])
+        nimputations = len(imputations)
+        if not nimputations:
+            return [], []
+        table = self._read_table()
+        best = [table[0]] * nimputations # the empty coalition has x = 0
+        best_masks = [0] * nimputations
+        least = table[0] # the smallest of the best excesses so far
+        for mask, sums in self._gray_code_sums(columns):
+            val = table[mask]
+            if val - min(sums) <= least:
+                continue # no imputation has a larger excess here
+            for jj in range(nimputations):
+                excess = val - sums[jj]
+                if excess > best[jj]:
+                    best[jj] = excess
+                    best_masks[jj] = mask
+            least = min(best)
+        if tol is None:
+            largest = max([abs(val) for val in table] + [abs(payoff) for column in columns for payoff in column])
+            tol = 1e-9 * max(1, largest)
+        in_core = [excess <= tol for excess in best]
+        violations = [None if in_core[jj] else (self.get_coalition(best_masks[jj]), best[jj])
+                      for jj in range(nimputations)]
+        return in_core, violations
+
+    def _gray_code_sums(self, columns):
+        """Yield (mask, sums) for every nonempty coalition in Gray code order, where sums gives the total
+           payoff of the coalition for each imputation. columns gives each player's payoffs."""
+        sums = [0] * len(columns[0]) if columns else []
+        mask = 0
+        for step in range(1, len(self.table)):
+            ii = (step & -step).bit_length() - 1
+            mask ^= 1 << ii
+            if ii >= 10: # start again from the members every 1024 steps so rounding does not build up
+                sums = [sum(payoffs) for payoffs in zip(*[columns[jj] for jj, _ in mask_bits(mask)])]
+            elif mask >> ii & 1:
+                sums = list(map(add, sums, columns[ii]))
+            else:
+                sums = list(map(sub, sums, columns[ii]))
+            yield mask, sums
+
+    def get_core_target(self):
+        """CoreTarget for the core and nucleolus solvers, with one payoff per player."""
+        return mask_core_target(self.player_order, self._read_table(), -1 if self.isCost else 1)
+
+    def get_least_core(self):
+        """Get the pair (epsilon, imputation) where epsilon is the least core value, the smallest e such
+           that some imputation x has v(S) - x(S) ≤ e for every coalition S other than the empty and grand
+           coalitions, and imputation is a dict of player:payoff achieving it. For a cost game the excess
+           is x(S) - c(S). Only the coalitions that are needed are put into the linear program."""
+        return least_core(self.get_core_target())
+
+    def find_core_imputation(self):
+        """Return an imputation in the core as a dict of player:payoff, or None if the core is empty."""
+        return find_core_payoffs(self.get_core_target())
+
+    def get_is_core_empty(self):
+        """The core is empty if there is no imputation with x(S) ≥ v(S) for every coalition S
+           (x(S) ≤ c(S) for a cost game)."""
+        return self.find_core_imputation() is None
+
+    def get_nucleolus(self, pre=False):
+        """Get the nucleolus as a dict of player:payoff, by solving a sequence of least core problems.
+           If pre is true get the prenucleolus, which is not restricted to individually rational payoffs."""
+        return nucleolus(self.get_core_target(), pre=pre)
+
     def get_banzhaf_values(self):
         """Get the banzhaf values. Note the banzhaf values are only defined for simple games (games where
-           all coalitions are values zero or 1."""
-        bcounts = defaultdict(int) # key is player type, val is number of distinct coalitions
-                                   # where adding one of pt earns success
-        for elm in powerset(self.players):
-            elm = frozenset(elm)
-            if self.coalition_values[elm]:
-                for less, removed in froze_remove_one(elm):
-                    if not self.coalition_values[less]:
-                        bcounts[removed] += 1
-        total = sum([bcounts[player] for player in bcounts])
+           all coalitions are values zero or 1.
+           The table is packed into a bitset (if it is not one already) and the coalitions where adding each
+           player earns success are found and counted with whole table bit operations."""
+        bcounts = self._swing_counts() if self.swing_counts is None else self.swing_counts
+        total = sum(bcounts)
         banzhaf_values = {pt:0 for pt in self.players} # in case bcount is zero
-        for player in bcounts:
-            banzhaf_values[player] = bcounts[player] / total
+        for ii, player in enumerate(self.player_order):
+            if bcounts[ii]:
+                banzhaf_values[player] = bcounts[ii] / total
         return banzhaf_values
 
+    def _swing_counts(self):
+        """Number of coalitions where adding each player earns success, in player order."""
+        table = self.table
+        bits = table.to_int() if isinstance(table, BitsetTable) else pack_bits(table)
+        return [swing_bits(bits, len(table), 1 << ii).bit_count() for ii in range(len(self.player_order))]
+
+    def get_power_indices(self):
+        """Get the banzhaf, coleman, johnston, deegan-packel and holler-packel indices of a simple game (see
+           power_indices.py) as a dict keyed by index name of dicts of player:value. The swings of every
+           player are found with whole table bit operations, as for get_banzhaf_values, and the rest follows
+           from them."""
+        indices = mask_power_indices(self.table, len(self.player_order))
+        return {name:dict(zip(self.player_order, values)) for name, values in indices.items()}
 
-    def get_shapley_values(self):
-        """Calculate and retur the shapley values"""
+
+    def get_shapley_values(self, method=None):
+        """Calculate and retur the shapley values.
+           method is 'subset', 'dividend' or 'permutation'. The subset method visits each coalition once and
+           weights the marginal contribution of each player joining it by |S|!(n-|S|-1)!/n!, which is O(n*2^n)
+           rather than O(n*n!). The dividend method shares each harsanyi dividend equally among the members
+           of its coalition, which only needs a pass over the nonzero dividends once they are computed.
+           The typed method solves the typed game of the classes of symmetric players (see get_typed_game).
+           If method is None use whichever of subset and permutation is cheaper for the number of players, or
+           the incremental totals if they are enabled."""
+        if method is None and self.shapley_totals is not None:
+            return self._shapley_from_totals(self.shapley_totals)
+        if method is None:
+            nplayers = len(self.players)
+            method = 'permutation' if factorial(nplayers) <= 2 ** nplayers else 'subset'
+        if method == 'subset':
+            return self._subset_shapley_values()
+        if method == 'dividend':
+            return self._dividend_shapley_values(self.get_dividend_table())
+        if method == 'typed':
+            game, player_type = self.get_typed_game()
+            return expand_type_values(game.get_shapley_values(), player_type)
+        if method != 'permutation':
+            raise ValueError('unknown shapley method {}'.format(method))
+        table = self._read_table()
         shapley = defaultdict(float)
         perms = 0
-        for perm in permutations(self.players):
+        for perm in permutations(range(len(self.player_order))):
             old = 0
+            mask = 0
             perms += 1
-            for ii in range(len(perm)):
-                piece = frozenset(perm[:ii + 1])
-                new = self.coalition_values[piece]
-                player = perm[ii]
-                shapley[player] += new - old
+            for ii in perm:
+                mask |= 1 << ii
+                new = table[mask]
+                shapley[self.player_order[ii]] += new - old
                 old = new
 
         for player in shapley.keys():
             shapley[player] = shapley[player]/perms
         return dict(shapley)
 
-    def simulate_shapley_values(self, perms):
+    def _subset_shapley_values(self):
+        """Exact shapley values from one pass over the coalitions."""
+        return self._shapley_from_totals(self._shapley_totals())
+
+    def _shapley_from_totals(self, totals):
+        perms = factorial(len(self.player_order))
+        return {player:totals[ii] / perms for ii, player in enumerate(self.player_order)}
+
+    def _shapley_totals(self):
+        """Sum over the coalitions of the marginal contribution of each player joining it, weighted by the
+           number of orderings in which the player joins that coalition, in player order."""
+        nplayers = len(self.player_order)
+        # integer weights so integer valued games give the same result as the permutation walk
+        weights, _ = semivalue_weights('shapley', nplayers)
+        return [sum(map(mul, weights, row)) for row in mask_marginal_sums(self.table, nplayers)]
+
+    def get_semivalues(self, semivalues):
+        """Get several semivalues (see semivalue.py), e.g. ['shapley', 'banzhaf', ('beta', 4, 1)], from one
+           pass over the coalitions. Returns a list of dicts of player:value in the same order. The banzhaf
+           semivalue is the raw banzhaf value, the average marginal contribution, not normalized to sum to one
+           like get_banzhaf_values."""
+        nplayers = len(self.player_order)
+        results = semivalues_from_sums(mask_marginal_sums(self.table, nplayers), semivalues, nplayers)
+        return [dict(zip(self.player_order, values)) for values in results]
+
+    def _dividend_shapley_values(self, dividends):
+        """Shapley values from a table of harsanyi dividends indexed by mask."""
+        totals = [0] * len(self.player_order)
+        for mask, val in enumerate(dividends):
+            if val:
+                share = val / mask.bit_count()
+                for ii, _ in mask_bits(mask):
+                    totals[ii] += share
+        return {player:totals[ii] for ii, player in enumerate(self.player_order)}
+
+    def get_symmetry_classes(self):
+        """Get the classes of symmetric players, those who can be swapped without changing any coalition
+           value, as a list of lists of players."""
+        return find_symmetry_classes(self.player_order, self.table)
+
+    def get_typed_game(self):
+        """Get the equivalent TypedCoalitionalGame with a type for each class of symmetric players, numbered
+           from 0 in the order of get_symmetry_classes. Returns (game, player_type) where player_type gives the
+           type of each player; the values of the typed game are per player of each type, and
+           symmetry.expand_type_values turns them back into values per player."""
+        player_types, valuation, player_type = reduce_symmetric_players(self.player_order, self.table)
+        return TypedCoalitionalGame(player_types, valuation, isCost=self.isCost), player_type
+
+    def get_dividend_table(self):
+        """Get the harsanyi dividend of every coalition as an array indexed by mask, computed with the fast
+           Möbius transform."""
+        table = self.table
+        # a mapped table is a memoryview, whose format is its array typecode
+        return mobius_transform(array(table.format if isinstance(table, memoryview) else table.typecode, table))
+
+    def get_harsanyi_dividends(self):
+        """Get the harsanyi dividends as a dict keyed by frozenset of players, leaving out those that are zero.
+           The value of each coalition is the sum of the dividends of the coalitions it contains."""
+        return {self.get_coalition(mask):val for mask, val in enumerate(self.get_dividend_table()) if val}
+
+    def get_sampling_target(self):
+        """SamplingTarget for estimating values by sampling, with one slot per player."""
+        return SamplingTarget(self.player_order, 0, lambda mask, slot: mask | (1 << slot),
+                              self._read_table().__getitem__)
+
+    def estimate_shapley_values(self, perms=None, target_stderr=None, time_budget=None, processes=1, seed=None,
+                                confidence=0.95, strategy='permutation'):
+        """Estimate the shapley values by sampling, possibly in several processes.
+           Returns a ShapleyEstimate with the values, standard errors, confidence intervals and number of
+           samples used. See sampling.estimate_shapley_values for the strategies and stopping rules."""
+        return estimate_shapley_values(self.get_sampling_target(), perms=perms, target_stderr=target_stderr,
+                                       time_budget=time_budget, processes=processes, seed=seed,
+                                       confidence=confidence, strategy=strategy)
+
+    def simulate_shapley_values(self, perms, seed=None, strategy='permutation'):
         """Get approximate shapley values by looking at random permutations.
            Returns the approximate values."""
-        combo = [player for player in self.players]
-        shapley = defaultdict(float)
-        for jj in range(perms):
-            old = 0
-            random.shuffle(combo)
-            for ii in range(len(combo)):
-                piece = frozenset(combo[:ii + 1])
-                new = self.coalition_values[piece]
-                player = combo[ii]
-                shapley[player] += new - old
-                old = new
+        return self.estimate_shapley_values(perms=perms, seed=seed, strategy=strategy).values
 
-        for player in shapley.keys():
-            shapley[player] = shapley[player]/perms
-        return dict(shapley)
+    def get_owen_values(self, unions):
+        """Get the owen values of a coalition structure, e.g. voting blocs: unions is an iterable of iterables
+           of players partitioning them. Each union takes a sum over the sets of the other unions nested
+           with one over the sets of its own members (see owen.py) rather than a walk over the orderings."""
+        nplayers = len(self.player_order)
+        values = owen_values(self._read_table(), [1 << ii for ii in range(nplayers)], [1] * nplayers,
+                             union_indexes(unions, self.player_bits))
+        return dict(zip(self.player_order, values))
+
+    def estimate_owen_values(self, unions, perms=None, target_stderr=None, time_budget=None, processes=1,
+                             seed=None, confidence=0.95):
+        """Estimate the owen values of a coalition structure by sampling the orderings that keep each union
+           together, for partitions with too many unions for get_owen_values. Returns a ShapleyEstimate."""
+        target = self.get_sampling_target()
+        target.set_unions(unions)
+        return estimate_shapley_values(target, perms=perms, target_stderr=target_stderr,
+                                       time_budget=time_budget, processes=processes, seed=seed,
+                                       confidence=confidence, strategy='unions')
 
     def zero_normalize(self):
         """Create straegically equivalent 0 normalized game. A game is 0 normalized if
@@ -116,8 +440,9 @@ class CoalitionalGame:
            grand coalition will be 1, 0, or -1. Returns the pai (game, v) where
            v is the value of the grand coalition in the new game.
         """
-        grand = self.coalition_values[frozenset(self.players)]
-        offtotal = sum([self.coalition_values[frozenset([player])] for player in self.players])
+        grand = self.table[-1]
+        offsets = [self.table[1 << ii] for ii in range(len(self.player_order))]
+        offtotal = sum(offsets)
         if offtotal < grand:
             newgrand = 1
             scale = 1 / (grand - offtotal)
@@ -127,13 +452,9 @@ class CoalitionalGame:
         else:
             newgrand = 0
             scale = 1 # anz nonzero value should work
-        vals = {}
-        for elm in powerset(self.players):
-            elm = frozenset(elm)
-            old = self.coalition_values[elm]
-            off = sum([self.coalition_values[frozenset([player])] for player in elm])
-            vals[elm] = (old - off) * scale
-        theGame = CoalitionalGame(vals)
+        offs = subset_sums(offsets)
+        table = array('d', [(old - offs[mask]) * scale for mask, old in enumerate(self.table)])
+        theGame = create_game_from_table(self.player_order, table, isCost=self.isCost)
         return theGame, newgrand
 
     def is_equivalent(self, game):
@@ -148,50 +469,140 @@ class CoalitionalGame:
 
     def get_is_monotonic(self):
         """A game is monotonics if the value of a coalition is ≥ the value of its subcoalitions."""
-        for elm in powerset(self.players):
-            elm = frozenset(elm)
-            old = self.coalition_values[elm]
-            for less, removed in froze_remove_one(elm):
-                if self.coalition_values[less] > old:
+        table = self._read_table()
+        for mask in range(1, len(table)):
+            old = table[mask]
+            for _, bit in mask_bits(mask):
+                if table[mask ^ bit] > old:
                     return False
         return True
 
     def get_is_superadditive(self):
         """A game is superadditive if for every pair of disjoint coaalitions, the valuation of the union
-           is  ≥ the sum of the values of the pair."""
-        # this can take a really long time to check
-        for elm in powerset(self.players):
-            elm = frozenset(elm)
-            complement = self.players - elm
-            for disjointelm in powerset(complement):
-                disjointelm = set(disjointelm)
-                sum_ = self.coalition_values[frozenset(disjointelm)] + self.coalition_values[elm]
-                if sum_ > self.coalition_values[frozenset(elm | disjointelm)]:
-                    return False
-        return True
+           is  ≥ the sum of the values of the pair. For a cost game the union must be ≤ the sum."""
+        return self.find_superadditivity_violation() is None
+
+    def find_superadditivity_violation(self):
+        """Return a pair of disjoint coalitions (as frozensets) whose union breaks superadditivity, or None.
+           Each unordered pair is visited once by enumerating the submasks of the complement of each mask,
+           3^n pairs in all."""
+        table = self._read_table()
+        full = len(table) - 1
+        sign = -1 if self.isCost else 1
+        for mask in range(len(table)):
+            val = table[mask]
+            complement = full ^ mask
+            disjoint = complement
+            # submasks come in decreasing order; those below mask were checked when it was their turn
+            while disjoint >= mask:
+                if sign * (table[disjoint] + val - table[mask | disjoint]) > 0:
+                    return self.get_coalition(mask), self.get_coalition(disjoint)
+                if not disjoint:
+                    break
+                disjoint = (disjoint - 1) & complement
+        return None
+
+    def get_is_convex(self):
+        """A game is convex (supermodular) if v(S ∪ T) + v(S ∩ T) ≥ v(S) + v(T) for all coalitions S and T,
+           i.e. the marginal contribution of a player never decreases as the coalition grows.
+           A cost game is convex if the inequality holds the other way (submodular)."""
+        return self.find_convexity_violation() is None
+
+    def find_convexity_violation(self):
+        """Return a pair of coalitions (S, T) with v(S ∪ T) + v(S ∩ T) < v(S) + v(T), or None.
+           It is enough to check S and T that each add one player to a common coalition:
+           v(R ∪ {i, j}) - v(R ∪ {j}) ≥ v(R ∪ {i}) - v(R), which is n^2 2^n checks rather than 4^n."""
+        table = self._read_table()
+        nplayers = len(self.player_order)
+        full = len(table) - 1
+        sign = -1 if self.isCost else 1
+        for mask in range(len(table)):
+            val = table[mask]
+            complement = full ^ mask
+            for ii in range(nplayers):
+                ibit = 1 << ii
+                if not complement & ibit:
+                    continue
+                gain = table[mask | ibit] - val
+                for jj in range(ii + 1, nplayers):
+                    jbit = 1 << jj
+                    if complement & jbit and sign * (table[mask | ibit | jbit] - table[mask | jbit] - gain) < 0:
+                        return self.get_coalition(mask | ibit), self.get_coalition(mask | jbit)
+        return None
 
 
     def get_is_simple(self):
         """For a "simple" coalitional game all valuations are 1 or 0"""
-        for val in self.coalition_values.values():
+        if isinstance(self.table, BitsetTable):
+            return True
+        for val in self.table:
             if val not in (1,0):
                 return False
         return True
 
 
+def create_game_from_table(players, table, isCost=False):
+    """Create a coalitional game directly from a value table. players is a sequence giving the player
+       at each bit position and table is an array of 2^len(players) values indexed by coalition mask."""
+    if len(table) != 1 << len(players):
+        raise ValueError('table must have 2^{} entries'.format(len(players)))
+    theGame = CoalitionalGame({}, isCost=isCost)
+    theGame._set_table(players, table)
+    return theGame
+
+
+def create_game_from_valuation(players, coalition_valuation, isCost=False):
+    """Create a coalitional game by valuing every coalition of players. If the valuation has an
+       evaluate_masks(players, masks) method every coalition is valued with one call to it, otherwise it
+       is called with a counts tuple giving 1 or 0 for each player, in the order of players."""
+    players = list(players)
+    masks = range(1 << len(players))
+    if hasattr(coalition_valuation, 'evaluate_masks'):
+        values = coalition_valuation.evaluate_masks(players, masks)
+    else:
+        values = [coalition_valuation(tuple([(player, mask >> ii & 1) for ii, player in enumerate(players)]))
+                  for mask in masks]
+    return create_game_from_table(players, array(table_typecode(values), values), isCost=isCost)
+
+
+def create_game_from_dividends(dividends, players=None, isCost=False):
+    """Create a coalitional game from a dict of harsanyi dividends keyed by coalitions (iterables of
+       players). Coalitions not given have a zero dividend. players gives the player order; by default it
+       is the order the players first appear in the keys. The values are found with the inverse Möbius
+       transform."""
+    if players is None:
+        players = list(dict.fromkeys([player for key in dividends for player in key]))
+    player_bits = {player:ii for ii, player in enumerate(players)}
+    table = array(table_typecode(dividends.values()), [0]) * (1 << len(players))
+    for key in dividends:
+        table[mask_from_players(key, player_bits)] = dividends[key]
+    return create_game_from_table(players, mobius_transform(table, inverse=True), isCost=isCost)
+
+
+def shapley_from_dividends(dividends):
+    """Shapley values from a dict of harsanyi dividends keyed by coalitions, as a dict keyed by player.
+       Each dividend is shared equally by the members of its coalition, so the game never has to be
+       expanded to a table."""
+    shapley = defaultdict(float)
+    for key in dividends:
+        if dividends[key] and key:
+            share = dividends[key] / len(key)
+            for player in key:
+                shapley[player] += share
+    return dict(shapley)
+
+
 def create_voting_game(player_strengths, crit):
     """Create a colatitional game from a player strengths dict.
        Return the game.
        A weighted majority voting game has a value of 1 if the sum of player strengths * number of players
-       voting for the measure exceeds a critical value."""
-    players = set([player for player in player_strengths])
-    coalition_values = {}
-    for elm in powerset(players):
-        key = frozenset(elm)
-        strength = sum([player_strengths[player] for player in elm])
-        val = int(strength >= crit)
-        coalition_values[key] = val
-
-    theGame = CoalitionalGame(coalition_values)
-    return theGame
-
+       voting for the measure exceeds a critical value.
+       The game is simple, so the values are kept in a BitsetTable, valued a chunk of masks at a time so the
+       whole table is never held as python ints."""
+    players = [player for player in player_strengths]
+    valuation = VotingValuation(player_strengths, crit)
+    table = BitsetTable(1 << len(players))
+    chunk = min(len(table), 1 << 16)
+    for lo in range(0, len(table), chunk):
+        table[lo:lo + chunk] = valuation.evaluate_masks(players, range(lo, lo + chunk))
+    return create_game_from_table(players, table)
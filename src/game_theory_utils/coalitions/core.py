@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+from fractions import Fraction
+from functools import partial
+from itertools import compress, islice
+from operator import lt, sub
+
+from game_theory_utils.util.lputil import solve_lp
+from game_theory_utils.util.maskutil import subset_sums
+from game_theory_utils.util.radixutil import radix_strides, decode_index, lattice_sums
+
+"""Core, least core and nucleolus of coalitional games by linear programming.
+   The excess of a coalition S under payoffs x is v(S) - x(S). The least core is the set of payoffs with
+   x(N) = v(N) that minimize the largest excess of a proper coalition, and the core is nonempty when that
+   excess, epsilon, is at most zero. The nucleolus is found by a sequence of such problems: after each one
+   the coalitions whose constraints have a positive dual value are fixed at that excess (they have it in
+   every solution), and the next problem minimizes the largest excess of the other coalitions, until the
+   fixed coalitions determine the payoffs.
+   Games with 20 or more players have too many coalitions to put them all into the linear program, so rows
+   are generated lazily: the program starts with the coalitions of one player and of all but one player,
+   and after each solution the value table is scanned for coalitions with an excess above epsilon, which
+   are added until there are none.
+   For typed games players of the same type get the same payoff (the least core always contains such a
+   payoff and the nucleolus is one), so there is one variable per type and one constraint per count vector.
+   Cost games are solved by negating the values and the payoffs."""
+
+__all__ = ('CoreTarget', 'mask_core_target', 'typed_core_target', 'least_core', 'find_core_payoffs',
+           'nucleolus')
+
+class CoreTarget:
+    """Describes a game for the core solvers.
+       labels names the payoff variables: players, or types whose players all get the same payoff.
+       table gives the value of each coalition by index, with the empty coalition first and the grand
+       coalition last. digits(index) gives the number of players of each label in the coalition,
+       sums(payoffs) gives the total payoff of every coalition as a list by index and units gives the index
+       of the coalition of one player of each label. sign is -1 for a cost game, in which case table holds
+       the negated costs."""
+
+    def __init__(self, labels, table, digits, sums, units, sign=1):
+        self.labels = list(labels)
+        self.table = table
+        self.digits = digits
+        self.sums = sums
+        self.units = list(units)
+        self.sign = sign
+
+    def get_start_rows(self):
+        """Proper coalitions to start a linear program with: each player alone and all but each player.
+           Together they bound every payoff."""
+        grand = len(self.table) - 1
+        rows = set()
+        for index in self.units:
+            for row in (index, grand - index):
+                if 0 < row < grand:
+                    rows.add(row)
+        return rows
+
+    def get_payoffs(self, payoffs):
+        """Dict of label:payoff, undoing the negation of a cost game."""
+        return {label:self.sign * payoff for label, payoff in zip(self.labels, payoffs)}
+
+
+def mask_core_target(players, table, sign=1):
+    """CoreTarget for a game whose values are in a table indexed by coalition mask, players giving the
+       player at each bit position."""
+    nplayers = len(players)
+    if sign < 0:
+        table = [-val for val in table]
+    digits = lambda mask: tuple([mask >> ii & 1 for ii in range(nplayers)])
+    return CoreTarget(players, table, digits, subset_sums, [1 << ii for ii in range(nplayers)], sign)
+
+
+def typed_core_target(player_types, table, sign=1):
+    """CoreTarget for a typed game whose values are in a table in mixed radix index order (see
+       radixutil), with a payoff for each type."""
+    types = sorted(player_types)
+    counts = [player_types[type_] for type_ in types]
+    if sign < 0:
+        table = [-val for val in table]
+    digits = lambda index: decode_index(index, counts)
+    sums = lambda payoffs: lattice_sums(payoffs, counts)
+    return CoreTarget(types, table, digits, sums, radix_strides(counts), sign)
+
+
+class _Span:
+    """Echelon basis, in exact arithmetic, of the coefficient vectors of the fixed coalitions."""
+
+    def __init__(self):
+        self.rows = [] # pairs of (pivot column, row with a one in the pivot column)
+
+    def reduce(self, vector):
+        vector = list(vector)
+        for pivot, row in self.rows:
+            factor = vector[pivot]
+            if factor:
+                vector = [elm - factor * relm for elm, relm in zip(vector, row)]
+        return vector
+
+    def contains(self, vector):
+        return not any(self.reduce(vector))
+
+    def add(self, vector):
+        """Add vector to the basis. Returns False if it is already spanned."""
+        vector = self.reduce(vector)
+        pivot = next((ii for ii, elm in enumerate(vector) if elm), None)
+        if pivot is None:
+            return False
+        factor = Fraction(vector[pivot])
+        self.rows.append((pivot, [elm / factor for elm in vector]))
+        return True
+
+    def get_rank(self):
+        return len(self.rows)
+
+
+def _tolerance(table):
+    return 1e-9 * max(1, max(map(abs, table)))
+
+def _largest_excess(target, payoffs, floor, skip, limit):
+    """Up to limit proper coalitions with an excess above floor, largest excess first, leaving out any
+       for which skip(index) is true."""
+    excess = list(map(sub, target.table, target.sums(payoffs)))
+    last = len(excess) - 1
+    over = compress(range(1, last), map(partial(lt, floor), islice(excess, 1, last)))
+    found = []
+    for index in sorted(over, key=excess.__getitem__, reverse=True):
+        if not skip(index):
+            found.append(index)
+            if len(found) == limit:
+                break
+    return found
+
+def _minimize_excess(target, equalities, rows, individual, skip, tol):
+    """Minimize epsilon subject to x(S) + epsilon ≥ v(S) for the coalitions in rows, x(S) = val for the
+       (index, val) pairs in equalities and, if individual, x_i ≥ v({i}). Coalitions with an excess above
+       epsilon are added to rows (unless skip(index) is true) and the program is solved again until there
+       are none. Returns (epsilon, payoffs, duals), duals giving the dual value of each coalition in rows."""
+    nlabels = len(target.labels)
+    table = target.table
+    limit = 2 * nlabels + 2 # coalitions added per round
+    c = [0] * nlabels + [1]
+    A_eq = [list(target.digits(index)) + [0] for index, _ in equalities]
+    b_eq = [val for _, val in equalities]
+    A_base = []
+    b_base = []
+    if individual:
+        for ii, index in enumerate(target.units):
+            A_base.append([-1 if jj == ii else 0 for jj in range(nlabels)] + [0])
+            b_base.append(-table[index])
+    while True:
+        order = sorted(rows)
+        A_ub = A_base + [[-elm for elm in target.digits(index)] + [-1] for index in order]
+        b_ub = b_base + [-table[index] for index in order]
+        result = solve_lp(c, A_ub, b_ub, A_eq, b_eq, tol)
+        if result.status != 'optimal':
+            raise ValueError('the linear program is {}'.format(result.status))
+        payoffs = result.x[:nlabels]
+        epsilon = result.x[nlabels]
+        new = _largest_excess(target, payoffs, epsilon + tol, lambda index: index in rows or skip(index), limit)
+        if not new:
+            return epsilon, payoffs, dict(zip(order, result.ub_duals[len(A_base):]))
+        rows.update(new)
+
+
+def least_core(target, tol=None):
+    """Find the least core value epsilon, the smallest possible largest excess of a proper coalition for
+       payoffs with x(N) = v(N), and payoffs that achieve it. Returns (epsilon, payoffs) where payoffs is a
+       dict keyed by label. A game of one player has no proper coalitions, so epsilon is -inf."""
+    table = target.table
+    if tol is None:
+        tol = _tolerance(table)
+    if len(table) <= 2:
+        return float('-inf'), target.get_payoffs([table[-1]] * len(target.labels))
+    grand = len(table) - 1
+    epsilon, payoffs, _ = _minimize_excess(target, [(grand, table[grand])], target.get_start_rows(), False,
+                                           lambda index: False, tol)
+    return epsilon, target.get_payoffs(payoffs)
+
+
+def find_core_payoffs(target, tol=None):
+    """Payoffs in the core as a dict keyed by label, or None if the core is empty."""
+    if tol is None:
+        tol = _tolerance(target.table)
+    epsilon, payoffs = least_core(target, tol)
+    return payoffs if epsilon <= tol else None
+
+
+def nucleolus(target, pre=False, tol=None):
+    """Find the nucleolus, the imputation that lexicographically minimizes the excesses sorted from largest
+       down, as a dict keyed by label. If pre is true find the prenucleolus, which may give a player less
+       than it could get alone. Raises ValueError if the game has no imputations."""
+    table = target.table
+    if tol is None:
+        tol = _tolerance(table)
+    nlabels = len(target.labels)
+    grand = len(table) - 1
+    sizes = target.digits(grand)
+    if not pre and sum([table[index] * size for index, size in zip(target.units, sizes)]) > table[grand] + tol:
+        raise ValueError('the game has no imputations')
+    if nlabels <= 1:
+        return target.get_payoffs([table[grand] / size for size in sizes])
+    span = _Span()
+    span.add(sizes)
+    equalities = [(grand, table[grand])]
+    fixed = set([grand])
+    spanned = set() # coalitions whose excess is fixed by the fixed coalitions
+
+    def settled(index):
+        if index in fixed or index in spanned:
+            return True
+        if span.contains(target.digits(index)):
+            spanned.add(index)
+            return True
+        return False
+
+    rows = target.get_start_rows()
+    # the first problem has every coalition, as the least core does; later ones only the unsettled ones
+    skip = fixed.__contains__
+    while span.get_rank() < nlabels:
+        epsilon, payoffs, duals = _minimize_excess(target, equalities, rows, not pre, skip, tol)
+        for index in sorted(duals, key=duals.get, reverse=True):
+            if duals[index] > tol and span.add(target.digits(index)):
+                fixed.add(index)
+                equalities.append((index, table[index] - epsilon))
+        skip = settled
+        rows = set([index for index in rows | target.get_start_rows() if not settled(index)])
+    return target.get_payoffs(payoffs)
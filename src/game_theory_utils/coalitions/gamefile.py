@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+from array import array
+
+from game_theory_utils.util.maskutil import table_typecode
+from game_theory_utils.util.tablefile import read_table_header, write_table_file, map_table_arrays
+from game_theory_utils.coalitions.coalition import CoalitionalGame, create_game_from_table
+from game_theory_utils.coalitions.typed_coalition import TypedCoalitionalGame, TypedValueTable
+from game_theory_utils.coalitions.mapped_game import MappedCoalitionalGame
+
+"""Saving and loading games in the table file format (see util.tablefile), so a game only has to be built
+   and filled in once. The header gives the kind of game, its players or player types, whether it is a cost
+   game, the payload layout and any saved analysis results. A dense payload is the value table itself, in
+   mask order for a CoalitionalGame and mixed radix order for a TypedCoalitionalGame. A sparse payload is
+   the nonzero values followed by their indexes, which is smaller when fewer than a third of the values are
+   nonzero (simple games, for instance).
+   A dense CoalitionalGame is loaded by memory mapping it, so nothing is read until it is used and a large
+   game opens at once. A typed game is read into memory unless it is opened for writing, when its table
+   stays on the mapped file; a sparse file is expanded into a table in memory."""
+
+__all__ = ('MappedTypedCoalitionalGame', 'save_game', 'load_game', 'TYPED_RESULTS')
+
+TYPED_RESULTS = ('shapley_values', 'banzhaf_values', 'simple', 'superadditive', 'monotonic')
+
+class MappedTypedCoalitionalGame(TypedCoalitionalGame):
+    """A TypedCoalitionalGame whose TypedValueTable is on a table file mapped for writing, as returned by
+       load_game(path, writable=True). Changes to the values go to the file, so a value must fit the file's
+       typecode. flush writes them out and close releases the file, as for MappedCoalitionalGame."""
+
+    def __init__(self, player_types, mapped, table, isCost=False):
+        super().__init__(player_types, TypedValueTable(player_types, table), isCost=isCost)
+        self._mapped = mapped
+
+    def close(self):
+        """Release the mapped file."""
+        self.coalition_valuation.table.release()
+        self._mapped.close()
+
+    def flush(self):
+        """Write changes to the table out to the file."""
+        self._mapped.flush()
+
+
+def save_game(game, path, sparse=None, results=None):
+    """Save a CoalitionalGame or TypedCoalitionalGame to path. sparse chooses the payload layout; if it is
+       None the smaller is used. results is a dict of analysis results to save with the game, whose values
+       must be plain python values (e.g. {'shapley_values': game.get_shapley_values()}). The results a
+       TypedCoalitionalGame has already calculated (see TYPED_RESULTS) are always saved."""
+    results = dict(results or {})
+    if isinstance(game, TypedCoalitionalGame):
+        header = {'kind': 'typed', 'player_types': dict(game.player_types)}
+        table = game.get_value_table()
+        for name in TYPED_RESULTS:
+            if getattr(game, name) is not None:
+                results.setdefault(name, getattr(game, name))
+    elif isinstance(game, CoalitionalGame):
+        header = {'kind': 'coalitional', 'players': list(game.player_order)}
+        table = game.table
+    else:
+        raise ValueError('can only save a CoalitionalGame or TypedCoalitionalGame')
+    header['isCost'] = game.isCost
+    header['results'] = results
+    if isinstance(table, memoryview):
+        table = array(table.format, table)
+    elif not isinstance(table, array):
+        table = array(table_typecode(table), table)
+    indexes = array('Q', [index for index, val in enumerate(table) if val])
+    if sparse is None:
+        sparse = 3 * len(indexes) < len(table)
+    if sparse:
+        header['layout'] = 'sparse'
+        header['table_size'] = len(table)
+        write_table_file(path, header, [array(table.typecode, [table[index] for index in indexes]), indexes])
+    else:
+        header['layout'] = 'dense'
+        write_table_file(path, header, [table])
+    return header
+
+
+def load_game(path, writable=False):
+    """Load a game saved with save_game. A dense CoalitionalGame is returned as a MappedCoalitionalGame on
+       the file; with writable a dense TypedCoalitionalGame is returned as a MappedTypedCoalitionalGame. In
+       both cases writable maps the file for writing, so changes to the values go to the file. Other games are
+       read into memory. The saved results are in the game's results member, and those in TYPED_RESULTS are
+       restored to a TypedCoalitionalGame."""
+    with open(path, 'rb') as fobj:
+        header, _ = read_table_header(fobj)
+    if header['kind'] not in ('coalitional', 'typed'):
+        raise ValueError('unknown kind of game {}'.format(header['kind']))
+    results = header.get('results', {})
+    dense = header.get('layout', 'dense') == 'dense'
+    if dense and header['kind'] == 'coalitional':
+        game = MappedCoalitionalGame(path, writable=writable)
+        game.results = results
+        return game
+    _, mapped, views = map_table_arrays(path, writable=writable and dense)
+    if dense and writable:
+        game = MappedTypedCoalitionalGame(header['player_types'], mapped, views[0], isCost=header['isCost'])
+    else:
+        if dense:
+            table = array(header['typecode'], views[0])
+        else:
+            values, indexes = views
+            table = array(header['typecode'], [0]) * header['table_size']
+            for index, val in zip(indexes, values):
+                table[index] = val
+        for view in views:
+            view.release()
+        mapped.close()
+        if header['kind'] == 'coalitional':
+            game = create_game_from_table(header['players'], table, isCost=header['isCost'])
+        else:
+            valuation = TypedValueTable(header['player_types'], table)
+            game = TypedCoalitionalGame(header['player_types'], valuation, isCost=header['isCost'])
+    if header['kind'] == 'typed':
+        for name in TYPED_RESULTS:
+            if name in results:
+                setattr(game, name, results[name])
+    game.results = results
+    return game
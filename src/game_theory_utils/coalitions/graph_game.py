@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+from collections import deque
+
+from game_theory_utils.coalitions.coalition import create_game_from_valuation
+
+"""Induced subgraph games (Deng and Papadimitriou). The players are the nodes of a weighted graph and the
+   value of a coalition is the total weight of the edges with both ends in it; a loop on a node is the
+   value of the player alone. Since each edge is a game of its two players, the shapley value gives half
+   the weight of each edge to each end (all of a loop to its node), and the raw banzhaf value is the same.
+   A game is convex exactly when no edge weight is negative, and the most violated coalition for an
+   imputation is then a maximum weight closure, which a minimum cut finds, so the core can be tested
+   without enumerating coalitions."""
+
+__all__ = ('GraphGame',)
+
+class GraphGame:
+    """A coalitional game given by a weighted graph. edges is a dict keyed by (node, node) pairs, or a
+       sequence of (node, node, weight); repeated edges are added together and an edge from a node to itself
+       is a loop giving the value of the node alone. players gives every player, including any without
+       edges; by default it is the nodes in order of first appearance. For a cost game the edge weights are
+       costs."""
+
+    def __init__(self, edges, players=None, isCost=False):
+        if isinstance(edges, dict):
+            edges = [(first, second, weight) for (first, second), weight in edges.items()]
+        self.isCost = isCost
+        self.verbose = False
+        self.loops = {}
+        weights = {}
+        seen = {} # nodes in order of first appearance
+        for first, second, weight in edges:
+            seen.update(dict.fromkeys([first, second]))
+            if first == second:
+                self.loops[first] = self.loops.get(first, 0) + weight
+            else:
+                key = frozenset([first, second])
+                if key not in weights:
+                    weights[key] = [first, second, 0]
+                weights[key][2] += weight
+        self.edges = [tuple(edge) for edge in weights.values()]
+        self.player_order = list(seen if players is None else players)
+        self.players = set(self.player_order)
+        if not set(seen) <= self.players:
+            raise ValueError('edges have players that are not in the game')
+
+    def get_value(self, coalition):
+        """Value of a coalition given as an iterable of players."""
+        coalition = set(coalition)
+        return (sum([weight for first, second, weight in self.edges if first in coalition and second in coalition])
+                + sum([self.loops[player] for player in coalition if player in self.loops]))
+
+    def __call__(self, player_counts):
+        """Coalition valuation: player_counts is a dict or tuple of (player, count) pairs, with a count of
+           1 for the members."""
+        if isinstance(player_counts, dict):
+            player_counts = player_counts.items()
+        return self.get_value([player for player, count in player_counts if count])
+
+    def evaluate_masks(self, players, masks):
+        """Batched valuation of coalitions given as masks over players."""
+        bits = {player:1 << ii for ii, player in enumerate(players)}
+        edges = [(bits[first] | bits[second], weight) for first, second, weight in self.edges]
+        edges += [(bits[player], weight) for player, weight in self.loops.items()]
+        return [sum([weight for both, weight in edges if mask & both == both]) for mask in masks]
+
+    def get_shapley_values(self):
+        """Get the shapley values: half of each edge to each of its ends, and each loop to its node."""
+        shapley = {player:self.loops.get(player, 0) for player in self.player_order}
+        for first, second, weight in self.edges:
+            shapley[first] += weight / 2
+            shapley[second] += weight / 2
+        return shapley
+
+    def get_raw_banzhaf_values(self):
+        """Get the (unnormalized) banzhaf values. A player gains an edge in half the coalitions of the others,
+           so these are the same as the shapley values."""
+        return self.get_shapley_values()
+
+    def get_normalized_banzhaf_values(self):
+        """Get the raw banzhaf values divided by the sum of their absolute values. An edge of negative weight
+           lowers the raw values of both its ends, so a player with mostly negative edges has a negative share;
+           the absolute shares sum to one. These are normalized marginal contributions, not the swing counts of
+           get_banzhaf_values of the expanded game, which counts the coalitions a player takes from zero to a
+           nonzero value and has no closed form (with no negative edges or loops it is counting the coalitions
+           without an edge, the independent sets of the graph)."""
+        raw = self.get_raw_banzhaf_values()
+        total = sum([abs(val) for val in raw.values()])
+        if not total:
+            return {player:0 for player in raw}
+        return {player:raw[player] / total for player in raw}
+
+    def get_is_convex(self):
+        """The game is convex if and only if no edge has a negative weight (no positive cost for a cost game).
+           Loops do not matter."""
+        sign = -1 if self.isCost else 1
+        return all([sign * weight >= 0 for _, _, weight in self.edges])
+
+    def get_is_superadditive(self):
+        """Superadditive, like convex, if and only if no edge has a negative weight: the union of two
+           disjoint coalitions gains the edges between them."""
+        return self.get_is_convex()
+
+    def get_is_monotonic(self):
+        """Monotonic if no player can lower the value of a coalition by joining it: each player's loop plus
+           its negative edges must be ≥ 0."""
+        worst = dict(self.loops)
+        for first, second, weight in self.edges:
+            if weight < 0:
+                worst[first] = worst.get(first, 0) + weight
+                worst[second] = worst.get(second, 0) + weight
+        return all([val >= 0 for val in worst.values()])
+
+    def find_core_violation(self, imputation):
+        """Return (coalition, excess) for a coalition with the largest excess v(S) - x(S) (x(S) - c(S) for a
+           cost game) if it is positive, or None if the imputation is in the core. The imputation is a dict
+           of player:payoff and must distribute the value of the grand coalition.
+           For a convex game this is a maximum weight closure problem (choosing an edge requires its ends)
+           solved with a minimum cut; otherwise every coalition is checked."""
+        sign = -1 if self.isCost else 1
+        if self.get_is_convex():
+            edges = [(first, second, sign * weight) for first, second, weight in self.edges]
+            node_weights = {player:sign * (self.loops.get(player, 0) - imputation[player])
+                            for player in self.player_order}
+            coalition, excess = _max_closure(edges, node_weights)
+        else:
+            game = self.get_coalitional_game()
+            excesses = [(sign * (val - sum([imputation[player] for player in game.get_coalition(mask)])), mask)
+                        for mask, val in enumerate(game.table)]
+            excess, mask = max(excesses)
+            coalition = game.get_coalition(mask)
+        tol = 1e-9 * max([1] + [abs(weight) for _, _, weight in self.edges])
+        return (coalition, excess) if excess > tol else None
+
+    def is_core(self, imputation):
+        """The imputation (a dict of player:payoff) is in the core if no coalition has a positive excess."""
+        return self.find_core_violation(imputation) is None
+
+    def get_is_core_empty(self):
+        """A convex game always has a core (the shapley value is in it); otherwise the expanded game is
+           solved by linear programming."""
+        if self.get_is_convex():
+            return False
+        return self.get_coalitional_game().get_is_core_empty()
+
+    def get_coalitional_game(self):
+        """Expand to a CoalitionalGame. This enumerates every coalition so is only practical for small games."""
+        return create_game_from_valuation(self.player_order, self, isCost=self.isCost)
+
+
+def _max_closure(edges, node_weights):
+    """Find the set of nodes S maximizing the weight of the edges inside S (all ≥ 0) plus the node weights of S.
+       Returns (frozenset, weight). Each edge is a project whose profit needs both its ends, so the best set
+       is the source side of a minimum cut of the usual project selection network (Picard)."""
+    source = ('source',)
+    sink = ('sink',)
+    capacity = {}
+
+    def link(start, end, cap):
+        capacity.setdefault(start, {})
+        capacity.setdefault(end, {})
+        capacity[start][end] = capacity[start].get(end, 0) + cap
+        capacity[end].setdefault(start, 0)
+
+    total = 0
+    for ii, (first, second, weight) in enumerate(edges):
+        if weight > 0:
+            project = ('edge', ii)
+            link(source, project, weight)
+            link(project, ('node', first), float('inf'))
+            link(project, ('node', second), float('inf'))
+            total += weight
+    for node, weight in node_weights.items():
+        if weight > 0:
+            link(source, ('node', node), weight)
+            total += weight
+        elif weight < 0:
+            link(('node', node), sink, -weight)
+    if source not in capacity:
+        return frozenset(), 0
+    capacity.setdefault(sink, {})
+    cut = _max_flow(capacity, source, sink)
+    reached = _reachable(capacity, source)
+    chosen = frozenset([node[1] for node in reached if node[0] == 'node'])
+    return chosen, total - cut
+
+
+def _max_flow(capacity, source, sink):
+    """Edmonds-Karp maximum flow. capacity is a dict of dicts of residual capacities, updated in place."""
+    flow = 0
+    while True:
+        parents = {source: None}
+        queue = deque([source])
+        while queue and sink not in parents:
+            node = queue.popleft()
+            for other, cap in capacity[node].items():
+                if cap > 0 and other not in parents:
+                    parents[other] = node
+                    queue.append(other)
+        if sink not in parents:
+            return flow
+        path = []
+        node = sink
+        while parents[node] is not None:
+            path.append((parents[node], node))
+            node = parents[node]
+        push = min([capacity[start][end] for start, end in path])
+        for start, end in path:
+            capacity[start][end] -= push
+            capacity[end][start] += push
+        flow += push
+
+
+def _reachable(capacity, source):
+    """Nodes reachable from source through residual capacity."""
+    reached = set([source])
+    queue = deque([source])
+    while queue:
+        node = queue.popleft()
+        for other, cap in capacity[node].items():
+            if cap > 0 and other not in reached:
+                reached.add(other)
+                queue.append(other)
+    return reached
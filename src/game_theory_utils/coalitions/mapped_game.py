@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+from array import array
+from math import factorial
+from operator import gt, mul, sub
+import os
+
+from game_theory_utils.util.maskutil import mask_bits
+from game_theory_utils.util.tablefile import (create_table_file, map_table_file, read_table_header, read_checkpoint,
+                                              write_checkpoint, remove_checkpoint)
+from game_theory_utils.coalitions.coalition import CoalitionalGame
+
+"""Coalitional games whose value table is a memory mapped file, for games too big to hold in memory
+   (a table of doubles for 32 players is 32 GB). The sweeps over the table work through contiguous ranges of
+   masks a chunk at a time, so the operating system can stream the file through the page cache. Comparing a
+   coalition with the coalition without one player reads the same chunk (for low bits) or one earlier range
+   of the file (for high bits), never scattered entries.
+   After each chunk a sweep saves its progress and partial results to a checkpoint file next to the table,
+   and a sweep that is started again after a crash or restart carries on from the checkpoint."""
+
+__all__ = ('MappedCoalitionalGame', 'create_mapped_game', 'create_mapped_game_from_values', 'open_mapped_game',
+           'check_chunk_size')
+
+class MappedCoalitionalGame(CoalitionalGame):
+    """A CoalitionalGame whose table is a memory mapped file (see util.tablefile). The header of the
+       file holds the player order, so players must be plain python values (numbers, strings, tuples).
+       Shapley and banzhaf values, the monotonic check and filling in missing values run as chunked sweeps
+       of chunk_size masks; other analyses index the mapped table like an in memory one."""
+
+    def __init__(self, path, writable=False):
+        self.path = path
+        self.checkpoint_path = path + '.checkpoint'
+        self.chunk_size = 1 << 20
+        self.header, self._mapped, self.table = map_table_file(path, writable=writable)
+        if self.header.get('kind') != 'coalitional':
+            raise ValueError('{} does not hold a coalitional game'.format(path))
+        self.isCost = self.header.get('isCost', False)
+        self.verbose = False
+        self.shapley_totals = None
+        self.swing_counts = None
+        self._set_table(self.header['players'], self.table)
+
+    def close(self):
+        """Release the mapped file."""
+        self.table.release()
+        self._mapped.close()
+
+    def flush(self):
+        """Write changes to the table out to the file."""
+        self._mapped.flush()
+
+    def get_chunk_size(self):
+        check_chunk_size(self.chunk_size)
+        return min(self.chunk_size, len(self.table))
+
+    def sweep(self, name, state, step):
+        """Call step(lo, hi, vals, state) for each chunk of masks lo to hi in increasing order, vals being a
+           list of the chunk's values. step returns (state, done); done stops the sweep early. state must be
+           a plain python value; it is saved with the progress in the checkpoint after each chunk, and if a
+           checkpoint for a sweep of the same name exists the sweep resumes from it, with the chunk size it was
+           saved with. Returns the final state."""
+        start = 0
+        chunk = self.get_chunk_size()
+        checkpoint = read_checkpoint(self.checkpoint_path)
+        if checkpoint is not None and checkpoint['sweep'] == name and 'chunk' in checkpoint:
+            # carry on with the chunk size the sweep started with, so the chunks stay aligned
+            start = checkpoint['next']
+            state = checkpoint['state']
+            chunk = checkpoint['chunk']
+        for lo in range(start, len(self.table), chunk):
+            hi = lo + chunk
+            state, done = step(lo, hi, self.table[lo:hi].tolist(), state)
+            if done:
+                break
+            if hi < len(self.table):
+                if not self.table.readonly:
+                    self.flush()
+                write_checkpoint(self.checkpoint_path,
+                                 {'sweep': name, 'next': hi, 'chunk': chunk, 'state': state})
+        if not self.table.readonly:
+            self.flush()
+        remove_checkpoint(self.checkpoint_path)
+        return state
+
+    def _neighbours(self, vals, lo, hi, bit):
+        """For a chunk of masks lo to hi with values vals, yield (upper, lower) where upper is a slice of the
+           chunk selecting masks with bit set and lower is a list of the values of those masks without bit.
+           Chunks are aligned powers of two, so for a bit at least as big as the chunk either the whole chunk
+           has the bit or none of it does."""
+        size = hi - lo
+        if bit >= size:
+            if lo & bit:
+                yield slice(0, size), self.table[lo - bit:hi - bit].tolist()
+        elif bit <= size // (2 * bit):
+            for offset in range(bit):
+                yield slice(bit + offset, None, 2 * bit), vals[offset::2 * bit]
+        else:
+            for base in range(0, size, 2 * bit):
+                yield slice(base + bit, base + 2 * bit), vals[base:base + bit]
+
+    def fill_coalition_values(self, known=None):
+        """Fill in missing values, marked by NaN, with the highest value of the coalitions with one less
+           player, in one sweep. The empty coalition defaults to zero."""
+        if self.table.format != 'd':
+            return
+        def step(lo, hi, vals, state):
+            missing = [pos for pos, val in enumerate(vals) if val != val]
+            for pos in missing:
+                mask = lo + pos
+                max_ = None
+                for _, bit in mask_bits(mask):
+                    val = vals[pos - bit] if bit <= pos else self.table[mask ^ bit]
+                    if max_ is None or val > max_:
+                        max_ = val
+                vals[pos] = 0 if max_ is None else max_
+            if missing:
+                self.table[lo:hi] = array('d', vals)
+            return state, False
+        self.sweep('fill', None, step)
+
+    def _subset_shapley_values(self):
+        """Exact shapley values from one chunked sweep, adding the weighted marginal contribution of each
+           player to each coalition without it."""
+        nplayers = len(self.player_order)
+        weights = [factorial(size) * factorial(nplayers - size - 1) for size in range(nplayers)]
+        def step(lo, hi, vals, totals):
+            # weight of each mask less one player; mask zero has no players so its weight is never used
+            lower_weights = [weights[size - 1] for size in map(int.bit_count, range(lo, hi))]
+            for ii in range(nplayers):
+                for upper, lower in self._neighbours(vals, lo, hi, 1 << ii):
+                    totals[ii] += sum(map(mul, lower_weights[upper], map(sub, vals[upper], lower)))
+            return totals, False
+        totals = self.sweep('shapley', [0] * nplayers, step)
+        perms = factorial(nplayers)
+        return {player:totals[ii] / perms for ii, player in enumerate(self.player_order)}
+
+    def get_banzhaf_values(self):
+        """Get the banzhaf values, counting swings in one chunked sweep unless incremental analysis is on."""
+        if self.swing_counts is not None:
+            return super().get_banzhaf_values()
+        nplayers = len(self.player_order)
+        def step(lo, hi, vals, bcounts):
+            for ii in range(nplayers):
+                for upper, lower in self._neighbours(vals, lo, hi, 1 << ii):
+                    bcounts[ii] += sum(map(gt, map(bool, vals[upper]), map(bool, lower)))
+            return bcounts, False
+        bcounts = self.sweep('banzhaf', [0] * nplayers, step)
+        total = sum(bcounts)
+        return {player:bcounts[ii] / total if bcounts[ii] else 0 for ii, player in enumerate(self.player_order)}
+
+    def get_is_monotonic(self):
+        """A game is monotonics if the value of a coalition is ≥ the value of its subcoalitions."""
+        nplayers = len(self.player_order)
+        def step(lo, hi, vals, monotonic):
+            for ii in range(nplayers):
+                for upper, lower in self._neighbours(vals, lo, hi, 1 << ii):
+                    if any(map(gt, lower, vals[upper])):
+                        return False, True
+            return monotonic, False
+        return self.sweep('monotonic', True, step)
+
+
+def check_chunk_size(chunk_size):
+    """Raise ValueError unless chunk_size is a power of two. The sweeps rely on every chunk being aligned to
+       its size, so the masks with a bit either fill the chunk or come in regular runs within it."""
+    if not isinstance(chunk_size, int) or chunk_size < 1 or chunk_size & (chunk_size - 1):
+        raise ValueError('chunk_size must be a power of two, not {}'.format(chunk_size))
+
+
+def create_mapped_game(path, players, coalition_valuation, isCost=False, typecode='d', chunk_size=1 << 20):
+    """Create a game in a table file at path by valuing every coalition of players, a chunk of masks at a
+       time. The valuation is used as in create_game_from_valuation: evaluate_masks(players, masks) if it
+       has it, otherwise it is called with a tuple of (player, 0 or 1). If an earlier run was interrupted
+       the file and its checkpoint are reused, and valuation carries on from the last complete chunk; any other
+       file or checkpoint at path is replaced.
+       Returns the game, open for writing."""
+    check_chunk_size(chunk_size)
+    players = list(players)
+    if not _can_resume(path, 'values', players, typecode):
+        remove_checkpoint(path + '.checkpoint')
+        header = {'kind': 'coalitional', 'players': players, 'isCost': isCost}
+        create_table_file(path, header, typecode, 1 << len(players))
+    game = MappedCoalitionalGame(path, writable=True)
+    game.chunk_size = chunk_size
+    def step(lo, hi, vals, state):
+        masks = range(lo, hi)
+        if hasattr(coalition_valuation, 'evaluate_masks'):
+            values = coalition_valuation.evaluate_masks(players, masks)
+        else:
+            values = [coalition_valuation(tuple([(player, mask >> ii & 1) for ii, player in enumerate(players)]))
+                      for mask in masks]
+        game.table[lo:hi] = array(typecode, values)
+        return state, False
+    game.sweep('values', None, step)
+    return game
+
+
+def create_mapped_game_from_values(path, coalition_values, isCost=False, chunk_size=1 << 20):
+    """Create a game in a table file at path from a dict of coalition values, as CoalitionalGame does:
+       coalitions not given get the highest value of the coalitions with one less player. If an earlier run
+       was interrupted while filling them in, it carries on from its checkpoint. Returns the game, open for
+       writing."""
+    check_chunk_size(chunk_size)
+    players = list(dict.fromkeys([player for key in coalition_values for player in key]))
+    if not _can_resume(path, 'fill', players, 'd'):
+        remove_checkpoint(path + '.checkpoint')
+        header = {'kind': 'coalitional', 'players': players, 'isCost': isCost}
+        create_table_file(path, header, 'd', 1 << len(players), fill=float('nan'), chunk_size=chunk_size)
+    game = MappedCoalitionalGame(path, writable=True)
+    game.chunk_size = chunk_size
+    for key in coalition_values:
+        game.table[game.get_mask(key)] = coalition_values[key]
+    game.fill_coalition_values()
+    return game
+
+
+def _can_resume(path, sweep, players, typecode):
+    """True if path holds the table of an interrupted run creating the same game: there is a checkpoint of
+       the given sweep and the file has the same players and typecode."""
+    checkpoint = read_checkpoint(path + '.checkpoint')
+    if checkpoint is None or checkpoint['sweep'] != sweep or not os.path.exists(path):
+        return False
+    try:
+        with open(path, 'rb') as fobj:
+            header, _ = read_table_header(fobj)
+    except ValueError:
+        return False
+    return (header.get('kind') == 'coalitional' and header.get('players') == players
+            and header.get('typecode') == typecode)
+
+
+def open_mapped_game(path, writable=False):
+    """Open a game saved in a table file."""
+    return MappedCoalitionalGame(path, writable=writable)
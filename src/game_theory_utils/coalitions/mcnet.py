@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+from math import comb
+
+from game_theory_utils.coalitions.coalition import create_game_from_valuation
+
+"""Marginal contribution nets (Ieong and Shoham). A game is described by rules, each a conjunction of
+   players who must be present and players who must be absent, with a value. The value of a coalition
+   is the sum of the values of the rules it satisfies. Since shapley and banzhaf values are linear in the
+   game and each rule is a simple game on its own players, the values of a game come from a closed form per
+   rule: with p present and q absent players, and v the value of the rule, a present player gets
+   v (p-1)! q! / (p+q)! and an absent one -v p! (q-1)! / (p+q)!. The work is proportional to the total size
+   of the rules and no coalitions are enumerated, so games with hundreds of players are practical."""
+
+__all__ = ('MCNetGame', 'create_mcnet_game_from_dividends')
+
+class MCNetGame:
+    """A coalitional game given by marginal contribution net rules.
+       rules is a sequence of (positive, negative, value) where positive is an iterable of the players
+       who must be in a coalition and negative of those who must not be for the rule to apply.
+       players gives every player, including any not in a rule; by default it is the players in the rules
+       in order of first appearance."""
+
+    def __init__(self, rules, players=None):
+        self.rules = []
+        seen = {} # players in order of first appearance
+        for positive, negative, value in rules:
+            positive = list(positive)
+            negative = list(negative)
+            seen.update(dict.fromkeys(positive + negative))
+            positive = frozenset(positive)
+            negative = frozenset(negative)
+            if positive & negative:
+                raise ValueError('players {} are both required and excluded'.format(sorted(positive & negative)))
+            self.rules.append((positive, negative, value))
+        if players is None:
+            players = seen
+        self.player_order = list(players)
+        self.players = set(self.player_order)
+        if any(not (positive | negative) <= self.players for positive, negative, _ in self.rules):
+            raise ValueError('rules have players that are not in the game')
+        self.verbose = False
+
+    def get_value(self, coalition):
+        """Value of a coalition given as an iterable of players."""
+        coalition = set(coalition)
+        return sum([value for positive, negative, value in self.rules
+                    if positive <= coalition and not negative & coalition])
+
+    def __call__(self, player_counts):
+        """Coalition valuation: player_counts is a dict or tuple of (player, count) pairs, with a count of
+           1 for the members."""
+        if isinstance(player_counts, dict):
+            player_counts = player_counts.items()
+        return self.get_value([player for player, count in player_counts if count])
+
+    def evaluate_masks(self, players, masks):
+        """Batched valuation of coalitions given as masks over players."""
+        bits = {player:1 << ii for ii, player in enumerate(players)}
+        rules = [(sum([bits[player] for player in positive]), sum([bits[player] for player in negative]), value)
+                 for positive, negative, value in self.rules]
+        return [sum([value for positive, negative, value in rules
+                     if mask & positive == positive and not mask & negative]) for mask in masks]
+
+    def get_shapley_values(self):
+        """Get the shapley values, summing the closed form for each rule."""
+        shapley = {player:0 for player in self.player_order}
+        for positive, negative, value in self.rules:
+            npos = len(positive)
+            nneg = len(negative)
+            if npos:
+                # (p-1)! q! / (p+q)! = 1 / (p C(p+q, p))
+                share = value / (npos * comb(npos + nneg, npos))
+                for player in positive:
+                    shapley[player] += share
+            if nneg:
+                share = value / (nneg * comb(npos + nneg, nneg))
+                for player in negative:
+                    shapley[player] -= share
+        return shapley
+
+    def get_raw_banzhaf_values(self):
+        """Get the (unnormalized) banzhaf values, the average marginal contribution of each player over the
+           coalitions of the others. A player of a rule with p + q players swings it in 1 of 2^(p+q-1)
+           coalitions of the other players of the rule."""
+        banzhaf = {player:0 for player in self.player_order}
+        for positive, negative, value in self.rules:
+            size = len(positive) + len(negative)
+            if size:
+                share = value / 2 ** (size - 1)
+                for player in positive:
+                    banzhaf[player] += share
+                for player in negative:
+                    banzhaf[player] -= share
+        return banzhaf
+
+    def get_normalized_banzhaf_values(self):
+        """Get the raw banzhaf values divided by the sum of their absolute values.
+           When every rule has only present players and a positive value and the game is simple, each marginal
+           contribution is 0 or 1, so these are the swing counts normalized to sum to one, the same as
+           get_banzhaf_values of the expanded game. Otherwise they differ: the expanded game counts only the
+           coalitions a player takes from zero to a nonzero value, which needs every coalition, while a raw
+           value is the average gain less the average loss. A player who is absent from rules loses value by
+           joining, so its raw value, and its share here, can be negative; the absolute shares sum to one."""
+        raw = self.get_raw_banzhaf_values()
+        total = sum([abs(val) for val in raw.values()])
+        if not total:
+            return {player:0 for player in raw}
+        return {player:raw[player] / total for player in raw}
+
+    def get_coalitional_game(self):
+        """Expand to a CoalitionalGame. This enumerates every coalition so is only practical for small games."""
+        return create_game_from_valuation(self.player_order, self)
+
+
+def create_mcnet_game_from_dividends(dividends, players=None):
+    """Create an MCNetGame from a dict of harsanyi dividends keyed by coalitions (iterables of players),
+       with a rule requiring the members of each coalition."""
+    rules = [(key, (), dividends[key]) for key in dividends]
+    return MCNetGame(rules, players=players)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+from operator import mul
+
+from game_theory_utils.util.maskutil import subset_sums
+from game_theory_utils.util.radixutil import lattice_sums
+from game_theory_utils.coalitions.semivalue import semivalue_weights, lattice_marginal_sums
+
+"""The Owen value of a game with a coalition structure, a partition of the players into a priori unions
+   such as voting blocs. It is the average marginal contribution over the orderings that keep the members of
+   each union together, or equivalently the shapley value of a two level game: player i of union k gets
+   sum over sets T of the other members of k of w_u(|T|) (W_k(T ∪ {i}) - W_k(T)), where
+   W_k(X) = sum over sets R of the other unions of w_m(|R|) v(Q_R ∪ X), Q_R is the coalition of all the
+   members of the unions in R, m is the number of unions, u the size of union k and w_n(s) = s!(n-s-1)!/n!.
+   So each union costs 2^(m-1) * 2^u values, which for a few unions of many players, or many unions of a few,
+   is far less than the 2^n coalitions, and the orderings are never enumerated.
+   The values are found through the index of each coalition in a flat table (see radixutil), so a typed game,
+   whose unions are sets of types, uses the same sums with the inner game a typed lattice. For large
+   partitions the sampling strategy 'unions' in sampling.py draws the orderings instead."""
+
+__all__ = ('owen_values', 'union_indexes')
+
+def owen_values(table, strides, counts, unions):
+    """Owen values of a game whose values are in a flat table. strides gives the index stride of each type
+       (1 << bit for a table indexed by coalition mask), counts the number of players of each type (1 for
+       distinct players) and unions a list of lists of type indexes partitioning them, as from
+       union_indexes. Returns a list with the value of one player of each type."""
+    outer, outer_denominator = semivalue_weights('shapley', len(unions))
+    full = [sum([counts[ii] * strides[ii] for ii in union]) for union in unions]
+    values = [0] * len(counts)
+    for kk, union in enumerate(unions):
+        offsets = subset_sums(full[:kk] + full[kk + 1:]) # index of the coalition of each set of other unions
+        inner_counts = [counts[ii] for ii in union]
+        inner = lattice_sums([strides[ii] for ii in union], inner_counts)
+        quotient = [0] * len(inner) # W_k, times m!
+        for others, offset in enumerate(offsets):
+            weight = outer[others.bit_count()]
+            quotient = [acc + weight * table[offset + index] for acc, index in zip(quotient, inner)]
+        inner_weights, inner_denominator = semivalue_weights('shapley', sum(inner_counts))
+        for ii, row in zip(union, lattice_marginal_sums(quotient, inner_counts)):
+            values[ii] = sum(map(mul, inner_weights, row)) / (outer_denominator * inner_denominator)
+    return values
+
+def union_indexes(unions, positions):
+    """Turn unions given as iterables of players (or types) into lists of their positions, positions being
+       a dict giving the position of each. Raises ValueError unless the unions partition the players."""
+    seen = set()
+    indexes = []
+    for union in unions:
+        members = []
+        for member in union:
+            if member not in positions:
+                raise ValueError('{} in a union is not a player'.format(member))
+            if member in seen:
+                raise ValueError('{} is in more than one union'.format(member))
+            seen.add(member)
+            members.append(positions[member])
+        indexes.append(members)
+    if len(seen) != len(positions):
+        raise ValueError('not in any union: {}'.format([member for member in positions if member not in seen]))
+    return indexes
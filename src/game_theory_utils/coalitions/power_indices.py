@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+from math import comb, prod
+
+from game_theory_utils.util.bitsetutil import (BitsetTable, pack_bits, bit_positions, digit_mask, swing_bits,
+                                               bit_sliced_counts, count_equals)
+from game_theory_utils.util.radixutil import radix_strides, decode_index
+
+"""Power indices of simple games beyond Shapley-Shubik, all from the swings of one pass.
+   Player i is critical in a winning coalition S if S without i loses. The swing counts behind the banzhaf
+   index also give
+   - coleman: the power to prevent action, swings_i / |W|, and to initiate it, swings_i / |L|, where W and L
+     are the winning and losing coalitions.
+   - johnston: each winning coalition with a critical player (a vulnerable coalition) is shared equally by
+     its critical players, summed and divided by the number of vulnerable coalitions.
+   - deegan_packel: each minimal winning coalition, one where every member is critical, is shared equally by
+     its members, summed and divided by the number of minimal winning coalitions.
+   - holler_packel (the public good index): the number of minimal winning coalitions holding a player,
+     normalized to sum to one over the players.
+   For a game given by a table indexed by coalition mask the swings of each player are a bitset (see
+   bitsetutil), and adding the bitsets bit sliced gives the number of critical players of every coalition at
+   once, so all the indices come from whole table bit operations. For a typed game each point of the lattice
+   stands for prod C(c_t, k_t) coalitions, which are counted with that multiplier and never expanded. Weighted
+   voting games fill in the same counts from a pruned search (see weighted_voting.voting_power_indices).
+   Values are per player, or per player of each type, like the banzhaf values."""
+
+__all__ = ('POWER_INDICES', 'SwingCounts', 'mask_power_indices', 'lattice_power_indices', 'lattice_ways')
+
+POWER_INDICES = ('banzhaf', 'coleman_prevent', 'coleman_initiate', 'johnston', 'deegan_packel', 'holler_packel')
+
+def mask_power_indices(table, nplayers):
+    """Power indices of a simple game whose values are in a table indexed by coalition mask (a BitsetTable
+       or any table of zeros and ones). Returns a dict keyed by index name of a list with the value of each
+       player in bit order."""
+    size = len(table)
+    bits = table.to_int() if isinstance(table, BitsetTable) else pack_bits(table)
+    swings = [swing_bits(bits, size, 1 << ii) for ii in range(nplayers)]
+    critical = bit_sliced_counts(swings)
+    sizes = bit_sliced_counts([digit_mask(size, 1 << ii, 1) for ii in range(nplayers)])
+    by_critical = [count_equals(critical, count, size) for count in range(nplayers + 1)]
+    by_size = [count_equals(sizes, count, size) for count in range(nplayers + 1)]
+    minimal = 0 # every member critical
+    for count in range(1, nplayers + 1):
+        minimal |= by_critical[count] & by_size[count]
+    raw = SwingCounts(nplayers)
+    raw.winning = bits.bit_count()
+    raw.vulnerable = size - by_critical[0].bit_count()
+    raw.minimal = minimal.bit_count()
+    for ii, swing in enumerate(swings):
+        raw.swings[ii] = swing.bit_count()
+        raw.johnston[ii] = sum([(swing & by_critical[count]).bit_count() / count
+                                for count in range(1, nplayers + 1)])
+        held = swing & minimal
+        raw.holler[ii] = held.bit_count()
+        raw.deegan[ii] = sum([(held & by_size[count]).bit_count() / count for count in range(1, nplayers + 1)])
+    return raw.indices([1] * nplayers)
+
+def lattice_power_indices(table, counts):
+    """Power indices of a typed simple game whose values are in a table in mixed radix index order (see
+       radixutil). Returns a dict keyed by index name of a list with the value of one player of each type."""
+    size = len(table)
+    strides = radix_strides(counts)
+    bits = pack_bits(table)
+    swings = [swing_bits(bits, size, stride, count) for stride, count in zip(strides, counts)]
+    vulnerable = 0
+    for swing in swings:
+        vulnerable |= swing
+    swings = [BitsetTable.from_int(size, swing) for swing in swings]
+    raw = SwingCounts(len(counts))
+    raw.winning = sum([lattice_ways(counts, decode_index(index, counts)) for index in bit_positions(bits)])
+    for index in bit_positions(vulnerable):
+        raw.add(counts, decode_index(index, counts), [swing[index] for swing in swings])
+    return raw.indices(counts)
+
+class SwingCounts:
+    """The counts and sums behind the power indices, per player of each type (or per player, with counts of
+       one), collected coalition by coalition with add() or filled in directly, then normalized by
+       indices()."""
+
+    def __init__(self, ntypes):
+        self.winning = 0
+        self.vulnerable = 0
+        self.minimal = 0
+        self.swings = [0] * ntypes
+        self.johnston = [0] * ntypes
+        self.deegan = [0] * ntypes
+        self.holler = [0] * ntypes
+
+    def add(self, counts, digits, critical, ways=None):
+        """Add the coalitions with the given counts, flagged with the types whose players are critical.
+           ways is their number, lattice_ways(counts, digits), if the caller already has it."""
+        ncritical = sum([digit for digit, flag in zip(digits, critical) if flag])
+        if not ncritical:
+            return
+        if ways is None:
+            ways = lattice_ways(counts, digits)
+        self.vulnerable += ways
+        is_minimal = ncritical == sum(digits)
+        if is_minimal:
+            self.minimal += ways
+        for ii, flag in enumerate(critical):
+            if flag:
+                held = ways * digits[ii] // counts[ii] # coalitions holding one given player of the type
+                self.swings[ii] += held
+                self.johnston[ii] += held / ncritical
+                if is_minimal:
+                    self.holler[ii] += held
+                    self.deegan[ii] += held / ncritical
+
+    def indices(self, counts):
+        """The indices, normalized with counts giving the number of players of each type."""
+        losing = 2 ** sum(counts) - self.winning
+        swing_total = sum([swings * count for swings, count in zip(self.swings, counts)])
+        holler_total = sum([held * count for held, count in zip(self.holler, counts)])
+        return {'banzhaf': _divide(self.swings, swing_total),
+                'coleman_prevent': _divide(self.swings, self.winning),
+                'coleman_initiate': _divide(self.swings, losing),
+                'johnston': _divide(self.johnston, self.vulnerable),
+                'deegan_packel': _divide(self.deegan, self.minimal),
+                'holler_packel': _divide(self.holler, holler_total)}
+
+
+def _divide(values, total):
+    return [val / total if total else 0 for val in values]
+
+def lattice_ways(counts, digits):
+    """Number of coalitions with the given count of each type, prod C(c_t, k_t)."""
+    return prod([comb(count, digit) for count, digit in zip(counts, digits)])
@@ -0,0 +1,348 @@
+#!/usr/bin/env python
+from math import sqrt
+import multiprocessing
+import random
+from statistics import NormalDist
+import time
+
+from game_theory_utils.coalitions.owen import union_indexes
+
+"""Monte Carlo estimation of shapley values.
+   Several sampling strategies are available (see SAMPLING_STRATEGIES); the variance reduced ones give
+   the same accuracy with far fewer valuations on most games. A game is sampled through a SamplingTarget,
+   which knows how to build a coalition up one player at a time. Permutations are drawn in batches, each
+   batch from its own random stream seeded from the base seed and the batch number, so the estimate for a
+   given seed and number of permutations does not depend on how many processes were used. Batches can be
+   spread over a pool of worker processes.
+   A running mean and variance is kept for each player type so sampling can stop once the standard
+   error is small enough or a time budget is used up."""
+
+__all__ = ('SamplingTarget', 'ShapleyEstimate', 'RunningStats', 'estimate_shapley_values',
+           'typed_sampling_target', 'SAMPLING_STRATEGIES')
+
+class SamplingTarget:
+    """Describes how to build coalitions of a game for sampling.
+       labels gives the player type of each player slot; players of the same type share an estimate.
+       start is the state for the empty coalition, add(state, slot) returns the state with the player in
+       that slot added, and value(state) gives the value of the coalition."""
+
+    def __init__(self, labels, start, add, value):
+        self.labels = list(labels)
+        self.start = start
+        self.add = add
+        self.value = value
+        self.unions = None
+
+    def set_unions(self, unions):
+        """Set a coalition structure for the 'unions' strategy: unions is an iterable of iterables of labels
+           partitioning them, and each union holds every slot with one of its labels."""
+        types = self.get_types()
+        union_types = union_indexes(unions, {type_:ii for ii, type_ in enumerate(types)})
+        self.unions = [[slot for slot, label in enumerate(self.labels) if label in members]
+                       for members in [{types[ii] for ii in union} for union in union_types]]
+
+    def get_types(self):
+        """Distinct labels in order of first appearance."""
+        return list(dict.fromkeys(self.labels))
+
+    def permutation_marginals(self, order):
+        """Yield (slot, marginal contribution) for the players added in the order given."""
+        state = self.start
+        old = self.value(state)
+        for slot in order:
+            state = self.add(state, slot)
+            new = self.value(state)
+            yield slot, new - old
+            old = new
+
+
+def typed_sampling_target(player_types, coalition_valuation):
+    """SamplingTarget for a typed game. The state is a tuple of counts in sorted type order and
+       coalition_valuation is called with the usual counts tuple, e.g. (('a', 1), ('b', 0))."""
+    types = sorted(player_types)
+    type_index = {type_:ii for ii, type_ in enumerate(types)}
+    labels = [type_ for type_ in types for _ in range(player_types[type_])]
+    slot_index = [type_index[type_] for type_ in labels]
+
+    def add(state, slot):
+        ii = slot_index[slot]
+        return state[:ii] + (state[ii] + 1,) + state[ii + 1:]
+
+    value = lambda state: coalition_valuation(tuple(zip(types, state)))
+    return SamplingTarget(labels, (0,) * len(types), add, value)
+
+
+class RunningStats:
+    """Running count, mean and sum of squared deviations (Welford), mergeable across batches."""
+
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, val):
+        self.count += 1
+        delta = val - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (val - self.mean)
+
+    def merge(self, other):
+        """Combine with the stats of another batch (Chan et al.)."""
+        if not other.count:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+
+    def get_variance(self):
+        """Sample variance, None until there are two samples."""
+        if self.count < 2:
+            return None
+        return self.m2 / (self.count - 1)
+
+    def get_stderr(self):
+        """Standard error of the mean, None until there are two samples."""
+        variance = self.get_variance()
+        if variance is None:
+            return None
+        return sqrt(variance / self.count)
+
+
+class ShapleyEstimate:
+    """Result of a sampling run. values, stderrs and intervals are dicts keyed by player type;
+       intervals gives the (low, high) normal confidence interval at the given confidence level.
+       samples is the number of samples used and evaluations the number of coalition valuations made.
+       variances gives the variance of a single sample, so variance times evaluations / samples
+       compares how efficient different strategies are."""
+
+    def __init__(self, stats, samples, confidence, evaluations=None):
+        self.samples = samples
+        self.evaluations = evaluations
+        self.confidence = confidence
+        self.values = {type_:stats[type_].mean for type_ in stats}
+        self.variances = {type_:stats[type_].get_variance() for type_ in stats}
+        self.stderrs = {type_:stats[type_].get_stderr() for type_ in stats}
+        zval = NormalDist().inv_cdf((1 + confidence) / 2)
+        self.intervals = {}
+        for type_ in stats:
+            stderr = self.stderrs[type_]
+            if stderr is None:
+                self.intervals[type_] = None
+            else:
+                self.intervals[type_] = (self.values[type_] - zval * stderr, self.values[type_] + zval * stderr)
+
+    def get_max_stderr(self):
+        """Largest standard error over the player types, None if not yet known."""
+        stderrs = list(self.stderrs.values())
+        if not stderrs or None in stderrs:
+            return None
+        return max(stderrs)
+
+
+def _type_sizes(target):
+    return {type_:target.labels.count(type_) for type_ in target.get_types()}
+
+def _representatives(target):
+    """First slot of each type. Players of a type are interchangeable so one of them is enough to sample."""
+    slots = {}
+    for slot, type_ in enumerate(target.labels):
+        slots.setdefault(type_, slot)
+    return slots
+
+def sample_permutations(target, nsamples, rng):
+    """Draw nsamples random permutations. Each permutation gives one sample for each type: the mean
+       marginal contribution of the players of that type. Returns a dict of RunningStats keyed by type
+       and the number of valuations made."""
+    types = target.get_types()
+    stats = {type_:RunningStats() for type_ in types}
+    type_sizes = _type_sizes(target)
+    order = list(range(len(target.labels)))
+    for _ in range(nsamples):
+        rng.shuffle(order)
+        totals = dict.fromkeys(types, 0)
+        for slot, marginal in target.permutation_marginals(order):
+            totals[target.labels[slot]] += marginal
+        for type_ in types:
+            stats[type_].add(totals[type_] / type_sizes[type_])
+    return stats, nsamples * (len(order) + 1)
+
+def sample_antithetic(target, nsamples, rng):
+    """Like sample_permutations, but each sample averages a random permutation and its reverse.
+       The two are negatively correlated (players early in one are late in the other)."""
+    types = target.get_types()
+    stats = {type_:RunningStats() for type_ in types}
+    type_sizes = _type_sizes(target)
+    order = list(range(len(target.labels)))
+    for _ in range(nsamples):
+        rng.shuffle(order)
+        totals = dict.fromkeys(types, 0)
+        for sequence in (order, order[::-1]):
+            for slot, marginal in target.permutation_marginals(sequence):
+                totals[target.labels[slot]] += marginal
+        for type_ in types:
+            stats[type_].add(totals[type_] / (2 * type_sizes[type_]))
+    return stats, nsamples * 2 * (len(order) + 1)
+
+def sample_stratified(target, nsamples, rng):
+    """Stratify by the position at which the player joins. Each sample visits every position once: the
+       other players are put in a random order and the player is added after each prefix, so the sample is
+       the mean over positions of the marginal contribution at that position."""
+    types = target.get_types()
+    stats = {type_:RunningStats() for type_ in types}
+    nslots = len(target.labels)
+    evaluations = 0
+    for _ in range(nsamples):
+        for type_, rep in _representatives(target).items():
+            others = [slot for slot in range(nslots) if slot != rep]
+            rng.shuffle(others)
+            state = target.start
+            total = 0
+            for position in range(nslots):
+                total += target.value(target.add(state, rep)) - target.value(state)
+                if position < len(others):
+                    state = target.add(state, others[position])
+            stats[type_].add(total / nslots)
+            evaluations += 2 * nslots
+    return stats, evaluations
+
+def sample_owen(target, nsamples, rng, points=None):
+    """Owen's multilinear extension sampling. The shapley value is the integral over q in [0, 1] of the
+       expected marginal contribution to a coalition in which every other player is included with
+       probability q. Each sample takes one jittered q from each of points equal strata of [0, 1] (by
+       default one per player) and averages the marginal contributions."""
+    types = target.get_types()
+    stats = {type_:RunningStats() for type_ in types}
+    nslots = len(target.labels)
+    if points is None:
+        points = nslots
+    evaluations = 0
+    for _ in range(nsamples):
+        for type_, rep in _representatives(target).items():
+            total = 0
+            for point in range(points):
+                prob = (point + rng.random()) / points
+                state = target.start
+                for slot in range(nslots):
+                    if slot != rep and rng.random() < prob:
+                        state = target.add(state, slot)
+                total += target.value(target.add(state, rep)) - target.value(state)
+            stats[type_].add(total / points)
+            evaluations += 2 * points
+    return stats, evaluations
+
+def sample_unions(target, nsamples, rng):
+    """Like sample_permutations, but only the orderings that keep the members of each of the target's unions
+       together: the unions in a random order, and the members of each in a random order. The mean is the
+       Owen value of the coalition structure (see owen.py) rather than the shapley value."""
+    if target.unions is None:
+        raise ValueError('the unions strategy needs a target with unions set')
+    types = target.get_types()
+    stats = {type_:RunningStats() for type_ in types}
+    type_sizes = _type_sizes(target)
+    unions = [list(union) for union in target.unions]
+    for _ in range(nsamples):
+        rng.shuffle(unions)
+        order = []
+        for union in unions:
+            rng.shuffle(union)
+            order.extend(union)
+        totals = dict.fromkeys(types, 0)
+        for slot, marginal in target.permutation_marginals(order):
+            totals[target.labels[slot]] += marginal
+        for type_ in types:
+            stats[type_].add(totals[type_] / type_sizes[type_])
+    return stats, nsamples * (len(target.labels) + 1)
+
+SAMPLING_STRATEGIES = {
+    'permutation': sample_permutations,
+    'antithetic': sample_antithetic,
+    'stratified': sample_stratified,
+    'owen': sample_owen,
+    'unions': sample_unions,
+}
+
+_worker_target = None
+
+def _init_worker(target):
+    global _worker_target
+    _worker_target = target
+
+def _run_batch(args):
+    """Run one batch in a worker process. The target is inherited from the parent when the pool forks,
+       so valuation functions do not have to be picklable."""
+    return _batch_result(_worker_target, args)
+
+def _batch_result(target, args):
+    strategy, seed, nsamples = args
+    stats, evaluations = SAMPLING_STRATEGIES[strategy](target, nsamples, random.Random(seed))
+    return {type_:(stats[type_].count, stats[type_].mean, stats[type_].m2) for type_ in stats}, evaluations
+
+def estimate_shapley_values(target, perms=None, target_stderr=None, time_budget=None, processes=1, seed=None,
+                            batch_size=200, confidence=0.95, strategy='permutation'):
+    """Estimate the shapley values of a SamplingTarget by sampling.
+       strategy is one of SAMPLING_STRATEGIES: 'permutation' (uniform random permutations), 'antithetic'
+       (permutation and reverse pairs), 'stratified' (every entry position once per sample), 'owen'
+       (multilinear extension) or 'unions' (orderings keeping the target's unions together, which
+       estimates the Owen value of the coalition structure instead). perms is the number of samples,
+       whatever the strategy; the estimate reports the number of valuations made so strategies can be
+       compared on variance per valuation.
+       Sampling stops after perms samples, when the largest standard error is ≤ target_stderr, or
+       when time_budget seconds have passed, whichever comes first. At least one must be given.
+       If seed is None the base seed is drawn from the random module, so random.seed still gives
+       repeatable results. Returns a ShapleyEstimate.
+       processes > 1 needs the 'fork' start method, since the workers inherit the target rather than
+       having it pickled (its functions are often closures); where there is none, as on Windows,
+       ValueError is raised rather than quietly sampling on one core."""
+    if perms is None and target_stderr is None and time_budget is None:
+        raise ValueError('one of perms, target_stderr or time_budget is required')
+    if strategy not in SAMPLING_STRATEGIES:
+        raise ValueError('unknown sampling strategy {}'.format(strategy))
+    if processes > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+        raise ValueError('processes > 1 needs the fork start method, which this platform does not have')
+    if seed is None:
+        seed = random.getrandbits(64)
+    start = time.monotonic()
+    stats = {type_:RunningStats() for type_ in target.get_types()}
+    samples = 0
+    evaluations = 0
+    batch = 0
+
+    pool = None
+    if processes > 1:
+        pool = multiprocessing.get_context('fork').Pool(processes, initializer=_init_worker, initargs=(target,))
+    else:
+        processes = 1
+    try:
+        while True:
+            jobs = []
+            for _ in range(processes):
+                nsamples = batch_size if perms is None else min(batch_size, perms - samples)
+                if nsamples <= 0:
+                    break
+                jobs.append((strategy, '{}:{}'.format(seed, batch), nsamples))
+                samples += nsamples
+                batch += 1
+            if not jobs:
+                break
+            if pool is None:
+                results = [_batch_result(target, job) for job in jobs]
+            else:
+                results = pool.map(_run_batch, jobs)
+            for result, batch_evaluations in results:
+                evaluations += batch_evaluations
+                for type_ in result:
+                    stats[type_].merge(RunningStats(*result[type_]))
+            estimate = ShapleyEstimate(stats, samples, confidence, evaluations)
+            if target_stderr is not None:
+                max_stderr = estimate.get_max_stderr()
+                if max_stderr is not None and max_stderr <= target_stderr:
+                    break
+            if time_budget is not None and time.monotonic() - start >= time_budget:
+                break
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return ShapleyEstimate(stats, samples, confidence, evaluations)
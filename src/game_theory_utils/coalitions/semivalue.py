@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+from math import comb, exp, factorial, lgamma, prod
+
+from game_theory_utils.util.maskutil import mask_bits
+from game_theory_utils.util.radixutil import lattice_digits
+
+"""Semivalues computed from one sweep over the coalitions.
+   A semivalue gives player i the weighted sum of its marginal contributions, sum over coalitions S of the
+   other players of p_|S| (v(S ∪ {i}) - v(S)), the weight depending only on the size of S. The shapley value
+   has p_s = s!(n-s-1)!/n!, the banzhaf value p_s = 1/2^(n-1), the beta shapley value (Kwon and Zou) with
+   parameters (α, β) p_s = B(s + β, n - 1 - s + α) / B(α, β), which for α = β = 1 is the shapley value and for
+   α > β favours small coalitions, and the weighted banzhaf value with probability q p_s = q^s (1-q)^(n-1-s).
+   Since the weights only depend on size, one sweep collecting the marginal contributions of each player
+   summed by coalition size, D_i(s), is enough for every semivalue: each is then sum_s p_s D_i(s), n
+   multiplications per player. D_i(s) is found from the values of the coalitions holding i summed by size,
+   A_i(k), and the values of all coalitions summed by size, T(k), as A_i(s+1) - (T(s) - A_i(s)), so the sweep
+   only visits the members of coalitions with a nonzero value.
+   A semivalue is given by name: 'shapley', 'banzhaf', ('beta', α, β) or ('weighted_banzhaf', q); or by a
+   sequence giving p_s for each size s from 0 to n-1."""
+
+__all__ = ('SEMIVALUES', 'semivalue_weights', 'mask_marginal_sums', 'lattice_marginal_sums',
+           'semivalues_from_sums')
+
+SEMIVALUES = ('shapley', 'banzhaf', 'beta', 'weighted_banzhaf')
+
+def semivalue_weights(semivalue, nplayers):
+    """Weights of a semivalue for each coalition size from 0 to nplayers-1, as (weights, denominator), with
+       p_s = weights[s] / denominator. The shapley and banzhaf weights are integers, so a game with integer
+       values gets exactly the same values as from the usual formulas."""
+    if isinstance(semivalue, str):
+        semivalue = (semivalue,)
+    if not semivalue or not isinstance(semivalue[0], str):
+        weights = list(semivalue)
+        if len(weights) != nplayers:
+            raise ValueError('semivalue needs a weight for each of {} coalition sizes'.format(nplayers))
+        return weights, 1
+    name = semivalue[0]
+    if name == 'shapley':
+        return [factorial(size) * factorial(nplayers - size - 1) for size in range(nplayers)], factorial(nplayers)
+    if name == 'banzhaf':
+        return [1] * nplayers, 2 ** max(nplayers - 1, 0)
+    if name == 'beta':
+        _, alpha, beta = semivalue
+        if alpha <= 0 or beta <= 0:
+            raise ValueError('beta semivalue parameters must be positive')
+        norm = lgamma(alpha) + lgamma(beta) - lgamma(alpha + beta)
+        return [exp(lgamma(size + beta) + lgamma(nplayers - 1 - size + alpha) - lgamma(nplayers - 1 + alpha + beta)
+                    - norm) for size in range(nplayers)], 1
+    if name == 'weighted_banzhaf':
+        _, prob = semivalue
+        if not 0 <= prob <= 1:
+            raise ValueError('weighted banzhaf probability must be between 0 and 1')
+        return [prob ** size * (1 - prob) ** (nplayers - 1 - size) for size in range(nplayers)], 1
+    raise ValueError('unknown semivalue {}'.format(name))
+
+def mask_marginal_sums(table, nplayers):
+    """For a game whose values are in a table indexed by coalition mask, the marginal contributions of each
+       player to the coalitions of the others, summed by the size of the coalition: sums[i][s]."""
+    holding = [[0] * (nplayers + 1) for _ in range(nplayers)] # A_i(k)
+    by_size = [0] * (nplayers + 1) # T(k)
+    for mask, val in enumerate(table):
+        if val:
+            size = mask.bit_count()
+            by_size[size] += val
+            for ii, _ in mask_bits(mask):
+                holding[ii][size] += val
+    return [_marginal_sums(row, by_size) for row in holding]
+
+def lattice_marginal_sums(table, counts):
+    """For a typed game whose values are in a table in mixed radix index order (see radixutil), the marginal
+       contributions of one player of each type to the coalitions of the other players, summed by size.
+       The coalitions with counts k are prod C(c_i, k_i) coalitions, of which a fraction k_t / c_t hold a
+       given player of type t."""
+    nplayers = sum(counts)
+    holding = [[0] * (nplayers + 1) for _ in counts]
+    by_size = [0] * (nplayers + 1)
+    for val, digits in zip(table, lattice_digits(counts)):
+        if val:
+            size = sum(digits)
+            ways = prod([comb(count, digit) for count, digit in zip(counts, digits)])
+            by_size[size] += ways * val
+            for ii, digit in enumerate(digits):
+                if digit:
+                    holding[ii][size] += ways * digit // counts[ii] * val
+    return [_marginal_sums(row, by_size) for row in holding]
+
+def _marginal_sums(holding, by_size):
+    """D(s) = A(s+1) - (T(s) - A(s)): the coalitions of size s+1 holding the player, less those of size s
+       without it."""
+    return [holding[size + 1] - by_size[size] + holding[size] for size in range(len(by_size) - 1)]
+
+def semivalues_from_sums(sums, semivalues, nplayers):
+    """Given marginal sums from mask_marginal_sums or lattice_marginal_sums, return a list with the values
+       of each semivalue, each a list with the value of each player (or one player of each type)."""
+    results = []
+    for semivalue in semivalues:
+        weights, denominator = semivalue_weights(semivalue, nplayers)
+        results.append([sum([weight * total for weight, total in zip(weights, row)]) / denominator
+                        for row in sums])
+    return results
@@ -2,22 +2,32 @@
 
 from itertools import chain, combinations, permutations
 from collections import defaultdict
-from math import factorial
+from math import factorial, prod
 import random
 from copy import deepcopy
 from game_theory_utils.util.iterutil import (powerset, distinct_permutations, sequence_counts, sequence_from_types,
                                     subtype_coalitions)
+from game_theory_utils.util.convertutil import dict_from_tuple, remove_zeros
+from game_theory_utils.util.maskutil import mask_from_players
+from game_theory_utils.util.cacheutil import CachedValuation
+from game_theory_utils.util.radixutil import radix_strides, fill_max_table
+from game_theory_utils.coalitions.typed_coalition import typed_shapley_values
+from game_theory_utils.coalitions.sampling import typed_sampling_target, estimate_shapley_values
+from game_theory_utils.coalitions.weighted_voting import VotingValuation
+from game_theory_utils.coalitions.symmetry import reduce_symmetric_players, expand_type_values
 
 class Shapley:
     def __init__(self):
         self.coalition_valuation = None # function giving the value of a coalition
         self.player_type= None # dict giving counts of players of each type
         self.shapely_vals = None
+        self.symmetric_types = None # type of each player when symmetric players have been grouped
         self.verbose = False
 
     def set_player_types(self,  player_types):
         """Set dictionary giving counts of player types."""
         self.player_types = player_types
+        self.symmetric_types = None
 
     def set_coalition_valuation(self, fun):
         """Set the valuation function for coalations. The function should take a dict
@@ -25,39 +35,62 @@ class Shapley:
 
         self.coalition_valuation = fun
 
-    def set_ungrouped_coalition_values(self, coalition_values):
+    def enable_cache(self, capacity=None, policy=None):
+        """Wrap the coalition valuation in a CachedValuation so that running several analyses values each
+           coalition only once. policy is 'lru' (keep at most capacity values) or 'all'; the default is
+           'lru' if a capacity is given and 'all' otherwise. Returns the cache, whose get_stats() gives
+           the hit, miss and eviction counts."""
+        if policy is None:
+            policy = 'all' if capacity is None else 'lru'
+        if not isinstance(self.coalition_valuation, CachedValuation):
+            self.coalition_valuation = CachedValuation(self.coalition_valuation, capacity=capacity, policy=policy)
+        return self.coalition_valuation
+
+    def set_ungrouped_coalition_values(self, coalition_values, group=False):
         """Create the player_types dictionary and evaluation function based on
            a dictionary of coalition valuation. The coalition is "ungrouped" in that each
            player is considered to be a separate type, even if in fact they have identical valuations.
            If a valuation for a coalition is not given, 
            assign the valuation of the highest subcoation with a valuation.
            If none of them have valuations, assign zero.
-           Keys of coalation values is a tuple listing the coalition members in sorted order."""
+           Keys of coalation values is a tuple listing the coalition members in sorted order.
+           If group is true players who are symmetric (can be swapped without changing any value) are made
+           one type, so the values are computed over the much smaller lattice of the typed game, and then
+           given per player again."""
         players = set()
         for key in coalition_values.keys():
             for player in key:
                 players.add(player)
         player_types = {player:1 for player in players}
         self.set_player_types(player_types)
-        vals = {}
+        # values are kept in a table indexed by mask, and filled in with one sweep over the masks
+        player_bits = {player:ii for ii, player in enumerate(sorted(players))}
+        table = [0] * (1 << len(players))
+        known = bytearray(len(table))
         for key in coalition_values:
-            nkey = tuple(sorted(list(key)))
-            vals[nkey] = coalition_values[key]
-        for elm in powerset(players):
-            nkey = tuple(sorted(list(elm)))
-            if nkey not in vals:
-                if len(nkey) in [0, 1]:
-                    vals[nkey] = 0
-                else:
-                    max_ = 0 # No negative values allowed!
-                    for shorter in combinations(nkey, len(nkey) - 1):
-                        new = vals[shorter]
-                        if new > max_:
-                            max_ = new
-                    vals[nkey] = max_
-        fun = lambda player_counts: vals[tuple(sorted([key for key in player_counts]))]
+            mask = mask_from_players(key, player_bits)
+            table[mask] = coalition_values[key]
+            known[mask] = 1
+        for mask in range(len(table)):
+            if mask & (mask - 1) == 0 and not known[mask]:
+                table[mask] = 0 # empty and single player coalitions default to zero
+                known[mask] = 1
+        fill_max_table(table, known, [1] * len(players), floor=0) # No negative values allowed!
+        if group:
+            player_types, valuation, symmetric_types = reduce_symmetric_players(sorted(players), table)
+            self.set_player_types(player_types)
+            self.symmetric_types = symmetric_types
+            self.set_coalition_valuation(valuation)
+            return
+        fun = lambda player_counts: table[mask_from_players(player_counts, player_bits)]
         self.set_coalition_valuation(fun)
 
+    def _expand_values(self, values):
+        """Values per player if symmetric players were grouped, otherwise the values as they are."""
+        if self.symmetric_types is None:
+            return values
+        return expand_type_values(values, self.symmetric_types)
+
     def set_grouped_coalition_values(self, coalition_values, player_types):
         """Create an evaluation function givn the supplied coalition values and player_types,
            filling in missing values with our standard fill-in rules.
@@ -65,37 +98,24 @@ class Shapley:
            tuple being count of type e.g. ((0, 2), (1,1)) means 1 player pf type 1 and 2
            of tpe 0. Because the order matters we will sort them by type.
         """
-        self.player_types = player_types
-        vals = deepcopy(coalition_values)
-        vals[tuple()] = 0
-        all_player_counts = set()
-        for player_type in player_types:
-            for count in range(1, player_types[player_type] + 1):
-                all_player_counts.add((player_type, count))
-        for nkey in subtype_coalitions(player_types):
-            #nkey = tuple(sorted(list(elm), key=lambda x:x[0]))
-            lol = 'nope'
-            if nkey not in vals:
-                max_ = 0
-                # we must compare to all coalitions with a member type deleted,
-                # and all coalitions with one fewer of each member type.
-                # I think the powerset ordering means we only have to check one member removed at a time,
-                # because we will already have checked an entry with more than one entry removed
-                ed = {ptc[0]:ptc[1] for ptc in nkey} # elm dict
-                for pt in ed:
-                    nd = dict(ed)
-                    if ed[pt] > 1:
-                        nd[pt] = nd[pt] -1
-                    else:
-                        del nd[pt]
-                    ttypes = sorted([key for key in nd])
-                    skey = tuple([(key, nd[key]) for key in ttypes])
-                    tval = vals[skey]
-                    if tval > max_:
-                        max_ = tval
-                vals[nkey] = max_
-        nkf = lambda player_counts: tuple(sorted(tuple([(key, player_counts[key]) for key in player_counts])))
-        fun = lambda player_counts: vals[nkf(player_counts)]
+        self.set_player_types(player_types)
+        # values are kept in a table indexed by the mixed radix encoding of the type counts
+        types = sorted(player_types)
+        counts = [player_types[type_] for type_ in types]
+        strides = radix_strides(counts)
+        type_strides = {type_:strides[ii] for ii, type_ in enumerate(types)}
+        encode = lambda player_counts: sum([type_strides[key] * player_counts[key] for key in player_counts])
+        table = [0] * prod([count + 1 for count in counts])
+        known = bytearray(len(table))
+        for key in coalition_values:
+            index = encode(dict(key))
+            table[index] = coalition_values[key]
+            known[index] = 1
+        table[0] = 0
+        known[0] = 1
+        # a missing coalition gets the highest value of the coalitions with one fewer of a member type
+        fill_max_table(table, known, counts, floor=0)
+        fun = lambda player_counts: table[encode(player_counts)]
         self.set_coalition_valuation(fun)
 
 
@@ -106,46 +126,36 @@ class Shapley:
         self.set_player_types(player_types)
         total = sum([player_types[player] * type_strength[player] for player in player_types])
         crit = total / 2
-        strength = lambda player_counts: sum([player_counts[player] * type_strength[player] for player in player_counts])
-        fun = lambda player_counts: int(strength(player_counts) > crit)
-        self.set_coalition_valuation(fun)
+        self.set_coalition_valuation(VotingValuation(type_strength, crit, strict=True))
 
     def  compute_shapley_values(self):
-        shapley = defaultdict(float)
-        perms = 0.0
-        for combo in distinct_permutations(self.player_types):
-            perms += 1.0
-            for ii, player in enumerate(combo):
-                if ii == 0:
-                    oldval = 0
-                counts = sequence_counts(combo[0:ii + 1])
-                newval = self.coalition_valuation(counts)
-                if self.verbose:
-                    print('counts', counts, 'ii', ii, newval, oldval)
-                shapley[player] += newval - oldval
-                oldval = newval
-        for player in shapley.keys():
-            shapley[player] = shapley[player]/(perms * self.player_types[player])
-
-        self.shapley_vals = dict(shapley)
-
-    def simulate_shapley_values(self, perms):
+        """Compute exact shapley values by counting over the coalition count vectors."""
+        if hasattr(self.coalition_valuation, 'evaluate_many') and not self.verbose:
+            # batched valuations take count vectors directly
+            self.shapley_vals = self._expand_values(typed_shapley_values(self.player_types, self.coalition_valuation))
+            return
+        def valuation(counts_tuple):
+            counts = dict_from_tuple(remove_zeros(counts_tuple))
+            val = self.coalition_valuation(counts)
+            if self.verbose:
+                print('counts', counts, val)
+            return val
+        self.shapley_vals = self._expand_values(typed_shapley_values(self.player_types, valuation))
+
+    def estimate_shapley_values(self, perms=None, target_stderr=None, time_budget=None, processes=1, seed=None,
+                                confidence=0.95, strategy='permutation'):
+        """Estimate shapley values by sampling, possibly in several processes.
+           Returns a ShapleyEstimate with standard errors and confidence intervals."""
+        valuation = lambda counts_tuple: self.coalition_valuation(dict_from_tuple(remove_zeros(counts_tuple)))
+        target = typed_sampling_target(self.player_types, valuation)
+        return estimate_shapley_values(target, perms=perms, target_stderr=target_stderr,
+                                       time_budget=time_budget, processes=processes, seed=seed,
+                                       confidence=confidence, strategy=strategy)
+
+    def simulate_shapley_values(self, perms, seed=None, strategy='permutation'):
         """Get approximate shapley values by looking at random permutations."""
-        shapley = defaultdict(float)
-        combo = sequence_from_types(self.player_types)
-        for jj in range(perms):
-            random.shuffle(combo)
-            for ii, player in enumerate(combo):
-                if ii == 0:
-                    oldval = 0
-                counts = sequence_counts(combo[0:ii + 1])
-                newval = self.coalition_valuation(counts)
-                shapley[player] += newval - oldval
-                oldval = newval
-        for player in shapley.keys():
-            shapley[player] = shapley[player]/(perms * self.player_types[player])
-
-        self.shapley_vals = dict(shapley)
+        self.shapley_vals = self._expand_values(self.estimate_shapley_values(perms=perms, seed=seed,
+                                                                             strategy=strategy).values)
 
 
     def get_shapley_values(self):
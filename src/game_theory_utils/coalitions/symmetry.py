@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+from array import array
+from itertools import chain
+
+from game_theory_utils.util.maskutil import table_typecode
+from game_theory_utils.coalitions.typed_coalition import TypedValueTable
+
+"""Finding interchangeable players so a game given with every player distinct can be solved as a typed game.
+   Players i and j are symmetric if v(S ∪ {i}) = v(S ∪ {j}) for every coalition S holding neither, i.e. the
+   value table does not change when their bits are swapped. Symmetry is transitive, so the symmetric players
+   fall into classes, which become the types of a TypedCoalitionalGame whose lattice has prod (c_t + 1)
+   points instead of 2^n.
+   Candidates are found with one hashing sweep: each coalition gets a hash of its value and size, and each
+   player the sum of the hashes of the coalitions holding it, summed a slice of the table at a time. Swapping
+   symmetric players maps the coalitions holding one onto those holding the other, so their sums are equal.
+   Players with the same sum are then checked by comparing values, so a hash collision can not merge players
+   that are not symmetric. Both steps work on slices of the table, like the Möbius transform in maskutil,
+   rather than one coalition at a time."""
+
+__all__ = ('find_symmetry_classes', 'reduce_symmetric_players', 'expand_type_values')
+
+def find_symmetry_classes(players, table):
+    """Group the players of a game whose values are in a table indexed by coalition mask, players giving the
+       player at each bit, into classes of symmetric players. Returns a list of lists of players, each in
+       player order, ordered by their first player."""
+    values = list(table)
+    size = len(values)
+    hashes = list(map(hash, zip(values, map(int.bit_count, range(size)))))
+    candidates = {}
+    for ii in range(len(players)):
+        bit = 1 << ii
+        step = 2 * bit
+        if bit <= size // step:
+            signature = sum([sum(hashes[bit + offset::step]) for offset in range(bit)])
+        else:
+            signature = sum([sum(hashes[base + bit:base + step]) for base in range(0, size, step)])
+        candidates.setdefault(signature, []).append(ii)
+    classes = []
+    for indexes in candidates.values():
+        found = []
+        for ii in indexes:
+            for members in found:
+                if _are_symmetric(values, members[0], ii):
+                    members.append(ii)
+                    break
+            else:
+                found.append([ii])
+        classes.extend(found)
+    classes.sort()
+    return [[players[ii] for ii in members] for members in classes]
+
+def _are_symmetric(values, first, second):
+    """True if swapping the players at two bit positions, first < second, leaves the values unchanged: the
+       coalitions with the first player but not the second have the same values, in the same order, as those
+       with the second but not the first."""
+    first = 1 << first
+    second = 1 << second
+    return (_select_bit(_select_bit(values, second, False), first, True)
+            == _select_bit(_select_bit(values, second, True), first, False))
+
+def _select_bit(values, bit, present):
+    """The values of the masks with bit set (or not set if present is false), as a list indexed by the mask
+       of the other bits. For low bits this takes one strided slice per offset, for high bits one contiguous
+       slice per block."""
+    size = len(values)
+    step = 2 * bit
+    start = bit if present else 0
+    if bit <= size // step:
+        selected = [None] * (size // 2)
+        for offset in range(bit):
+            selected[offset::bit] = values[start + offset::step]
+        return selected
+    return list(chain.from_iterable([values[base + start:base + start + bit] for base in range(0, size, step)]))
+
+def reduce_symmetric_players(players, table, classes=None):
+    """Collapse a game whose values are in a table indexed by coalition mask into a typed game with a type
+       for each class of symmetric players (found with find_symmetry_classes if classes is None). The types are
+       numbered from 0 in the order of the classes. Returns (player_types, valuation, player_type), where
+       player_types gives the count of each type, valuation is a TypedValueTable and player_type gives the
+       type of each player. The coalition with k_t players of each type t is valued as the one with the first
+       k_t players of each class."""
+    if classes is None:
+        classes = find_symmetry_classes(players, table)
+    player_bits = {player:ii for ii, player in enumerate(players)}
+    player_types = {}
+    player_type = {}
+    masks = [0] # mask of a coalition with the counts at each index, the last type varying fastest
+    for type_, members in enumerate(classes):
+        player_types[type_] = len(members)
+        prefixes = [0]
+        for player in members:
+            player_type[player] = type_
+            prefixes.append(prefixes[-1] | 1 << player_bits[player])
+        masks = [mask | prefix for mask in masks for prefix in prefixes]
+    values = [table[mask] for mask in masks]
+    return player_types, TypedValueTable(player_types, array(table_typecode(values), values)), player_type
+
+def expand_type_values(type_values, player_type):
+    """Given values per player of each type, such as the shapley values of the reduced game, return the
+       value of each player."""
+    return {player:type_values[type_] for player, type_ in player_type.items()}
@@ -1,14 +1,67 @@
 #!/usr/bin/env python
+from array import array
 from collections import defaultdict
-from math import comb, prod
+from math import comb, prod, factorial, ceil, floor
+from operator import mul
 import random
 
 from game_theory_utils.util.convertutil import (tuple_from_dict, list_from_dict, get_type_count, insert_zeros)
 from game_theory_utils.util.iterutil import (zero_to_max, one_less, fill_vals, sequence_from_types,
                                              distinct_permutations, sequence_counts)
+from game_theory_utils.util.maskutil import table_typecode, widen_table
+from game_theory_utils.util.bitsetutil import pack_bits, bit_positions, swing_bits
+from game_theory_utils.util.cacheutil import CachedValuation
+from game_theory_utils.util.radixutil import (radix_strides, table_size, decode_index, lattice_digits, fill_max_table,
+                                              binomial_transform)
+from game_theory_utils.coalitions.sampling import typed_sampling_target, estimate_shapley_values
+from game_theory_utils.coalitions.core import typed_core_target, least_core, find_core_payoffs, nucleolus
+from game_theory_utils.coalitions.weighted_voting import VotingValuation, voting_power_indices
+from game_theory_utils.coalitions.power_indices import lattice_power_indices
+from game_theory_utils.coalitions.owen import owen_values, union_indexes
+from game_theory_utils.coalitions.semivalue import semivalue_weights, lattice_marginal_sums, semivalues_from_sums
 
-__all__ = ('TypedCoalitionalGame', 'create_typed_voting_game',
-           'create_typed_game')
+__all__ = ('TypedCoalitionalGame', 'TypedValueTable', 'create_typed_voting_game',
+           'create_typed_game', 'create_typed_value_table', 'typed_shapley_values', 'typed_banzhaf_counts',
+           'typed_value_table', 'create_typed_game_from_dividends', 'typed_shapley_from_dividends',
+           'typed_shapley_totals', 'typed_semivalues', 'typed_power_indices')
+
+class TypedValueTable:
+    """A coalition valuation backed by a flat array. Each coalition is stored at the mixed radix index of its
+       counts (see radixutil), with the types in sorted order. Calling it with a counts tuple looks up
+       the value, so it can be used anywhere a coalition valuation function is expected, and the analysis
+       functions use the table directly when they are given one."""
+
+    def __init__(self, player_types, table):
+        self.types = sorted(player_types)
+        self.counts = [player_types[type_] for type_ in self.types]
+        self.strides = radix_strides(self.counts)
+        self.type_strides = {type_:self.strides[ii] for ii, type_ in enumerate(self.types)}
+        if len(table) != table_size(self.counts):
+            raise ValueError('table must have {} entries'.format(table_size(self.counts)))
+        self.table = table
+
+    def __call__(self, counts_tuple):
+        return self.table[self.get_index(counts_tuple)]
+
+    def get_index(self, counts_tuple):
+        """Index of a counts tuple or dict of type:count. Types with a zero count may be left out."""
+        if isinstance(counts_tuple, dict):
+            counts_tuple = counts_tuple.items()
+        return sum([self.type_strides[elm[0]] * elm[1] for elm in counts_tuple])
+
+    def get_counts_tuple(self, index):
+        """Counts tuple, including zero counts, of the coalition at index."""
+        return tuple(zip(self.types, decode_index(index, self.counts)))
+
+    def evaluate_many(self, types, count_vectors):
+        """Batched lookup of count vectors whose entries are counts of the given types."""
+        strides = [self.type_strides[type_] for type_ in types]
+        return [self.table[sum([count * stride for count, stride in zip(vector, strides)])]
+                for vector in count_vectors]
+
+    def matches(self, player_types):
+        """True if the table covers exactly these player types."""
+        return self.types == sorted(player_types) and self.counts == [player_types[type_] for type_ in self.types]
 
 class TypedCoalitionalGame:
     """A TypedCoalitionalGame has a dictionary called player_types which gives the count of each  a set of players and a function giving the value of each subset of
@@ -20,6 +73,8 @@ class TypedCoalitionalGame:
       The coalition valuation function takes a coalition tuple as an input. Internally it will
       usually just be a dictionary lookup with the coalition tupe as a key. The keys must be sorted since
       (('a',3), ('b',4)) and (('b', 4), ('a',3)) are not the same.
+      A valuation may also have an evaluate_many(types, count_vectors) method returning the values of many
+      coalitions at once (see VotingValuation and TypedValueTable); the analyses use it when it exists.
     """
 
     def __init__(self, player_types, coalition_valuation, isCost=False):
@@ -35,6 +90,9 @@ class TypedCoalitionalGame:
         self.shapley_values = None
         self.banzhaf_values = None
 
+        self.shapley_totals = None # accumulators kept up to date by set_coalition_value once enabled
+        self.swing_counts = None
+
     def get_valuation(self):
         """Return the valuation as a dictionary.
         This may be prohibitivley large."""
@@ -43,6 +101,88 @@ class TypedCoalitionalGame:
             valuation[key] = self.coalition_valuation(key)
         return valuation
 
+    def enable_cache(self, capacity=None, policy=None):
+        """Wrap the coalition valuation in a CachedValuation so that running several analyses values each
+           coalition only once. policy is 'lru' (keep at most capacity values) or 'all'; the default is
+           'lru' if a capacity is given and 'all' otherwise. Returns the cache, whose get_stats() gives
+           the hit, miss and eviction counts. A TypedValueTable is already a lookup, so it is left as it is
+           (and set_coalition_value keeps working) and None is returned."""
+        if isinstance(self.coalition_valuation, TypedValueTable):
+            return None
+        if policy is None:
+            policy = 'all' if capacity is None else 'lru'
+        if not isinstance(self.coalition_valuation, CachedValuation):
+            self.coalition_valuation = CachedValuation(self.coalition_valuation, capacity=capacity, policy=policy)
+        return self.coalition_valuation
+
+    def get_value_table(self):
+        """Get the value of every coalition as a flat table in mixed radix index order (see radixutil)."""
+        return typed_value_table(self.player_types, self.coalition_valuation)
+
+    def set_coalition_value(self, counts_tuple, val):
+        """Change the value of the coalitions with the counts given by a counts tuple or dict. The valuation
+           must be a TypedValueTable for the game's player types, as made by create_typed_game. Calculated
+           values are forgotten, unless incremental analysis is on in which case they are updated."""
+        valuation = self.coalition_valuation
+        if not (isinstance(valuation, TypedValueTable) and valuation.matches(self.player_types)):
+            raise ValueError('coalition values can only be set when the valuation is a TypedValueTable')
+        index = valuation.get_index(counts_tuple)
+        old = valuation.table[index]
+        valuation.table = widen_table(valuation.table, val)
+        if self.shapley_totals is not None:
+            self._update_accumulators(index, old, val)
+        valuation.table[index] = val
+        self.simple = None
+        self.superadditive = None
+        self.monotonic = None
+        self.shapley_values = None
+        self.banzhaf_values = None
+
+    def enable_incremental(self):
+        """Keep the unnormalized shapley totals and banzhaf swing counts of each type, so that after
+           set_coalition_value changes a few values the shapley and banzhaf values do not need a pass over the
+           lattice. If the valuation is not a TypedValueTable it is replaced by one holding every value."""
+        valuation = self.coalition_valuation
+        if not (isinstance(valuation, TypedValueTable) and valuation.matches(self.player_types)):
+            table = self.get_value_table()
+            self.coalition_valuation = TypedValueTable(self.player_types, array(table_typecode(table), table))
+        types = sorted(self.player_types)
+        self.shapley_totals = typed_shapley_totals(self.player_types, self.coalition_valuation)
+        bcounts = typed_banzhaf_counts(self.player_types, self.coalition_valuation)
+        self.swing_counts = [bcounts[type_] for type_ in types]
+
+    def disable_incremental(self):
+        self.shapley_totals = None
+        self.swing_counts = None
+
+    def _update_accumulators(self, index, old, new):
+        """Apply the change of the value at index from old to new to the accumulators, as for
+           CoalitionalGame: only the marginal contributions into the coalition from its neighbour with one
+           less of each type, and out of it to its neighbour with one more, change, each weighted by its
+           number of coalitions and orderings."""
+        valuation = self.coalition_valuation
+        table = valuation.table
+        counts = valuation.counts
+        digits = list(decode_index(index, counts))
+        weights, _ = semivalue_weights('shapley', sum(counts))
+        delta = new - old
+        for ii, stride in enumerate(valuation.strides):
+            if digits[ii]:
+                lower = list(digits)
+                lower[ii] -= 1
+                self.shapley_totals[ii] += _shapley_multiplier(counts, lower, ii, weights) * delta
+                if not table[index - stride]:
+                    # C(c, d - 1) * (c - d + 1) ways with one fewer, and the player added = C(c, d) * d
+                    ways = prod([comb(count, digit) for count, digit in zip(counts, digits)]) * digits[ii]
+                    self.swing_counts[ii] += ways * (bool(new) - bool(old))
+            if digits[ii] < counts[ii]:
+                self.shapley_totals[ii] -= _shapley_multiplier(counts, digits, ii, weights) * delta
+                if table[index + stride]:
+                    upper = list(digits)
+                    upper[ii] += 1
+                    ways = prod([comb(count, digit) for count, digit in zip(counts, upper)]) * upper[ii]
+                    self.swing_counts[ii] += ways * ((not new) - (not old))
+
     def get_banzhaf_values(self):
         """Get the banzhaf values. Note that the banzhaf values do not exist unless the game is simple
            (all coalition values are one or zero."""
@@ -52,21 +192,20 @@ class TypedCoalitionalGame:
 
     def calculate_banzhaf_values(self):
         """Calculate the banzhaf values. Just changes internal members."""
-        bcounts = defaultdict(int) # key is player type, val is number of distinct coalitions
-                                   # where adding one of pt earns success
-        for atuple in zero_to_max(tuple_from_dict(self.player_types)):
-            if self.coalition_valuation(atuple):
-                for less, removed in one_less(atuple):
-                    if not self.coalition_valuation(less):
-                        mult = prod([comb(self.player_types[elm[0]], elm[1]) for elm in less])
-                        mult *= (self.player_types[removed] - get_type_count(less, removed))
-                        # print(atuple, removed, less, mult)
-
-                        bcounts[removed] += mult
+        if self.swing_counts is not None:
+            bcounts = dict(zip(sorted(self.player_types), self.swing_counts))
+        else:
+            bcounts = typed_banzhaf_counts(self.player_types, self.coalition_valuation)
         total = sum([bcounts[pt] for pt in bcounts])
         self.banzhaf_values = {pt:0 for pt in self.player_types} # in case bcount is zero
         for type_ in bcounts:
-            self.banzhaf_values[type_] = bcounts[type_] / (total * self.player_types[type_])
+            if bcounts[type_]:
+                self.banzhaf_values[type_] = bcounts[type_] / (total * self.player_types[type_])
+
+    def get_power_indices(self):
+        """Get the banzhaf, coleman, johnston, deegan-packel and holler-packel indices of a simple game (see
+           power_indices.py) as a dict keyed by index name of dicts of type:value per player of the type."""
+        return typed_power_indices(self.player_types, self.coalition_valuation)
 
     def get_shapley_values(self):
         """Get the shapley values. Calculate them if they have not yet been calculated."""
@@ -74,46 +213,107 @@ class TypedCoalitionalGame:
             self.calculate_shapley_values()
         return self.shapley_values
 
-    def calculate_shapley_values(self):
-        """Compute the shapley values and store them as members."""
-        keys = [key for key in self.player_types]
-        shapley = defaultdict(float)
-        perms = 0.0
-        for combo in distinct_permutations(self.player_types):
-            oldval = 0
-            perms += 1.0
-            for ii, player in enumerate(combo):
-                counts = sequence_counts(combo[0:ii + 1])
-                counts_tuple = insert_zeros(tuple_from_dict(counts), keys)
-                newval = self.coalition_valuation(counts_tuple)
-                if self.verbose:
-                    print('counts', counts, 'counts_tuple', counts_tuple, 'ii', ii, 'newval', newval, 'oldval', oldval)
-                shapley[player] += newval - oldval
-                oldval = newval
-        for player in shapley.keys():
-            shapley[player] = shapley[player]/(perms * self.player_types[player])
-        self.shapley_values = dict(shapley)
-
-    def simulate_shapley_values(self, perms):
+    def calculate_shapley_values(self, method='lattice'):
+        """Compute the shapley values and store them as members. method is 'lattice', which visits every
+           count vector, or 'dividend', which shares out the nonzero harsanyi dividends."""
+        if method == 'dividend':
+            self.shapley_values = typed_shapley_from_dividends(self.player_types, self.get_harsanyi_dividends())
+            return
+        if method != 'lattice':
+            raise ValueError('unknown shapley method {}'.format(method))
+        if self.shapley_totals is not None:
+            perms = factorial(sum(self.player_types.values()))
+            self.shapley_values = {type_:total / perms
+                                   for type_, total in zip(sorted(self.player_types), self.shapley_totals)}
+            return
+        valuation = self.coalition_valuation
+        if self.verbose:
+            def valuation(counts_tuple):
+                val = self.coalition_valuation(counts_tuple)
+                print('counts_tuple', counts_tuple, 'val', val)
+                return val
+        self.shapley_values = typed_shapley_values(self.player_types, valuation)
+
+    def get_semivalues(self, semivalues):
+        """Get several semivalues (see semivalue.py), e.g. ['shapley', 'banzhaf', ('beta', 4, 1)], per player of
+           each type, from one pass over the lattice. Returns a list of dicts in the same order. The banzhaf
+           semivalue is the raw banzhaf value, not normalized like get_banzhaf_values."""
+        return typed_semivalues(self.player_types, self.coalition_valuation, semivalues)
+
+    def estimate_shapley_values(self, perms=None, target_stderr=None, time_budget=None, processes=1, seed=None,
+                                confidence=0.95, strategy='permutation'):
+        """Estimate the shapley values by sampling, possibly in several processes.
+           strategy is one of sampling.SAMPLING_STRATEGIES.
+           Returns a ShapleyEstimate, does not update the shapley_values member."""
+        target = typed_sampling_target(self.player_types, self.coalition_valuation)
+        return estimate_shapley_values(target, perms=perms, target_stderr=target_stderr,
+                                       time_budget=time_budget, processes=processes, seed=seed,
+                                       confidence=confidence, strategy=strategy)
+
+    def simulate_shapley_values(self, perms, seed=None, strategy='permutation'):
         """Get approximate shapley values by looking at random permutations.
            Returns te approximate values, does not update the shapley_values member."""
-        keys = [key for key in self.player_types]
-        shapley = defaultdict(float)
-        combo = sequence_from_types(self.player_types)
-        for jj in range(perms):
-            random.shuffle(combo)
-            for ii, player in enumerate(combo):
-                if ii == 0:
-                    oldval = 0
-                counts = sequence_counts(combo[0:ii + 1])
-                counts_tuple = insert_zeros(tuple_from_dict(counts), keys)
-                newval = self.coalition_valuation(counts_tuple)
-                shapley[player] += newval - oldval
-                oldval = newval
-        for player in shapley.keys():
-            shapley[player] = shapley[player]/(perms * self.player_types[player])
-
-        return dict(shapley)
+        return self.estimate_shapley_values(perms=perms, seed=seed, strategy=strategy).values
+
+    def get_owen_values(self, unions):
+        """Get the owen values, per player of each type, of a coalition structure whose unions are sets of
+           types: unions is an iterable of iterables of types partitioning them. Within a union the coalitions
+           are summed over its sub-lattice of counts (see owen.py)."""
+        types = sorted(self.player_types)
+        counts = [self.player_types[type_] for type_ in types]
+        values = owen_values(typed_value_table(self.player_types, self.coalition_valuation), radix_strides(counts),
+                             counts, union_indexes(unions, {type_:ii for ii, type_ in enumerate(types)}))
+        return dict(zip(types, values))
+
+    def estimate_owen_values(self, unions, perms=None, target_stderr=None, time_budget=None, processes=1,
+                             seed=None, confidence=0.95):
+        """Estimate the owen values of a coalition structure of types by sampling the orderings that keep each
+           union together. Returns a ShapleyEstimate."""
+        target = typed_sampling_target(self.player_types, self.coalition_valuation)
+        target.set_unions(unions)
+        return estimate_shapley_values(target, perms=perms, target_stderr=target_stderr,
+                                       time_budget=time_budget, processes=processes, seed=seed,
+                                       confidence=confidence, strategy='unions')
+
+    def get_dividend_table(self):
+        """Get the harsanyi dividend of each coalition with the counts at each index of the value table
+           (see radixutil). Every coalition with the same counts has the same dividend."""
+        counts = [self.player_types[type_] for type_ in sorted(self.player_types)]
+        return binomial_transform(list(self.get_value_table()), counts)
+
+    def get_harsanyi_dividends(self):
+        """Get the harsanyi dividend of a coalition with each counts tuple, leaving out those that are zero."""
+        types = sorted(self.player_types)
+        counts = [self.player_types[type_] for type_ in types]
+        dividends = self.get_dividend_table()
+        return {tuple(zip(types, digits)):dividends[index] for index, digits in enumerate(lattice_digits(counts))
+                if dividends[index]}
+
+    def get_core_target(self):
+        """CoreTarget for the core and nucleolus solvers. Players of the same type get the same payoff, so
+           there is one payoff per type and one constraint per count vector."""
+        return typed_core_target(self.player_types, self.get_value_table(), -1 if self.isCost else 1)
+
+    def get_least_core(self):
+        """Get the pair (epsilon, payoffs) where epsilon is the least core value, the smallest e such that
+           some imputation x has v(S) - x(S) ≤ e for every coalition S other than the empty and grand
+           coalitions, and payoffs is a dict giving the payoff to each player of a type achieving it."""
+        return least_core(self.get_core_target())
+
+    def find_core_imputation(self):
+        """Return a dict giving the payoff to each player of a type for an imputation in the core, or None
+           if the core is empty."""
+        return find_core_payoffs(self.get_core_target())
+
+    def get_is_core_empty(self):
+        """The core is empty if there is no imputation with x(S) ≥ v(S) for every coalition S
+           (x(S) ≤ c(S) for a cost game)."""
+        return self.find_core_imputation() is None
+
+    def get_nucleolus(self, pre=False):
+        """Get the nucleolus as a dict giving the payoff to each player of a type. If pre is true get
+           the prenucleolus, which is not restricted to individually rational payoffs."""
+        return nucleolus(self.get_core_target(), pre=pre)
 
     def zero_normalize(self):
         """Create straegically equivalent 0 normalized game. A game is 0 normalized if
@@ -158,43 +358,189 @@ class TypedCoalitionalGame:
 
     def get_is_monotonic(self):
         """A game is monotonics if the value of a coalition is ≥ the value of its subcoalitions."""
-        for atuple in zero_to_max(tuple_from_dict(self.player_types)):
-            bigger = self.coalition_valuation(atuple)
-            for less, removed in one_less(atuple):
-                if self.coalition_valuation(less) > bigger:
+        table = self.get_value_table()
+        counts = [self.player_types[type_] for type_ in sorted(self.player_types)]
+        strides = radix_strides(counts)
+        for index, digits in enumerate(lattice_digits(counts)):
+            bigger = table[index]
+            for ii, digit in enumerate(digits):
+                if digit and table[index - strides[ii]] > bigger:
                     return False
         return True
 
     def get_is_superadditive(self):
-        for atuple in zero_to_max(tuple_from_dict(self.player_types)):
-            val = self.coalition_valuation(atuple)
-            djm = tuple([(elm[0], self.player_types[elm[0]] - elm[1]) for elm in atuple])
-            for adisjoint in zero_to_max(djm):
-                theUnion = tuple([(atuple[ii][0], atuple[ii][1] + adisjoint[ii][1]) for ii in range(len(atuple))])
-                if self.isCost:
-                    if self.coalition_valuation(theUnion) > self.coalition_valuation(adisjoint) + val:
-                        return False
-                else:
-                    if self.coalition_valuation(theUnion) < self.coalition_valuation(adisjoint) + val:
-                        return False
-        return True
+        """A game is superadditive if for every pair of disjoint coalitions the value of the union is ≥ the
+           sum of the values of the pair. For a cost game the union must be ≤ the sum."""
+        return self.find_superadditivity_violation() is None
+
+    def find_superadditivity_violation(self):
+        """Return a pair of disjoint coalitions (as counts tuples) whose union breaks superadditivity,
+           or None. Count vectors index a flat table, and since k + l never overflows a digit when
+           l ≤ c - k the union is at index(k) + index(l)."""
+        types = sorted(self.player_types)
+        counts = [self.player_types[type_] for type_ in types]
+        strides = radix_strides(counts)
+        table = self.get_value_table()
+        sign = -1 if self.isCost else 1
+        for index, digits in enumerate(lattice_digits(counts)):
+            val = table[index]
+            room = [count - digit for count, digit in zip(counts, digits)]
+            for disjoint in lattice_digits(room):
+                other = sum(map(mul, disjoint, strides))
+                if other < index:
+                    continue # the same pair is checked from the other side
+                if sign * (table[other] + val - table[index + other]) > 0:
+                    return tuple(zip(types, digits)), tuple(zip(types, disjoint))
+        return None
+
+    def get_is_convex(self):
+        """A game is convex (supermodular) if v(S ∪ T) + v(S ∩ T) ≥ v(S) + v(T) for all coalitions.
+           A cost game is convex if the inequality holds the other way."""
+        return self.find_convexity_violation() is None
+
+    def find_convexity_violation(self):
+        """Return a pair of coalitions (as counts tuples) with v(S ∪ T) + v(S ∩ T) < v(S) + v(T), or None.
+           It is enough to check coalitions k + e_i and k + e_j for each k and pair of types i ≤ j
+           (i == j means two players of the same type), so only neighbouring table entries are compared."""
+        types = sorted(self.player_types)
+        counts = [self.player_types[type_] for type_ in types]
+        strides = radix_strides(counts)
+        table = self.get_value_table()
+        sign = -1 if self.isCost else 1
+        ntypes = len(types)
+        for index, digits in enumerate(lattice_digits(counts)):
+            val = table[index]
+            for ii in range(ntypes):
+                if digits[ii] == counts[ii]:
+                    continue
+                gain = table[index + strides[ii]] - val
+                for jj in range(ii, ntypes):
+                    if digits[jj] + 1 + (ii == jj) > counts[jj]:
+                        continue
+                    both = index + strides[ii] + strides[jj]
+                    if sign * (table[both] - table[index + strides[jj]] - gain) < 0:
+                        first = list(digits)
+                        first[ii] += 1
+                        second = list(digits)
+                        second[jj] += 1
+                        return tuple(zip(types, first)), tuple(zip(types, second))
+        return None
 
 
     def get_is_simple(self):
         """For a "simple" coalitional game all valuations are 1 or 0"""
-        for key in zero_to_max(tuple_from_dict(self.player_types)):
-            if self.coalition_valuation(key) not in (1,0):
+        for val in self.get_value_table():
+            if val not in (1,0):
                 return False
         return True
 
 
+def typed_value_table(player_types, coalition_valuation):
+    """Get the value of every coalition of a typed game as a flat table, in mixed radix index order with
+       the types sorted. If the valuation is a TypedValueTable for the same types its table is returned
+       as is. If the valuation has an evaluate_many(types, count_vectors) method all the coalitions are
+       valued with one call to it, otherwise the valuation is called for each coalition."""
+    if isinstance(coalition_valuation, TypedValueTable) and coalition_valuation.matches(player_types):
+        return coalition_valuation.table
+    types = sorted(player_types)
+    counts = [player_types[type_] for type_ in types]
+    if hasattr(coalition_valuation, 'evaluate_many'):
+        return coalition_valuation.evaluate_many(types, list(lattice_digits(counts)))
+    return [coalition_valuation(atuple) for atuple in zero_to_max(tuple_from_dict(player_types))]
+
+def typed_shapley_values(player_types, coalition_valuation):
+    """Exact shapley values of a typed game, per player of each type.
+       Rather than walking the distinct permutations this visits each count vector k from zero_to_max once,
+       collecting the marginal contributions of each type by coalition size (see semivalue.py), and weights
+       them by |k|!(n-|k|-1)!/n!."""
+    totals = typed_shapley_totals(player_types, coalition_valuation)
+    perms = factorial(sum(player_types.values()))
+    return {type_:totals[ii] / perms for ii, type_ in enumerate(sorted(player_types))}
+
+
+def typed_shapley_totals(player_types, coalition_valuation):
+    """The shapley values of each type, in sorted type order, times n!. For integer values they are
+       integers."""
+    counts = [player_types[type_] for type_ in sorted(player_types)]
+    weights, _ = semivalue_weights('shapley', sum(counts))
+    sums = lattice_marginal_sums(typed_value_table(player_types, coalition_valuation), counts)
+    return [sum(map(mul, weights, row)) for row in sums]
+
+
+def typed_semivalues(player_types, coalition_valuation, semivalues):
+    """Several semivalues of a typed game (see semivalue.py) from one pass over the lattice. Returns a list
+       of dicts giving the value per player of each type, in the same order as semivalues."""
+    types = sorted(player_types)
+    counts = [player_types[type_] for type_ in types]
+    sums = lattice_marginal_sums(typed_value_table(player_types, coalition_valuation), counts)
+    return [dict(zip(types, values)) for values in semivalues_from_sums(sums, semivalues, sum(counts))]
+
+
+def _shapley_multiplier(counts, digits, ii, weights):
+    """Weight of the marginal contribution of a player of type ii joining the coalitions with counts digits."""
+    ways = prod([comb(count, digit) for count, digit in zip(counts, digits)]) * weights[sum(digits)]
+    return ways * (counts[ii] - digits[ii]) // counts[ii]
+
+
+def typed_shapley_from_dividends(player_types, dividends):
+    """Shapley values of a typed game, per player of each type, from a dict of harsanyi dividends keyed by
+       counts tuples (zero counts may be left out). Of the prod C(c_i, k_i) coalitions with counts k a
+       fraction k_t/c_t hold a given player of type t, who gets 1/|k| of each one's dividend."""
+    totals = {type_:0 for type_ in player_types}
+    for key in dividends:
+        size = sum([count for _, count in key])
+        if dividends[key] and size:
+            ways = prod([comb(player_types[type_], count) for type_, count in key])
+            for type_, count in key:
+                if count:
+                    totals[type_] += dividends[key] * ways * count / (player_types[type_] * size)
+    return totals
+
+
+def typed_banzhaf_counts(player_types, coalition_valuation):
+    """Count, for each type, the coalitions in which removing one player of the type turns a winning
+       coalition into a losing one. Coalitions with the same counts are counted once, multiplied by the
+       number of ways to choose them. Returns a dict keyed by type.
+       The lattice is packed into a bitset, so finding the swing coalitions of a type is a few whole table
+       bit operations, and only those coalitions are visited to weight them."""
+    types = sorted(player_types)
+    counts = [player_types[type_] for type_ in types]
+    strides = radix_strides(counts)
+    table = typed_value_table(player_types, coalition_valuation)
+    bits = pack_bits(table)
+    bcounts = [0] * len(types)
+    for ii in range(len(types)):
+        for index in bit_positions(swing_bits(bits, len(table), strides[ii], counts[ii])):
+            digits = decode_index(index, counts)
+            # C(c, d - 1) * (c - d + 1) ways with one fewer, and the player added = C(c, d) * d
+            bcounts[ii] += prod([comb(count, digit) for count, digit in zip(counts, digits)]) * digits[ii]
+    return {type_:bcounts[ii] for ii, type_ in enumerate(types)}
+
+
+def typed_power_indices(player_types, coalition_valuation):
+    """The power indices of a typed simple game (see power_indices.py), as a dict keyed by index name of
+       dicts of type:value per player of the type, all from one pass over the swings. A VotingValuation with
+       integer strengths is searched directly (see weighted_voting.voting_power_indices) so large blocs are
+       never tabled; any other valuation is tabled over the lattice."""
+    types = sorted(player_types)
+    counts = [player_types[type_] for type_ in types]
+    if isinstance(coalition_valuation, VotingValuation):
+        strengths = [coalition_valuation.type_strengths[type_] for type_ in types]
+        if all([isinstance(strength, int) and strength >= 0 for strength in strengths]):
+            crit = coalition_valuation.crit
+            quota = floor(crit) + 1 if coalition_valuation.strict else ceil(crit)
+            indices = voting_power_indices(strengths, counts, quota)
+            return {name:dict(zip(types, values)) for name, values in indices.items()}
+    indices = lattice_power_indices(typed_value_table(player_types, coalition_valuation), counts)
+    return {name:dict(zip(types, values)) for name, values in indices.items()}
+
+
 def create_typed_voting_game(player_types, type_strengths, crit):
     """Create a colatitional game from a player strengths tuple and  a tupe_stengs dict.
        Returnthe game.
        A weighted majority voting game has a value of 1 if the sum of player strengths * number of players
        voting for the measure exceeds a critical value."""
-    strength = lambda player_counts: sum([type_strengths[pc[0]] * pc[1] for pc in player_counts])
-    fun = lambda player_counts: int(strength(player_counts) >= crit)
+    fun = VotingValuation(type_strengths, crit)
     theGame = TypedCoalitionalGame(player_types=player_types, coalition_valuation=fun)
     return theGame
 
@@ -206,10 +552,38 @@ def create_typed_game(player_types, coalition_values):
         sub-coalitions given. The empty set coalition has a value of zero. The fill in logic only makes sense
         for profit games."""
 
-    keys = [key for key in player_types]
-    ptt = tuple_from_dict(player_types)
-    vals2 = {insert_zeros(key, keys):coalition_values[key] for key in coalition_values}
-    fill_vals(vals2, ptt)
-    fun = lambda type_counts: vals2[type_counts]
-    theGame = TypedCoalitionalGame(player_types=player_types, coalition_valuation=fun)
+    theGame = TypedCoalitionalGame(player_types=player_types,
+                                   coalition_valuation=create_typed_value_table(player_types, coalition_values))
     return theGame
+
+
+def create_typed_game_from_dividends(player_types, dividends):
+    """Create a game from a player_types structure and a dict of harsanyi dividends keyed by counts tuples;
+       counts not given have a zero dividend. The values are found with the inverse transform."""
+    types = sorted(player_types)
+    counts = [player_types[type_] for type_ in types]
+    valuation = TypedValueTable(player_types, [0] * table_size(counts))
+    for key in dividends:
+        valuation.table[valuation.get_index(key)] = dividends[key]
+    table = binomial_transform(valuation.table, counts, inverse=True)
+    valuation.table = array(table_typecode(table), table)
+    return TypedCoalitionalGame(player_types=player_types, coalition_valuation=valuation)
+
+
+def create_typed_value_table(player_types, coalition_values):
+    """Create a TypedValueTable from a dict where keys give the coalition type counts, filling in missing
+       values the same way as fill_vals."""
+    types = sorted(player_types)
+    counts = [player_types[type_] for type_ in types]
+    valuation = TypedValueTable(player_types, [0] * table_size(counts))
+    table = valuation.table
+    known = bytearray(len(table))
+    for key in coalition_values:
+        index = valuation.get_index(key)
+        table[index] = coalition_values[key]
+        known[index] = 1
+    table[0] = 0
+    known[0] = 1
+    fill_max_table(table, known, counts, floor=0)
+    valuation.table = array(table_typecode(table), table)
+    return valuation
@@ -0,0 +1,328 @@
+#!/usr/bin/env python
+from itertools import accumulate
+from math import ceil, comb, factorial
+from operator import mul
+
+from game_theory_utils.util.maskutil import subset_sums
+from game_theory_utils.coalitions.power_indices import SwingCounts
+
+"""Power indices for weighted voting games computed by counting coalitions rather than enumerating them.
+   A coalition wins if the total strength of its members is at least the critical value. With integer
+   strengths the number of coalitions of each size and total strength can be counted with a knapsack
+   style dynamic program (the coefficients of the generating function prod (1 + x y^w)), so Shapley-Shubik
+   and Banzhaf indices cost O(n^2 * crit) instead of O(2^n).
+   The other power indices (see power_indices.py) need the coalitions where each player is critical, which
+   are visited with a search over count vectors, strongest types first, that drops a branch as soon as its
+   strongest member is no longer critical or the players left can not make it win, so the coalitions far
+   above the quota are never reached."""
+
+__all__ = ('WeightedVotingGame', 'VotingValuation', 'create_weighted_voting_game', 'quota_power_indices',
+           'voting_power_indices', 'minimal_winning_coalitions')
+
+class VotingValuation:
+    """Coalition valuation for a weighted voting game: 1 if the total strength of the coalition is ≥ crit
+       (or > crit if strict), otherwise 0. It can be called with a counts tuple or a dict of type:count,
+       and also supports the batched valuation protocol used by the analysis functions:
+       evaluate_many(types, count_vectors) values a sequence of count vectors whose entries are the counts
+       of the given types, and evaluate_masks(players, masks) values coalitions given as bitmasks over
+       players. Both return a list of values."""
+
+    def __init__(self, type_strengths, crit, strict=False):
+        self.type_strengths = type_strengths
+        self.crit = crit
+        self.strict = strict
+
+    def __call__(self, player_counts):
+        if isinstance(player_counts, dict):
+            player_counts = player_counts.items()
+        return self.get_value(sum([self.type_strengths[pc[0]] * pc[1] for pc in player_counts]))
+
+    def get_value(self, strength):
+        if self.strict:
+            return int(strength > self.crit)
+        return int(strength >= self.crit)
+
+    def evaluate_many(self, types, count_vectors):
+        strengths = [self.type_strengths[type_] for type_ in types]
+        return [self.get_value(sum(map(mul, vector, strengths))) for vector in count_vectors]
+
+    def evaluate_masks(self, players, masks):
+        strengths = [self.type_strengths[player] for player in players]
+        size = len(masks)
+        if (isinstance(masks, range) and masks.step == 1 and size and not size & (size - 1)
+                and not masks.start % size and masks.stop <= 1 << len(players)):
+            # an aligned power of two range of masks shares its high bits, so only the low bits vary
+            low = size.bit_length() - 1
+            base = sum([strength for ii, strength in enumerate(strengths) if masks.start >> ii & 1])
+            totals = [base + total for total in subset_sums(strengths[:low])]
+        else:
+            totals = [sum([strength for ii, strength in enumerate(strengths) if mask >> ii & 1])
+                      for mask in masks]
+        return [self.get_value(total) for total in totals]
+
+
+class WeightedVotingGame:
+    """A weighted voting game with typed players. player_types gives the count of each type, type_strengths
+       the integer strength of one player of each type, and the value of a coalition is 1 if the sum of
+       the strengths of its members is ≥ crit. Results are given per player of each type, as for
+       TypedCoalitionalGame."""
+
+    def __init__(self, player_types, type_strengths, crit):
+        check_strengths(player_types, type_strengths)
+        self.player_types = player_types
+        self.type_strengths = type_strengths
+        self.crit = crit
+        self.quota = ceil(crit) # strengths are integers so this is the smallest winning strength
+
+        self.swing_counts = None
+        self.pivot_counts = None
+        self.shapley_values = None
+        self.banzhaf_values = None
+
+    def get_swing_counts(self):
+        """Number of coalitions of the other players for which one player of each type is a swing voter."""
+        if self.swing_counts is None:
+            self.calculate_power_indices()
+        return self.swing_counts
+
+    def get_pivot_counts(self):
+        """Number of orderings of all the players in which one player of each type is pivotal."""
+        if self.pivot_counts is None:
+            self.calculate_power_indices()
+        return self.pivot_counts
+
+    def get_shapley_values(self):
+        """Get the Shapley-Shubik values."""
+        if self.shapley_values is None:
+            self.calculate_power_indices()
+        return self.shapley_values
+
+    def get_banzhaf_values(self):
+        """Get the banzhaf values, normalized the same way as TypedCoalitionalGame."""
+        if self.banzhaf_values is None:
+            self.calculate_power_indices()
+        return self.banzhaf_values
+
+    def calculate_power_indices(self):
+        """Calculate swing and pivot counts and the indices derived from them. Just changes internal members."""
+        nplayers = sum(self.player_types.values())
+        strength_counts = get_strength_counts(self.player_types, self.type_strengths)
+        counts = coalition_counts(strength_counts, self.quota)
+        size_weights = [factorial(size) * factorial(nplayers - size - 1) for size in range(nplayers)]
+        swings = {}
+        pivots = {}
+        for strength in strength_counts:
+            swings[strength], pivots[strength] = 0, 0
+            if self.quota <= 0:
+                continue # every coalition wins, nobody swings
+            others = remove_player(counts, strength)
+            for size, row in enumerate(others):
+                decisive = sum(row[max(0, self.quota - strength):self.quota])
+                swings[strength] += decisive
+                if size < nplayers:
+                    pivots[strength] += decisive * size_weights[size]
+        self.swing_counts = {type_:swings[self.type_strengths[type_]] for type_ in self.player_types}
+        self.pivot_counts = {type_:pivots[self.type_strengths[type_]] for type_ in self.player_types}
+        perms = factorial(nplayers)
+        self.shapley_values = {type_:self.pivot_counts[type_] / perms for type_ in self.player_types}
+        total = sum([self.swing_counts[type_] * self.player_types[type_] for type_ in self.player_types])
+        self.banzhaf_values = {type_:(self.swing_counts[type_] / total if total else 0)
+                               for type_ in self.player_types}
+
+    def get_power_indices(self):
+        """Get the banzhaf, coleman, johnston, deegan-packel and holler-packel indices (see power_indices.py)
+           as a dict keyed by index name of dicts of type:value per player of the type."""
+        types = list(self.player_types)
+        indices = voting_power_indices([self.type_strengths[type_] for type_ in types],
+                                       [self.player_types[type_] for type_ in types], self.quota)
+        return {name:dict(zip(types, values)) for name, values in indices.items()}
+
+    def find_minimal_winning_coalitions(self):
+        """Get the minimal winning coalitions, those that lose if any member leaves, as a list of dicts of
+           type:count leaving out zero counts. Each stands for all the coalitions with those counts."""
+        types = list(self.player_types)
+        found = minimal_winning_coalitions([self.type_strengths[type_] for type_ in types],
+                                           [self.player_types[type_] for type_ in types], self.quota)
+        return [{type_:count for type_, count in zip(types, digits) if count} for digits in found]
+
+
+def check_strengths(player_types, type_strengths):
+    """Raise ValueError unless the strength of every type is a non-negative integer."""
+    for type_ in player_types:
+        strength = type_strengths[type_]
+        if not isinstance(strength, int) or strength < 0:
+            raise ValueError('strength of type {} must be a non-negative integer'.format(type_))
+
+def get_strength_counts(player_types, type_strengths):
+    """Number of players with each strength. Players of the same strength are interchangeable, so the
+       counting only needs to be done once per strength."""
+    strength_counts = {}
+    for type_ in player_types:
+        strength = type_strengths[type_]
+        strength_counts[strength] = strength_counts.get(strength, 0) + player_types[type_]
+    return strength_counts
+
+def quota_power_indices(player_types, type_strengths, quotas=None):
+    """Shapley-Shubik and banzhaf values of the weighted voting game for every quota, the smallest
+       winning strength. quotas is an iterable of integer quotas; by default every quota from 1 to the total
+       strength. For distinct players pass a player_types of {player:1 for player in strengths}.
+       Returns a dict keyed by quota of (shapley_values, banzhaf_values), normalized as in
+       WeightedVotingGame.
+       The coalitions are counted once, by size and every total strength up to the total. A player of
+       strength s swings the coalitions of the others whose strength is in [q - s, q), so summing the
+       counts over sizes (weighted by the permutation counts for shapley) and taking prefix sums over
+       strength gives the swing and pivot counts of each quota as a difference of two prefix sums. The
+       whole sweep costs about the same as one WeightedVotingGame with the quota at the total strength."""
+    check_strengths(player_types, type_strengths)
+    strength_counts = get_strength_counts(player_types, type_strengths)
+    nplayers = sum(player_types.values())
+    top = sum([strength * count for strength, count in strength_counts.items()])
+    if quotas is None:
+        quotas = range(1, top + 1)
+    counts = coalition_counts(strength_counts, top + 1)
+    size_weights = [factorial(size) * factorial(nplayers - size - 1) for size in range(nplayers)]
+    swing_sums = {}
+    pivot_sums = {}
+    for strength in strength_counts:
+        columns = list(zip(*remove_player(counts, strength))) # counts of the others by strength, then size
+        swing_sums[strength] = list(accumulate([sum(column) for column in columns], initial=0))
+        pivot_sums[strength] = list(accumulate([sum(map(mul, column, size_weights)) for column in columns],
+                                               initial=0))
+    perms = factorial(nplayers)
+    results = {}
+    for quota in quotas:
+        swings = {}
+        pivots = {}
+        for strength in strength_counts:
+            if quota <= 0:
+                swings[strength], pivots[strength] = 0, 0 # every coalition wins, nobody swings
+                continue
+            hi = min(quota, top + 1)
+            lo = min(max(0, quota - strength), top + 1)
+            swings[strength] = swing_sums[strength][hi] - swing_sums[strength][lo]
+            pivots[strength] = pivot_sums[strength][hi] - pivot_sums[strength][lo]
+        shapley_values = {type_:pivots[type_strengths[type_]] / perms for type_ in player_types}
+        total = sum([swings[type_strengths[type_]] * player_types[type_] for type_ in player_types])
+        banzhaf_values = {type_:(swings[type_strengths[type_]] / total if total else 0) for type_ in player_types}
+        results[quota] = (shapley_values, banzhaf_values)
+    return results
+
+
+def coalition_counts(strength_counts, quota):
+    """Count coalitions by size and total strength. strength_counts gives the number of players with each
+       strength. Returns a list of rows indexed by size; row[w] is the number of coalitions with that
+       size and total strength w, for w < quota."""
+    nplayers = sum(strength_counts.values())
+    width = max(quota, 0)
+    counts = [[0] * width for _ in range(nplayers + 1)]
+    if width:
+        counts[0][0] = 1
+    added = 0
+    for strength in strength_counts:
+        for _ in range(strength_counts[strength]):
+            added += 1
+            # multiply by (1 + x y^strength), going down in size so each player is used once
+            for size in range(added, 0, -1):
+                lower = counts[size - 1]
+                row = counts[size]
+                row[strength:] = [elm + less for elm, less in zip(row[strength:], lower)]
+    return counts
+
+def remove_player(counts, strength):
+    """Given coalition counts from coalition_counts, return the counts with one player of strength removed
+       i.e. divide the generating function by (1 + x y^strength)."""
+    width = len(counts[0])
+    others = [list(counts[0])]
+    for size in range(1, len(counts) - 1):
+        row = list(counts[size])
+        row[strength:] = [elm - less for elm, less in zip(row[strength:], others[size - 1])]
+        others.append(row)
+    return others
+
+def voting_power_indices(strengths, counts, quota):
+    """Power indices of a weighted voting game with integer strengths, where strengths and counts give the
+       strength and number of players of each type and a coalition wins if its total strength is at least
+       quota. Returns a dict keyed by index name of a list with the value of one player of each type."""
+    raw = SwingCounts(len(counts))
+    raw.winning = 2 ** sum(counts) - sum(strength_ways(strengths, counts, quota))
+    for digits, total, ways in _vulnerable_points(strengths, counts, quota):
+        raw.add(counts, digits, [digit > 0 and total - strength < quota
+                                 for digit, strength in zip(digits, strengths)], ways)
+    return raw.indices(counts)
+
+def minimal_winning_coalitions(strengths, counts, quota):
+    """The minimal winning coalitions of a weighted voting game, given as for voting_power_indices, as a
+       list of count tuples; each stands for prod C(c_t, k_t) coalitions. The types are added strongest
+       first and a branch stops as soon as it wins, since its supersets are not minimal, and starts at the
+       fewest players of the type that leave it a chance to win."""
+    order = sorted(range(len(counts)), key=lambda ii: -strengths[ii])
+    remaining = _remaining(order, strengths, counts)
+    digits = [0] * len(counts)
+    found = []
+    def visit(pos, total):
+        ii = order[pos]
+        strength = strengths[ii]
+        for count in range(_fewest(quota - total - remaining[pos + 1], strength), counts[ii] + 1):
+            digits[ii] = count
+            new_total = total + count * strength
+            if new_total >= quota:
+                if count and new_total - strength < quota: # the weakest member is critical
+                    found.append(tuple(digits))
+                break
+            visit(pos + 1, new_total)
+        digits[ii] = 0
+    if 0 < quota <= remaining[0]:
+        visit(0, 0)
+    return found
+
+def strength_ways(strengths, counts, quota):
+    """Number of coalitions with each total strength below quota, as a list indexed by strength."""
+    ways = [1] + [0] * (quota - 1) if quota > 0 else []
+    for strength, count in zip(strengths, counts):
+        for _ in range(count):
+            ways[strength:] = [elm + less for elm, less in zip(ways[strength:], ways)]
+    return ways
+
+def _remaining(order, strengths, counts):
+    """Total strength of the types from each position of order on."""
+    remaining = [0] * (len(order) + 1)
+    for pos in range(len(order) - 1, -1, -1):
+        ii = order[pos]
+        remaining[pos] = remaining[pos + 1] + strengths[ii] * counts[ii]
+    return remaining
+
+def _fewest(needed, strength):
+    """Fewest players of strength that bring at least the strength needed (which the caller knows they can)."""
+    return -(-needed // strength) if needed > 0 else 0
+
+def _vulnerable_points(strengths, counts, quota):
+    """Yield (digits, total strength, number of coalitions) for the count vectors of the winning coalitions
+       where the strongest member is critical, which are those with any critical member. Types are added
+       strongest first, so a branch whose strongest member is no longer critical can be dropped, and each
+       type starts at the fewest players that leave the branch a chance to win."""
+    order = sorted(range(len(counts)), key=lambda ii: -strengths[ii])
+    remaining = _remaining(order, strengths, counts)
+    if not 0 < quota <= remaining[0]:
+        return # every coalition wins or none does, nobody is critical
+    digits = [0] * len(counts)
+    def visit(pos, total, top, ways):
+        if pos == len(order):
+            yield tuple(digits), total, ways
+            return
+        ii = order[pos]
+        strength = strengths[ii]
+        for count in range(_fewest(quota - total - remaining[pos + 1], strength), counts[ii] + 1):
+            new_total = total + count * strength
+            new_top = strength if top is None and count else top
+            if new_top is not None and new_total - new_top >= quota:
+                break
+            digits[ii] = count
+            yield from visit(pos + 1, new_total, new_top, ways * comb(counts[ii], count))
+        digits[ii] = 0
+    yield from visit(0, 0, None, 1)
+
+
+def create_weighted_voting_game(player_strengths, crit):
+    """Create a weighted voting game where every player is distinct, from a player strengths dict."""
+    player_types = {player:1 for player in player_strengths}
+    return WeightedVotingGame(player_types, player_strengths, crit)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+"""Packed bitsets for the value tables of simple games."""
+
+from itertools import chain, islice
+
+"""In a simple game every coalition is worth 0 or 1, so the value table needs one bit per coalition rather
+   than an 8 byte array item. Held as a python int, with the value of the coalition at index k in bit k, a
+   whole table can also be compared with itself shifted by the index stride of a player: bits & ~(bits << s)
+   has a bit set wherever a coalition wins and the coalition at index - s loses, and int.bit_count counts them.
+   The work is done a machine word at a time inside the int operations, not once per coalition in python."""
+
+__all__ = ('BitsetTable', 'pack_bits', 'bit_positions', 'digit_mask', 'swing_bits', 'bit_sliced_counts',
+           'count_equals')
+
+_DIGITS = bytes.maketrans(b'\x00\x01', b'01')
+_BYTE_BITS = [tuple([byte >> ii & 1 for ii in range(8)]) for byte in range(256)]
+_BYTE_VALUES = [bytes(bits) for bits in _BYTE_BITS]
+
+class BitsetTable:
+    """A value table of zeros and ones packed eight to a byte, which indexes like an array of ints.
+       Setting an item to anything other than 0 or 1 (or False or True) raises ValueError. typecode is the
+       array typecode for a copy of the table holding values other than 0 and 1, as in
+       array(table.typecode, table)."""
+
+    typecode = 'q'
+
+    def __init__(self, size, data=None):
+        self.size = size
+        if data is None:
+            data = bytearray((size + 7) // 8)
+        elif len(data) != (size + 7) // 8:
+            raise ValueError('{} bytes do not hold {} bits'.format(len(data), size))
+        self.data = bytearray(data)
+
+    @classmethod
+    def from_values(cls, values):
+        """Pack a sequence of values, each of which must be 0 or 1."""
+        values = bytes(map(_bit_value, values))
+        return cls(len(values), pack_bits(values).to_bytes((len(values) + 7) // 8, 'little'))
+
+    @classmethod
+    def from_int(cls, size, bits):
+        """The table whose value at index k is bit k of bits."""
+        return cls(size, bits.to_bytes((size + 7) // 8, 'little'))
+
+    def to_int(self):
+        """The table as an int with the value at index k in bit k."""
+        return int.from_bytes(self.data, 'little')
+
+    def __len__(self):
+        return self.size
+
+    def _index(self, index):
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError('bitset index out of range')
+        return index
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[ii] for ii in range(*index.indices(self.size))]
+        index = self._index(index)
+        return self.data[index >> 3] >> (index & 7) & 1
+
+    def __setitem__(self, index, val):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.size)
+            values = bytes(map(_bit_value, val))
+            if len(values) != len(range(start, stop, step)):
+                raise ValueError('can not change the size of a bitset')
+            if step == 1 and not start & 7 and (not len(values) & 7 or stop == self.size):
+                # whole bytes can be packed at once
+                self.data[start >> 3:(stop + 7) >> 3] = pack_bits(values).to_bytes((len(values) + 7) // 8, 'little')
+            else:
+                for ii, bit in zip(range(start, stop, step), values):
+                    self[ii] = bit
+            return
+        index = self._index(index)
+        if _bit_value(val):
+            self.data[index >> 3] |= 1 << (index & 7)
+        else:
+            self.data[index >> 3] &= ~(1 << (index & 7))
+
+    def __iter__(self):
+        return islice(chain.from_iterable(map(_BYTE_BITS.__getitem__, self.data)), self.size)
+
+    def tolist(self):
+        return list(self)
+
+    def unpack(self):
+        """The values as a bytes object of zeros and ones, one byte per item. It takes a byte per coalition
+           rather than a bit, but indexing it is a C level lookup rather than a python call, so loops that read
+           the table one value at a time should read this instead."""
+        return b''.join(map(_BYTE_VALUES.__getitem__, self.data))[:self.size]
+
+    def count(self, val):
+        """Number of items equal to val."""
+        ones = self.to_int().bit_count()
+        if val == 1:
+            return ones
+        return self.size - ones if val == 0 else 0
+
+
+def _bit_value(val):
+    if val == 1:
+        return 1
+    if val == 0:
+        return 0
+    raise ValueError('a bitset can only hold 0 and 1, not {}'.format(val))
+
+def pack_bits(values):
+    """Pack the truth of each of a sequence of values into an int, value k in bit k."""
+    digits = bytes(map(bool, values)).translate(_DIGITS)[::-1]
+    return int(digits, 2) if digits else 0
+
+def bit_positions(bits):
+    """Yield the position of each bit set in a non negative int, lowest first. The bits are found by
+       searching its binary string, so the python work is per bit set rather than per bit."""
+    text = bin(bits)[:1:-1]
+    position = text.find('1')
+    while position >= 0:
+        yield position
+        position = text.find('1', position + 1)
+
+def digit_mask(size, stride, count):
+    """Bits set at every index from 0 to size of a mixed radix table (see radixutil) whose digit with the
+       given stride and maximum count is at least one. For a table indexed by coalition mask the stride is
+       the bit of a player and the count 1. size must be a multiple of the period (count + 1) * stride."""
+    period = (count + 1) * stride
+    mask = (1 << period) - (1 << stride)
+    while period < size: # repeat the pattern by doubling
+        mask |= mask << period
+        period *= 2
+    return mask & ((1 << size) - 1)
+
+def swing_bits(bits, size, stride, count=1):
+    """Given a packed table of size entries, the bits at the indexes of the winning coalitions that lose
+       when one player with the given stride (and maximum count) leaves."""
+    return bits & ~(bits << stride) & digit_mask(size, stride, count)
+
+def bit_sliced_counts(bitsets):
+    """Count, at each position, how many of the bitsets have the bit set, keeping the counts bit sliced: a
+       list of ints where bit k of the j'th int is bit j of the count at position k. Each bitset is added with
+       a ripple of whole int operations, so counting n bitsets takes about n log n of them."""
+    digits = []
+    for carry in bitsets:
+        for jj, digit in enumerate(digits):
+            digits[jj], carry = digit ^ carry, digit & carry
+            if not carry:
+                break
+        if carry:
+            digits.append(carry)
+    return digits
+
+def count_equals(digits, value, size):
+    """The bits, of size, where a bit sliced count from bit_sliced_counts equals value."""
+    if value >> len(digits):
+        return 0
+    mask = (1 << size) - 1
+    for jj, digit in enumerate(digits):
+        mask &= digit if value >> jj & 1 else ~digit
+    return mask
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""Caching for expensive coalition valuation functions."""
+
+from collections import OrderedDict
+
+__all__ = ('CachedValuation', 'coalition_key')
+
+def coalition_key(player_counts):
+    """Hashable key for a coalition given as a counts tuple or a dict of type:count. Zero counts are
+       dropped, so (('a', 0), ('b', 1)) and {'b': 1} have the same key."""
+    if isinstance(player_counts, dict):
+        return tuple(sorted([(type_, count) for type_, count in player_counts.items() if count]))
+    return tuple([elm for elm in player_counts if elm[1]])
+
+
+class CachedValuation:
+    """Wraps a coalition valuation function so each coalition is only valued once.
+       policy 'lru' keeps at most capacity values, discarding the least recently used; policy 'all'
+       keeps every value. hits, misses and evictions count what the cache has done.
+       If the wrapped valuation supports the batched evaluate_many(types, count_vectors) protocol so
+       does the cache, and only the coalitions not already cached are passed on."""
+
+    def __init__(self, fun, capacity=None, policy='lru', key=coalition_key):
+        if policy not in ('lru', 'all'):
+            raise ValueError('unknown cache policy {}'.format(policy))
+        if policy == 'lru' and capacity is None:
+            raise ValueError('the lru policy needs a capacity')
+        self.fun = fun
+        self.capacity = capacity
+        self.policy = policy
+        self.key = key
+        self.values = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if hasattr(fun, 'evaluate_many'):
+            self.evaluate_many = self._evaluate_many
+
+    def __call__(self, player_counts):
+        key = self.key(player_counts)
+        if key in self.values:
+            self.hits += 1
+            if self.policy == 'lru':
+                self.values.move_to_end(key)
+            return self.values[key]
+        self.misses += 1
+        val = self.fun(player_counts)
+        self._store(key, val)
+        return val
+
+    def _evaluate_many(self, types, count_vectors):
+        keys = [self.key(tuple(zip(types, vector))) for vector in count_vectors]
+        missing = {}
+        for ii, key in enumerate(keys):
+            if key in self.values:
+                self.hits += 1
+                if self.policy == 'lru':
+                    self.values.move_to_end(key)
+            elif key not in missing:
+                missing[key] = ii
+            else:
+                self.hits += 1
+        found = {key:self.values[key] for key in keys if key in self.values}
+        if missing:
+            self.misses += len(missing)
+            new_values = self.fun.evaluate_many(types, [count_vectors[ii] for ii in missing.values()])
+            for key, val in zip(missing, new_values):
+                found[key] = val
+                self._store(key, val)
+        return [found[key] for key in keys]
+
+    def _store(self, key, val):
+        self.values[key] = val
+        if self.policy == 'lru':
+            while len(self.values) > self.capacity:
+                self.values.popitem(last=False)
+                self.evictions += 1
+
+    def get_stats(self):
+        """Dict of hits, misses, evictions, current size and hit rate."""
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self.values), 'hit_rate': self.hits / lookups if lookups else 0.0}
+
+    def clear(self):
+        """Forget the cached values. The counters are kept."""
+        self.values.clear()
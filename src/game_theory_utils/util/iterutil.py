@@ -4,6 +4,9 @@
 from collections import defaultdict
 from copy import deepcopy
 from itertools import chain, combinations, permutations, repeat, product
+from math import prod
+
+from game_theory_utils.util.radixutil import radix_strides, fill_max_table
 
 __all__ = ['powerset', 'froze_remove_one', 'distinct_permutations', 'sequence_counts', 'sequence_from_types',
            'subtype_coalitions', 'one_less', 'zero_to_max']
@@ -109,14 +112,21 @@ def fill_vals(vals, player_types):
        Player_types is a tuple.
        Updates vals in place"""
 
-    zeros = tuple([(type_[0], 0) for type_ in player_types])
+    types = [type_[0] for type_ in player_types]
+    counts = [type_[1] for type_ in player_types]
+    strides = radix_strides(counts)
+    type_index = {type_:ii for ii, type_ in enumerate(types)}
+    table = [0] * prod([count + 1 for count in counts])
+    known = bytearray(len(table))
+    for key in vals:
+        index = sum([strides[type_index[elm[0]]] * elm[1] for elm in key])
+        table[index] = vals[key]
+        known[index] = 1
+    table[0] = 0
+    known[0] = 1
+    fill_max_table(table, known, counts, floor=0)
+    zeros = tuple([(type_, 0) for type_ in types])
     vals[zeros] = 0
-    for combo in zero_to_max(player_types):
-        if combo not in vals:
-            max_ = 0
-            for less, _ in one_less(combo):
-                if less in vals:
-                    if vals[less] > max_:
-                        max_ = vals[less]
-            vals[combo] = max_
-
+    for index, combo in enumerate(zero_to_max(player_types)):
+        if not known[index]:
+            vals[combo] = table[index]
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+"""A small dense linear programming solver, enough for the core and nucleolus calculations."""
+
+"""The problems that come up for coalitional games have a payoff variable per player (plus one or two more)
+   and a constraint per coalition, so there are few variables and many constraints. solve_lp therefore
+   works on the dual problem, which has a row per variable and a column per constraint, and reads the
+   primal solution off the simplex multipliers. The tableau simplex method uses the largest reduced cost
+   to pick the entering column, switching to Bland's rule during runs of degenerate pivots so it can not
+   cycle."""
+
+__all__ = ('LPResult', 'simplex', 'solve_lp')
+
+class LPResult:
+    """Solution of a linear program. status is 'optimal', 'infeasible' or 'unbounded'; the other members
+       are only set for an optimal solution. x gives the value of each variable, objective the value of
+       the objective, ub_duals the (nonnegative) dual value of each inequality and eq_duals the dual value
+       of each equality."""
+
+    def __init__(self, status, x=None, objective=None, ub_duals=None, eq_duals=None):
+        self.status = status
+        self.x = x
+        self.objective = objective
+        self.ub_duals = ub_duals
+        self.eq_duals = eq_duals
+
+
+def _pivot(tableau, objrow, row, col):
+    """Pivot the tableau so column col is basic in row."""
+    prow = tableau[row]
+    factor = prow[col]
+    prow = [elm / factor for elm in prow]
+    tableau[row] = prow
+    for other in tableau + [objrow]:
+        if other is prow:
+            continue
+        factor = other[col]
+        if factor:
+            other[:] = [elm - factor * pelm for elm, pelm in zip(other, prow)]
+
+
+def _optimize(tableau, objrow, basis, ncols, tol):
+    """Run simplex iterations on the tableau until the reduced costs in objrow are all nonnegative. Only the
+       first ncols columns may enter the basis. Returns False if the objective is unbounded."""
+    degenerate = 0
+    while True:
+        if degenerate > len(tableau):
+            # Bland's rule: the first improving column
+            col = next((jj for jj in range(ncols) if objrow[jj] < -tol), None)
+        else:
+            col = min(range(ncols), key=objrow.__getitem__, default=None)
+            if col is not None and objrow[col] >= -tol:
+                col = None
+        if col is None:
+            return True
+        row = None
+        for ii, trow in enumerate(tableau):
+            if trow[col] > tol:
+                ratio = trow[-1] / trow[col]
+                if row is None or ratio < best - tol or (ratio <= best + tol and basis[ii] < basis[row]):
+                    row = ii
+                    best = ratio
+        if row is None:
+            return False
+        degenerate = degenerate + 1 if best <= tol else 0
+        _pivot(tableau, objrow, row, col)
+        basis[row] = col
+
+
+def simplex(c, A, b, tol=1e-9):
+    """Maximize c·y subject to A y = b and y ≥ 0 with the two phase tableau simplex method.
+       Returns (status, y, multipliers), where status is 'optimal', 'infeasible' or 'unbounded' and
+       multipliers gives the simplex multiplier of each row, which solves the dual problem
+       minimize π·b subject to π A ≥ c."""
+    nrows = len(A)
+    ncols = len(c)
+    # rows are negated as needed so b ≥ 0, and an artificial variable starts basic in each row
+    signs = [-1 if elm < 0 else 1 for elm in b]
+    tableau = [[sign * elm for elm in arow] + [1 if jj == ii else 0 for jj in range(nrows)] + [sign * belm]
+               for ii, (arow, belm, sign) in enumerate(zip(A, b, signs))]
+    basis = [ncols + ii for ii in range(nrows)]
+    # phase 1 maximizes minus the sum of the artificial variables
+    objrow = [-sum([trow[jj] for trow in tableau]) for jj in range(ncols)] + [0] * nrows
+    objrow.append(-sum([trow[-1] for trow in tableau]))
+    _optimize(tableau, objrow, basis, ncols, tol)
+    if objrow[-1] < -tol * max(1, max([abs(elm) for elm in b], default=0)):
+        return 'infeasible', None, None
+    # drive any artificial variables left in the basis out; if a row has no other entries it is redundant
+    for ii in range(nrows):
+        if basis[ii] >= ncols:
+            col = next((jj for jj in range(ncols) if abs(tableau[ii][jj]) > tol), None)
+            if col is not None:
+                _pivot(tableau, objrow, ii, col)
+                basis[ii] = col
+    # phase 2, the artificial columns are kept to read off the multipliers but may not enter
+    objrow = [-elm for elm in c] + [0] * (nrows + 1)
+    for ii, trow in enumerate(tableau):
+        if basis[ii] < ncols and c[basis[ii]]:
+            cost = c[basis[ii]]
+            objrow = [elm + cost * telm for elm, telm in zip(objrow, trow)]
+    if not _optimize(tableau, objrow, basis, ncols, tol):
+        return 'unbounded', None, None
+    y = [0] * ncols
+    for ii, trow in enumerate(tableau):
+        if basis[ii] < ncols:
+            y[basis[ii]] = trow[-1]
+    multipliers = [sign * objrow[ncols + ii] for ii, sign in enumerate(signs)]
+    return 'optimal', y, multipliers
+
+
+def solve_lp(c, A_ub=(), b_ub=(), A_eq=(), b_eq=(), tol=1e-9):
+    """Minimize c·x subject to A_ub x ≤ b_ub and A_eq x = b_eq, where the variables x are free (they may
+       be negative). Returns an LPResult. If the problem has no optimum the status is 'infeasible' or
+       'unbounded' (a problem that is infeasible can also be reported as unbounded).
+       The dual problem, maximize -b_ub·u + b_eq·w subject to -A_ub^T u + A_eq^T w = c and u ≥ 0, is solved
+       with simplex, with w split into positive and negative parts."""
+    nvars = len(c)
+    nub = len(A_ub)
+    neq = len(A_eq)
+    A = [[-arow[kk] for arow in A_ub] + [arow[kk] for arow in A_eq] + [-arow[kk] for arow in A_eq]
+         for kk in range(nvars)]
+    dual_c = [-elm for elm in b_ub] + list(b_eq) + [-elm for elm in b_eq]
+    status, y, multipliers = simplex(dual_c, A, c, tol)
+    if status == 'unbounded':
+        return LPResult('infeasible')
+    if status == 'infeasible':
+        return LPResult('unbounded')
+    x = multipliers
+    eq_duals = [y[nub + ii] - y[nub + neq + ii] for ii in range(neq)]
+    return LPResult('optimal', x, sum([elm * xelm for elm, xelm in zip(c, x)]), y[:nub], eq_duals)
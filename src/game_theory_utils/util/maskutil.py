@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""Utilities for working with coalitions as integer bitmasks."""
+
+from array import array
+from operator import add, sub
+
+from game_theory_utils.util.bitsetutil import BitsetTable
+
+"""When every player is distinct a coalition can be represented as an integer where bit ii is set if
+   the player at position ii of the player order is a member. The value of every coalition can then be
+   kept in a flat array indexed by the mask, and subsets/supersets are found with bit operations
+   instead of building new frozensets."""
+
+__all__ = ('mask_from_players', 'players_from_mask', 'mask_bits', 'low_bit_index', 'submasks',
+           'table_typecode', 'widen_table', 'subset_sums', 'mobius_transform')
+
+def mask_from_players(players, player_bits):
+    """Get the mask for an iterable of players. player_bits is a dict giving the bit index of each player."""
+    mask = 0
+    for player in players:
+        mask |= 1 << player_bits[player]
+    return mask
+
+def players_from_mask(mask, player_order):
+    """Get the frozenset of players represented by mask."""
+    return frozenset([player_order[ii] for ii, _ in mask_bits(mask)])
+
+def mask_bits(mask):
+    """Yield (index, bit) for each bit set in mask, lowest first."""
+    while mask:
+        bit = mask & -mask
+        yield bit.bit_length() - 1, bit
+        mask ^= bit
+
+def low_bit_index(mask):
+    """Index of the lowest bit set in a nonzero mask."""
+    return (mask & -mask).bit_length() - 1
+
+def submasks(mask):
+    """Yield every submask of mask, including mask itself and zero."""
+    sub = mask
+    while True:
+        yield sub
+        if not sub:
+            return
+        sub = (sub - 1) & mask
+
+def table_typecode(values):
+    """Pick an array typecode able to hold all the values: signed 64 bit integers if every value is
+       an integer that fits, otherwise double."""
+    for val in values:
+        if not isinstance(val, int) or not -2**63 <= val < 2**63:
+            return 'd'
+    return 'q'
+
+def widen_table(table, val):
+    """Return table if val can be stored in it, otherwise a copy that can hold it: a BitsetTable only
+       holds 0 and 1 and an array of integers only integers. A memoryview of integers, such as a table
+       mapped from a file, can not be copied without leaving the file behind, so it raises ValueError."""
+    if isinstance(table, BitsetTable):
+        return table if val in (0, 1) else array(table_typecode([val]), table)
+    if isinstance(table, array) and table.typecode == 'q' and table_typecode([val]) == 'd':
+        return array('d', table)
+    if isinstance(table, memoryview) and table.format == 'q' and table_typecode([val]) == 'd':
+        raise ValueError('a mapped table of integers can not hold {}'.format(val))
+    return table
+
+def subset_sums(weights):
+    """Given a weight for each bit, return a list giving the total weight of every mask."""
+    sums = [0] * (1 << len(weights))
+    for mask in range(1, len(sums)):
+        sums[mask] = sums[mask & (mask - 1)] + weights[low_bit_index(mask)]
+    return sums
+
+def mobius_transform(table, inverse=False):
+    """Replace, in place, each value v(S) of a table indexed by mask with the harsanyi dividend
+       d(S) = sum over T ⊆ S of (-1)^|S - T| v(T). If inverse, replace each dividend with
+       v(S) = sum over T ⊆ S of d(T), which undoes it. table may be a list or an array.
+       For each bit the values with the bit set are updated from those without it, n * 2^(n-1) operations,
+       done a slice at a time: for low bits the slices are strided, for high bits contiguous."""
+    size = len(table)
+    op = add if inverse else sub
+    make = (lambda vals: array(table.typecode, vals)) if isinstance(table, array) else list
+    bit = 1
+    while bit < size:
+        step = 2 * bit
+        if bit <= size // step:
+            for offset in range(bit):
+                table[bit + offset::step] = make(map(op, table[bit + offset::step], table[offset::step]))
+        else:
+            for base in range(0, size, step):
+                table[base + bit:base + step] = make(map(op, table[base + bit:base + step], table[base:base + bit]))
+        bit = step
+    return table
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""Utilities for keeping typed coalition values in a flat table."""
+
+from array import array
+from itertools import product
+from math import comb, prod
+from operator import mul
+
+"""A typed coalition is a vector of counts k with 0 ≤ k_i ≤ c_i. Treating the counts as the digits of a
+   mixed radix number with radices (c_i + 1) gives every coalition a unique index, in the same order as
+   zero_to_max (the last type varies fastest). The coalition with one less of type i is at index - stride_i,
+   so neighbours can be visited without building tuples."""
+
+__all__ = ('radix_strides', 'table_size', 'encode_counts', 'decode_index', 'encode_counts_many', 'decode_indexes',
+           'lattice_digits', 'lattice_sums', 'fill_max_table', 'binomial_transform')
+
+def radix_strides(counts):
+    """Given the maximum count of each type, return the index stride of each type."""
+    strides = [1] * len(counts)
+    for ii in range(len(counts) - 2, -1, -1):
+        strides[ii] = strides[ii + 1] * (counts[ii + 1] + 1)
+    return strides
+
+def table_size(counts):
+    """Number of coalitions, prod (c_i + 1)."""
+    return prod([count + 1 for count in counts])
+
+def encode_counts(digits, strides):
+    """Index of the coalition with the given count of each type."""
+    return sum([digit * stride for digit, stride in zip(digits, strides)])
+
+def decode_index(index, counts):
+    """Count of each type for the coalition at index."""
+    digits = [0] * len(counts)
+    for ii in range(len(counts) - 1, -1, -1):
+        index, digits[ii] = divmod(index, counts[ii] + 1)
+    return tuple(digits)
+
+def encode_counts_many(vectors, strides):
+    """Encode a sequence of count vectors, returning a list of indexes."""
+    return [sum(map(int.__mul__, vector, strides)) for vector in vectors]
+
+def decode_indexes(indexes, counts):
+    """Decode a sequence of indexes, returning a list of count tuples."""
+    return [decode_index(index, counts) for index in indexes]
+
+def lattice_digits(counts):
+    """Iterate over the count vectors in index order, so enumerate gives (index, counts)."""
+    return product(*[range(count + 1) for count in counts])
+
+def lattice_sums(weights, counts):
+    """Given a weight for each type, return a list giving the total weight, sum k_i * w_i, of every
+       coalition in index order."""
+    sums = [0]
+    for weight, count in zip(weights, counts):
+        sums = [elm + digit * weight for elm in sums for digit in range(count + 1)]
+    return sums
+
+def fill_max_table(table, known, counts, floor=None):
+    """Fill in the values of a flat table that were not given. Each missing value becomes the highest value
+       of the coalitions with one less player (but not less than floor, if given). known is a bytearray
+       flagging the indexes that were given. Indexes are visited in increasing order so every sub-coalition
+       is filled before it is needed. counts gives the maximum count of each type; for coalitions of distinct
+       players use counts of 1. Updates table in place."""
+    strides = radix_strides(counts)
+    ntypes = len(counts)
+    digits = [0] * ntypes
+    for index in range(len(table)):
+        if not known[index]:
+            max_ = floor
+            for ii in range(ntypes):
+                if digits[ii]:
+                    val = table[index - strides[ii]]
+                    if max_ is None or val > max_:
+                        max_ = val
+            table[index] = 0 if max_ is None else max_
+        # advance the digits to the next index
+        ii = ntypes - 1
+        while ii >= 0:
+            digits[ii] += 1
+            if digits[ii] <= counts[ii]:
+                break
+            digits[ii] = 0
+            ii -= 1
+
+def binomial_transform(table, counts, inverse=False):
+    """Replace, in place, each value v(k) of a typed game's table with the harsanyi dividend of each
+       coalition with counts k, d(k) = sum over j ≤ k of prod (-1)^(k_i - j_i) C(k_i, j_i) v(j). If inverse,
+       replace each dividend with v(k) = sum over j ≤ k of prod C(k_i, j_i) d(j), which undoes it.
+       The transform is done one type at a time. For a type with stride s the coalitions with each count
+       of the type are contiguous runs of s entries, so whole runs are combined at once."""
+    make = (lambda vals: array(table.typecode, vals)) if isinstance(table, array) else list
+    for stride, count in zip(radix_strides(counts), counts):
+        coefs = [[comb(kk, jj) * (1 if inverse or (kk - jj) % 2 == 0 else -1) for jj in range(kk + 1)]
+                 for kk in range(count + 1)]
+        block = stride * (count + 1)
+        for start in range(0, len(table), block):
+            runs = [table[start + jj * stride:start + (jj + 1) * stride] for jj in range(count + 1)]
+            for kk in range(1, count + 1):
+                table[start + kk * stride:start + (kk + 1) * stride] = make(
+                    [sum(map(mul, coefs[kk], column)) for column in zip(*runs[:kk + 1])])
+    return table
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""Files holding a flat table of values behind a small header, for memory mapping large games."""
+
+from array import array
+from ast import literal_eval
+import mmap
+import os
+import struct
+import sys
+
+"""Layout: the magic bytes, a format version and the length of the header as little endian unsigned
+   16 and 32 bit integers, then the header, which is the repr of a dict of plain python values (read back
+   with literal_eval), then zero padding so the payload starts at a multiple of PAYLOAD_ALIGN. The payload is
+   the table in native byte order as raw array items. The header always has the array typecode, number of
+   items and byte order of the payload; other keys are up to the caller. A file can hold further arrays after
+   the table, each starting at a multiple of PAYLOAD_ALIGN, listed as (typecode, size) pairs under 'arrays'.
+   Checkpoints for resumable sweeps are kept next to the table file in the same header format."""
+
+__all__ = ('MAGIC', 'FORMAT_VERSION', 'PAYLOAD_ALIGN', 'write_table_header', 'read_table_header',
+           'create_table_file', 'write_table_file', 'map_table_file', 'map_table_arrays', 'read_checkpoint',
+           'write_checkpoint', 'remove_checkpoint')
+
+MAGIC = b'GTUTABLE'
+FORMAT_VERSION = 1
+PAYLOAD_ALIGN = 64
+_PREFIX = struct.Struct('<8sHI')
+
+def write_table_header(fobj, header):
+    """Write the header at the start of an open binary file. Returns the offset of the payload."""
+    text = repr(header).encode('utf-8')
+    offset = _PREFIX.size + len(text)
+    offset += -offset % PAYLOAD_ALIGN
+    fobj.seek(0)
+    fobj.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(text)))
+    fobj.write(text)
+    fobj.write(bytes(offset - _PREFIX.size - len(text)))
+    return offset
+
+def read_table_header(fobj):
+    """Read the header of an open binary file. Returns (header, payload offset)."""
+    fobj.seek(0)
+    prefix = fobj.read(_PREFIX.size)
+    if len(prefix) < _PREFIX.size:
+        raise ValueError('not a table file')
+    magic, version, length = _PREFIX.unpack(prefix)
+    if magic != MAGIC:
+        raise ValueError('not a table file')
+    if version > FORMAT_VERSION:
+        raise ValueError('table file format version {} is newer than {}'.format(version, FORMAT_VERSION))
+    header = literal_eval(fobj.read(length).decode('utf-8'))
+    offset = _PREFIX.size + length
+    return header, offset + -offset % PAYLOAD_ALIGN
+
+def create_table_file(path, header, typecode, size, fill=None, chunk_size=1 << 20):
+    """Create a table file with room for size items of the given array typecode. The payload is zero
+       unless fill is given, in which case every item is set to it, chunk_size items at a time."""
+    header = dict(header, typecode=typecode, size=size, byteorder=sys.byteorder)
+    itemsize = array(typecode).itemsize
+    with open(path, 'wb') as fobj:
+        offset = write_table_header(fobj, header)
+        fobj.truncate(offset + size * itemsize)
+        if fill is not None:
+            fobj.seek(offset)
+            chunk = array(typecode, [fill]) * min(size, chunk_size)
+            for start in range(0, size, chunk_size):
+                fobj.write(chunk[:min(chunk_size, size - start)].tobytes())
+    return header
+
+def write_table_file(path, header, tables):
+    """Write a table file holding one or more arrays (anything with a typecode and tobytes, like array.array).
+       The first is the table and the rest are listed in the header under 'arrays'."""
+    header = dict(header, typecode=tables[0].typecode, size=len(tables[0]), byteorder=sys.byteorder,
+                  arrays=[(table.typecode, len(table)) for table in tables[1:]])
+    with open(path, 'wb') as fobj:
+        write_table_header(fobj, header)
+        for table in tables:
+            data = table.tobytes()
+            fobj.write(data)
+            fobj.write(bytes(-len(data) % PAYLOAD_ALIGN))
+    return header
+
+def map_table_file(path, writable=False):
+    """Memory map a table file. Returns (header, mmap, view) where view is a memoryview of the payload
+       cast to the table's typecode, so it indexes like an array without reading the file into memory.
+       Release the view before closing the mmap."""
+    header, mapped, views = map_table_arrays(path, writable=writable)
+    for view in views[1:]:
+        view.release()
+    return header, mapped, views[0]
+
+def map_table_arrays(path, writable=False):
+    """Memory map a table file. Returns (header, mmap, views) with a memoryview for each array in the file,
+       the table first."""
+    with open(path, 'r+b' if writable else 'rb') as fobj:
+        header, offset = read_table_header(fobj)
+        if header['byteorder'] != sys.byteorder:
+            raise ValueError('table file has {} endian values'.format(header['byteorder']))
+        mapped = mmap.mmap(fobj.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+    views = []
+    for typecode, size in [(header['typecode'], header['size'])] + list(header.get('arrays', [])):
+        nbytes = size * array(typecode).itemsize
+        views.append(memoryview(mapped)[offset:offset + nbytes].cast(typecode))
+        offset += nbytes + -nbytes % PAYLOAD_ALIGN
+    return header, mapped, views
+
+def read_checkpoint(path):
+    """The checkpoint dict saved at path, or None if there is none."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as fobj:
+        header, _ = read_table_header(fobj)
+    return header
+
+def write_checkpoint(path, checkpoint):
+    """Save a checkpoint dict, replacing any earlier one in a single step so a crash leaves one or the other."""
+    temp = path + '.tmp'
+    with open(temp, 'wb') as fobj:
+        write_table_header(fobj, checkpoint)
+        fobj.flush()
+        os.fsync(fobj.fileno())
+    os.replace(temp, path)
+
+def remove_checkpoint(path):
+    if os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+import sys
+sys.path.append('../src')
+
+from array import array
+
+from game_theory_utils.coalitions.coalition import *
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    from ast import literal_eval
+    parser = ArgumentParser()
+    parser.add_argument('--verbose', action='store_true')
+    parser.add_argument('--shapley', action='store_true', help="compare shapley methods")
+    parser.add_argument('--banzhaf', action='store_true', help="compare banzhaf values of packed and unpacked tables")
+    parser.add_argument('--symmetry', action='store_true', help="symmetric players and the equivalent typed game")
+    parser.add_argument('--semivalues', help="list of semivalues to compute in one pass, e.g. \"['shapley', ('beta', 4, 1)]\"")
+    parser.add_argument('--checks', action='store_true', help="check monotonic, superadditive and convex")
+    parser.add_argument('--estimate', type=int, help="estimate shapley values from this many permutations")
+    parser.add_argument('--processes', type=int, default=1, help="processes for --estimate")
+    parser.add_argument('--seed', type=int, help="seed for --estimate")
+    parser.add_argument('--strategy', default='permutation', help="sampling strategy for --estimate")
+    parser.add_argument('--strengths', help='player strengths dictionary for a voting game')
+    parser.add_argument('--crit', type=float, help='critical value for a voting game')
+    parser.add_argument('--vals', help='coalition values dictionary')
+    parser.add_argument('--dividends', action='store_true', help="harsanyi dividends, and the game rebuilt from them")
+    parser.add_argument('--nucleolus', action='store_true', help="least core, a core imputation and the nucleolus")
+    parser.add_argument('--update', help='coalition values dictionary of changes made incrementally')
+    parser.add_argument('--unions', help="list of lists of players, owen values of the blocs (estimated too with --estimate)")
+    parser.add_argument('--core', help='list of imputations to test for core membership')
+    args = parser.parse_args()
+
+    if args.strengths:
+        strengths = literal_eval(args.strengths)
+        cg = create_voting_game(player_strengths=strengths, crit=args.crit)
+    if args.vals:
+        vals = literal_eval(args.vals)
+        cg = CoalitionalGame(vals)
+    if args.verbose:
+        cg.verbose = True
+
+    if args.shapley:
+        print('permutation values', cg.get_shapley_values(method='permutation'))
+        print('subset values', cg.get_shapley_values(method='subset'))
+        print('dividend values', cg.get_shapley_values(method='dividend'))
+
+    if args.banzhaf:
+        print('table', type(cg.table).__name__, 'simple', cg.get_is_simple())
+        print('banzhaf values', cg.get_banzhaf_values())
+        unpacked = create_game_from_table(cg.player_order, array('q', cg.table))
+        print('unpacked values', unpacked.get_banzhaf_values())
+
+    if args.update:
+        cg.enable_incremental()
+        for key, val in literal_eval(args.update).items():
+            cg.coalition_values[key] = val
+        print('incremental shapley values', cg.get_shapley_values())
+        print('incremental banzhaf values', cg.get_banzhaf_values())
+        print('recomputed shapley values', cg.get_shapley_values(method='subset'))
+        cg.disable_incremental()
+        print('recomputed banzhaf values', cg.get_banzhaf_values())
+
+    if args.symmetry:
+        print('symmetry classes', cg.get_symmetry_classes())
+        typed, player_type = cg.get_typed_game()
+        print('player types', typed.player_types, 'type of each player', player_type)
+        print('typed shapley values', cg.get_shapley_values(method='typed'))
+        print('subset shapley values', cg.get_shapley_values(method='subset'))
+
+    if args.semivalues:
+        semivalues = literal_eval(args.semivalues)
+        for semivalue, values in zip(semivalues, cg.get_semivalues(semivalues)):
+            print(semivalue, values)
+
+    if args.checks:
+        print('monotonic', cg.get_is_monotonic())
+        print('superadditive', cg.get_is_superadditive(), cg.find_superadditivity_violation())
+        print('convex', cg.get_is_convex(), cg.find_convexity_violation())
+
+    if args.dividends:
+        dividends = cg.get_harsanyi_dividends()
+        print('dividends', dividends)
+        print('rebuilt values', dict(create_game_from_dividends(dividends, cg.player_order).coalition_values))
+
+    if args.nucleolus:
+        print('least core', cg.get_least_core())
+        print('core imputation', cg.find_core_imputation())
+        print('nucleolus', cg.get_nucleolus())
+        print('prenucleolus', cg.get_nucleolus(pre=True))
+
+    if args.core:
+        imputations = literal_eval(args.core)
+        in_core, violations = cg.is_core_batch(imputations)
+        for imputation, member, violation in zip(imputations, in_core, violations):
+            print(imputation, 'in core' if member else 'not in core', violation or '')
+
+    if args.unions:
+        unions = literal_eval(args.unions)
+        print('owen values', cg.get_owen_values(unions))
+        if args.estimate:
+            estimate = cg.estimate_owen_values(unions, perms=args.estimate, processes=args.processes, seed=args.seed)
+            print('estimated owen values', estimate.values)
+            print('confidence intervals', estimate.intervals)
+        sys.exit()
+
+    if args.estimate:
+        estimate = cg.estimate_shapley_values(perms=args.estimate, processes=args.processes, seed=args.seed,
+                                              strategy=args.strategy)
+        print('estimated values', estimate.values)
+        print('standard errors', estimate.stderrs)
+        print('confidence intervals', estimate.intervals)
+        print('sample variances', estimate.variances)
+        print('valuations', estimate.evaluations)
+
+# Exact values computed different ways must give the same answer
+
+# glove game gives 1/6, 1/6, 2/3
+# ./test_coalition.py --shapley --vals "{(0,2):1, (1,2):1}"
+
+# ./test_coalition.py --shapley --strengths "{0:1, 1:1, 2:2, 3:3, 4:1}" --crit 5
+
+# Voting games are kept as packed bitsets; the banzhaf values must not depend on the table
+# ./test_coalition.py --banzhaf --strengths "{0:1, 1:1, 2:2, 3:3, 4:1}" --crit 5
+
+# Changing values with incremental analysis on must give the values computed from scratch. With the pair
+# (0, 1) also worth 1 the glove game becomes the majority game of three
+# ./test_coalition.py --update "{(0,1):1}" --vals "{(0,2):1, (1,2):1}"
+
+# Several semivalues from one pass. beta (1, 1) is the shapley value and weighted banzhaf with 0.5 the banzhaf
+# value; beta (4, 1) weights small coalitions, and like banzhaf does not share out exactly the grand coalition value
+# ./test_coalition.py --semivalues "['shapley', 'banzhaf', ('beta', 1, 1), ('beta', 4, 1), ('weighted_banzhaf', 0.5)]" --vals "{(0,2):1, (1,2):1}"
+
+# In the glove game the two left gloves are interchangeable, giving two types
+# ./test_coalition.py --symmetry --vals "{(0,2):1, (1,2):1}"
+# ./test_coalition.py --symmetry --strengths "{0:1, 1:1, 2:2, 3:3, 4:1}" --crit 5
+
+# glove game dividends are 1 for each pair with the right glove and -1 for the grand coalition
+# ./test_coalition.py --dividends --vals "{(0,2):1, (1,2):1}"
+
+# glove game is superadditive but not convex
+# ./test_coalition.py --checks --vals "{(0,2):1, (1,2):1}"
+
+# The glove game core gives everything to the scarce player. The second imputation is blocked by {0, 2}.
+# ./test_coalition.py --core "[{0:0, 1:0, 2:1}, {0:0.25, 1:0.25, 2:0.5}]" --vals "{(0,2):1, (1,2):1}"
+
+# Bankruptcy game with estate 200 and claims 100, 200, 300: the nucleolus is the Talmud division 50, 75, 75
+# ./test_coalition.py --nucleolus --vals "{(0,):0, (1,):0, (2,):0, (0,1):0, (0,2):0, (1,2):100, (0,1,2):200}"
+
+# Majority game of three has an empty core, least core value 1/3 and nucleolus 1/3 each
+# ./test_coalition.py --nucleolus --strengths "{0:1, 1:1, 2:1}" --crit 1.5
+
+# Owen values of blocs. With every player in a union of their own they are the shapley values. The bloc of
+# players 2 and 3 has strength 5 and wins without the other bloc, so it takes all the power
+# ./test_coalition.py --unions "[[0], [1], [2], [3], [4]]" --strengths "{0:1, 1:1, 2:2, 3:3, 4:1}" --crit 5
+# ./test_coalition.py --unions "[[0, 1, 4], [2, 3]]" --estimate 20000 --seed 1 --strengths "{0:1, 1:1, 2:2, 3:3, 4:1}" --crit 5
+
+# Estimates should be within the confidence intervals of the exact values most of the time, and the same seed
+# must give the same estimate whatever the number of processes.
+# ./test_coalition.py --estimate 20000 --seed 1 --processes 4 --strengths "{0:1, 1:1, 2:2, 3:3, 4:1}" --crit 5
+
+# The variance reduced strategies should reach smaller standard errors for the same number of valuations.
+# ./test_coalition.py --estimate 500 --strategy stratified --strengths "{0:1, 1:1, 2:2, 3:3, 4:1}" --crit 5
+# ./test_coalition.py --estimate 500 --strategy owen --strengths "{0:1, 1:1, 2:2, 3:3, 4:1}" --crit 5
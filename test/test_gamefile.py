@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+import sys
+sys.path.append('../src')
+
+from game_theory_utils.coalitions.gamefile import *
+from game_theory_utils.coalitions.coalition import CoalitionalGame, create_voting_game
+from game_theory_utils.coalitions.typed_coalition import create_typed_voting_game, create_typed_game
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    from ast import literal_eval
+    import time
+    parser = ArgumentParser()
+    parser.add_argument('--verbose', action='store_true')
+    parser.add_argument('--path', default='/tmp/test_gamefile.tbl', help='game file')
+    parser.add_argument('--types', help='player types dictionary for a typed game')
+    parser.add_argument('--strengths', help='player strengths dictionary for a voting game')
+    parser.add_argument('--crit', type=float, help='critical value for a voting game')
+    parser.add_argument('--vals', help='coalition values dictionary')
+    parser.add_argument('--sparse', type=literal_eval, help='True or False to force the payload layout')
+    parser.add_argument('--set', help='(coalition, value) to set in the file through the game loaded for writing')
+    parser.add_argument('--load', action='store_true', help='only load the game saved at path')
+    args = parser.parse_args()
+
+    if not args.load:
+        if args.types and args.strengths:
+            game = create_typed_voting_game(literal_eval(args.types), literal_eval(args.strengths), args.crit)
+        elif args.types:
+            game = create_typed_game(literal_eval(args.types), literal_eval(args.vals))
+        elif args.strengths:
+            game = create_voting_game(literal_eval(args.strengths), args.crit)
+        else:
+            game = CoalitionalGame(literal_eval(args.vals))
+        shapley = game.get_shapley_values()
+        start = time.time()
+        header = save_game(game, args.path, sparse=args.sparse, results={'shapley_values': shapley})
+        print('saved', header['layout'], time.time() - start)
+
+    if args.set:
+        coalition, val = literal_eval(args.set)
+        writing = load_game(args.path, writable=True)
+        if hasattr(writing, 'player_types'):
+            valuation = writing.coalition_valuation
+            valuation.table[valuation.get_index(coalition)] = val
+        else:
+            writing.coalition_values[coalition] = val
+        writing.flush()
+        writing.close()
+
+    start = time.time()
+    loaded = load_game(args.path)
+    print('loaded', type(loaded).__name__, time.time() - start)
+    print('saved results', loaded.results)
+    print('shapley values', loaded.get_shapley_values())
+    if args.set:
+        # saved results are not updated by the change, but the values are
+        print('values', loaded.get_valuation() if hasattr(loaded, 'player_types') else dict(loaded.coalition_values))
+
+# the loaded game must give the same shapley values as were saved
+# ./test_gamefile.py --vals "{(0,2):1, (1,2):1}"
+# ./test_gamefile.py --sparse True --strengths "{0:1, 1:1, 2:2, 3:3, 4:1}" --crit 5
+# ./test_gamefile.py --types "{0:3, 1:2, 2:2}" --strengths "{0:1, 1:1, 2:2}" --crit 5
+
+# a value set through a game loaded for writing is in the file when it is loaded again
+# ./test_gamefile.py --set "(((0,1), (1,0)), 2)" --types "{0:2, 1:1}" --vals "{((0,1), (1,1)):1, ((0,2), (1,0)):3}"
+# ./test_gamefile.py --set "((0,), 1)" --vals "{(0,2):1, (1,2):1}"
+
+# a 20 player game opens in about a millisecond
+# ./test_gamefile.py --sparse False --strengths "{0:1, 1:1, 2:2, 3:3, 4:1, 5:2, 6:1, 7:1, 8:4, 9:2, 10:1, 11:3, 12:1, 13:1, 14:2, 15:1, 16:1, 17:2, 18:3, 19:1}" --crit 19
+# ./test_gamefile.py --load
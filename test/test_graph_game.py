@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+import sys
+sys.path.append('../src')
+
+from game_theory_utils.coalitions.graph_game import *
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    from ast import literal_eval
+    parser = ArgumentParser()
+    parser.add_argument('--verbose', action='store_true')
+    parser.add_argument('--edges', help='dict of (node, node):weight')
+    parser.add_argument('--cost', action='store_true', help="edge weights are costs")
+    parser.add_argument('--core', help='imputation dict to test for core membership')
+    parser.add_argument('--compare', action='store_true', help="compare with the expanded coalitional game")
+    args = parser.parse_args()
+
+    game = GraphGame(literal_eval(args.edges), isCost=args.cost)
+    print('shapley values', game.get_shapley_values())
+    print('normalized banzhaf values', game.get_normalized_banzhaf_values())
+    print('convex', game.get_is_convex(), 'superadditive', game.get_is_superadditive(),
+          'monotonic', game.get_is_monotonic())
+
+    if args.core:
+        print('core violation', game.find_core_violation(literal_eval(args.core)))
+
+    if args.compare:
+        cg = game.get_coalitional_game()
+        print('expanded shapley values', cg.get_shapley_values())
+        print('expanded banzhaf values', cg.get_banzhaf_values())
+        print('expanded convex', cg.get_is_convex(), 'superadditive', cg.get_is_superadditive(),
+              'monotonic', cg.get_is_monotonic())
+
+# a triangle with a loop; the shapley value is in the core of a convex game
+# ./test_graph_game.py --compare --edges "{(0,1):2, (1,2):4, (0,2):1, (2,2):3}" --core "{0:1.5, 1:3, 2:5.5}"
+
+# giving player 0 everything leaves the coalition {1, 2} short by 7
+# ./test_graph_game.py --edges "{(0,1):2, (1,2):4, (0,2):1, (2,2):3}" --core "{0:10, 1:0, 2:0}"
+
+# a negative edge makes the game neither convex nor superadditive
+# ./test_graph_game.py --compare --edges "{(0,1):2, (1,2):-1, (0,0):1}"
+
+# the negative edge cancels the positive one in the sum of the raw values, so the shares are divided by the
+# sum of their absolute values: 0.5, 0 and -0.5. The expanded game counts swings instead: 0.25, 0.5, 0.25
+# ./test_graph_game.py --compare --edges "{(0,1):1, (1,2):-1}"
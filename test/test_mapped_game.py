@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+import sys
+sys.path.append('../src')
+
+from game_theory_utils.coalitions.mapped_game import *
+from game_theory_utils.coalitions.coalition import CoalitionalGame, create_voting_game
+from game_theory_utils.coalitions.weighted_voting import VotingValuation
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    from ast import literal_eval
+    import time
+    parser = ArgumentParser()
+    parser.add_argument('--verbose', action='store_true')
+    parser.add_argument('--path', default='/tmp/test_mapped_game.tbl', help='table file')
+    parser.add_argument('--strengths', help='player strengths dictionary for a voting game')
+    parser.add_argument('--crit', type=float, help='critical value for a voting game')
+    parser.add_argument('--vals', help='coalition values dictionary')
+    parser.add_argument('--chunk', type=int, default=1 << 20, help='masks per chunk')
+    parser.add_argument('--open', action='store_true', help='open an existing table file instead of creating one')
+    parser.add_argument('--dividends', action='store_true', help="harsanyi dividends and the dividend shapley values")
+    parser.add_argument('--compare', action='store_true', help="compare with the in memory game")
+    args = parser.parse_args()
+
+    start = time.time()
+    if args.open:
+        game = open_mapped_game(args.path)
+        game.chunk_size = args.chunk
+    elif args.strengths:
+        strengths = literal_eval(args.strengths)
+        game = create_mapped_game(args.path, list(strengths), VotingValuation(strengths, args.crit), typecode='q',
+                                  chunk_size=args.chunk)
+    else:
+        vals = literal_eval(args.vals)
+        game = create_mapped_game_from_values(args.path, vals, chunk_size=args.chunk)
+    print('table ready', time.time() - start)
+    if args.verbose:
+        print(list(game.table))
+    print('monotonic', game.get_is_monotonic())
+    print('shapley values', game.get_shapley_values(method='subset'))
+    if game.get_is_simple():
+        print('banzhaf values', game.get_banzhaf_values())
+    if args.dividends:
+        print('dividends', game.get_harsanyi_dividends())
+        print('dividend shapley values', game.get_shapley_values(method='dividend'))
+    print('elapsed', time.time() - start)
+
+    if args.compare:
+        if args.strengths:
+            cg = create_voting_game(strengths, args.crit)
+            print('in memory banzhaf values', cg.get_banzhaf_values())
+        else:
+            cg = CoalitionalGame(vals)
+        print('in memory shapley values', cg.get_shapley_values(method='subset'))
+        if args.dividends:
+            print('in memory dividends', cg.get_harsanyi_dividends())
+    game.close()
+
+# small chunks must give the same values as the in memory game
+# ./test_mapped_game.py --compare --chunk 4 --strengths "{0:1, 1:1, 2:2, 3:3, 4:1}" --crit 5
+# ./test_mapped_game.py --compare --chunk 2 --verbose --vals "{(0,2):1, (1,2):1}"
+
+# the analyses that index the table, like the dividends, work on the mapped table too
+# ./test_mapped_game.py --compare --dividends --vals "{(0,2):1, (1,2):1}"
+# ./test_mapped_game.py --compare --dividends --strengths "{0:1, 1:1, 2:2, 3:3}" --crit 4
+
+# stopping this part way (ctrl-c) and running it again carries on from the last chunk
+# ./test_mapped_game.py --chunk 65536 --strengths "{0:1, 1:1, 2:2, 3:3, 4:1, 5:2, 6:1, 7:1, 8:4, 9:2, 10:1, 11:3, 12:1, 13:1, 14:2, 15:1, 16:1, 17:2, 18:3, 19:1}" --crit 19
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+import sys
+sys.path.append('../src')
+
+from game_theory_utils.coalitions.mcnet import *
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    from ast import literal_eval
+    parser = ArgumentParser()
+    parser.add_argument('--verbose', action='store_true')
+    parser.add_argument('--rules', help='list of (positive players, negative players, value) rules')
+    parser.add_argument('--players', help='list of every player, including any not in a rule')
+    parser.add_argument('--compare', action='store_true', help="compare with the expanded coalitional game")
+    args = parser.parse_args()
+
+    game = MCNetGame(literal_eval(args.rules), players=args.players and literal_eval(args.players))
+    print('shapley values', game.get_shapley_values())
+    print('raw banzhaf values', game.get_raw_banzhaf_values())
+    print('normalized banzhaf values', game.get_normalized_banzhaf_values())
+
+    if args.compare:
+        cg = game.get_coalitional_game()
+        if args.verbose:
+            print('coalition values', dict(cg.coalition_values))
+        print('expanded shapley values', cg.get_shapley_values())
+        print('expanded banzhaf values', cg.get_banzhaf_values())
+
+# glove game as rules: a pair of gloves is worth 1, but only one pair can be made
+# shapley values are 1/6, 1/6, 2/3
+# ./test_mcnet.py --compare --rules "[((0, 2), (1,), 1), ((1, 2), (0,), 1), ((0, 1, 2), (), 1)]"
+
+# a rule that pays when player 1 stays out takes value from player 1
+# ./test_mcnet.py --compare --rules "[((0,), (1,), 4), ((1, 2), (), 2)]"
+
+# player c only ever lowers the value, so its normalized share is negative: a gets 0.5, b 0 and c -0.5,
+# while the expanded game counts the swings of a alone and gives a 1
+# ./test_mcnet.py --compare --rules "[(('a',), ('c',), 1)]" --players "['a', 'b', 'c']"
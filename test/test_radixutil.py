@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+
+"""Test the functions in radixutil"""
+import sys
+sys.path.append('../src')
+
+from game_theory_utils.util.radixutil import *
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    from ast import literal_eval
+    parser = ArgumentParser()
+    parser.add_argument('--verbose', action='store_true')
+    parser.add_argument('--counts', help='maximum count of each type')
+    parser.add_argument('--strides', action='store_true', help="show the strides for counts")
+    parser.add_argument('--lattice', action='store_true', help="show index, counts, and decoded/encoded values")
+    parser.add_argument('--fill', help="fill a table from a dict of index:value")
+    args = parser.parse_args()
+
+    counts = literal_eval(args.counts)
+
+    if args.strides:
+        print(radix_strides(counts))
+
+    if args.lattice:
+        strides = radix_strides(counts)
+        for index, digits in enumerate(lattice_digits(counts)):
+            print(index, digits, encode_counts(digits, strides), decode_index(index, counts))
+
+    if args.fill:
+        given = literal_eval(args.fill)
+        table = [0] * table_size(counts)
+        known = bytearray(len(table))
+        for index in given:
+            table[index] = given[index]
+            known[index] = 1
+        fill_max_table(table, known, counts)
+        print(table)
+
+# encoded and decoded values must match the index
+# ./test_radixutil.py --lattice --counts "(2, 1, 3)"
+
+# ./test_radixutil.py --strides --counts "(2, 1, 3)"
+
+# values propagate up to supersets unless a superset has a value of its own
+# ./test_radixutil.py --fill "{1:1, 3:2, 4:5}" --counts "(1, 2)"
@@ -14,6 +14,8 @@ if __name__ == '__main__':
     parser.add_argument('--voting', action='store_true', help="test voting")
     parser.add_argument('--ungrouped', action='store_true', help="test set_ungrouped_coalition_values")
     parser.add_argument('--grouped', action='store_true', help="test set_grouped_coalition_values")
+    parser.add_argument('--cache', action='store_true', help="cache valuations and show the cache stats")
+    parser.add_argument('--set', help="(counts, value) to set after enabling the cache")
     parser.add_argument('--types', help='player types dictionary')
     parser.add_argument('--strengths', help='player strengths dictionary')
     parser.add_argument('--vals', help='valuations_dict')
@@ -56,7 +58,18 @@ if __name__ == '__main__':
         shapley.compute_shapley_values()
         print('computed values',  shapley.get_shapley_values())
         cg = create_typed_game(coalition_values=vals, player_types=player_types)
+        if args.cache:
+            # value through a plain function, as for a simulation model, since a value table is not cached
+            table = cg.coalition_valuation
+            cg = TypedCoalitionalGame(player_types=player_types, coalition_valuation=lambda key: table(key))
+            cache = cg.enable_cache()
+        if args.set:
+            print('cache', cg.enable_cache())
+            cg.set_coalition_value(*literal_eval(args.set))
         print('cg computed values',  cg.get_shapley_values())
+        if args.cache:
+            print('cg monotonic', cg.get_is_monotonic(), 'superadditive', cg.get_is_superadditive())
+            print('cache stats', cache.get_stats())
 
 # Simulated vals should be almost the same as computed vals as long as number of iterations is large.
 # Computed vals computed different ways must give the same answer
@@ -83,3 +96,10 @@ if __name__ == '__main__':
 # Un security new
 # ./test_shapley.py --grouped --types "{'P':5, 'T':10}" --vals "{(('P',5),('T',4)):1}"
 
+# With the cache each coalition is valued once (misses = number of coalitions) however many analyses run
+# ./test_shapley.py --grouped --cache --types "{0:3, 1:2}" --vals "{((0,3),):1, ((0,2),(1,1)):1, ((0,1),(1,2)):1}"
+
+
+# A game with a value table is not cached, so its values can still be set: the glove game with both left
+# gloves and the right one worth 2 gives 1/2 to each left glove and 1 to the right
+# ./test_shapley.py --grouped --set "(((0,2),(1,1)), 2)" --types "{0:2, 1:1}" --vals "{((0,1),(1,1)):1}"
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+import sys
+sys.path.append('../src')
+
+from game_theory_utils.coalitions.weighted_voting import *
+from game_theory_utils.coalitions.typed_coalition import *
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    from ast import literal_eval
+    parser = ArgumentParser()
+    parser.add_argument('--verbose', action='store_true')
+    parser.add_argument('--types', help='player types dictionary')
+    parser.add_argument('--strengths', help='player strengths dictionary')
+    parser.add_argument('--crit', type=float, help='critical value')
+    parser.add_argument('--quotas', action='store_true', help="values for every quota, checked against one game per quota")
+    parser.add_argument('--indices', action='store_true', help="other power indices, checked against the tabled typed game")
+    parser.add_argument('--compare', action='store_true', help="compare with the enumerating typed game")
+    args = parser.parse_args()
+
+    strengths = literal_eval(args.strengths)
+    if args.types:
+        player_types = literal_eval(args.types)
+    else:
+        player_types = {player:1 for player in strengths}
+
+    if args.quotas:
+        for quota, (shapley, banzhaf) in quota_power_indices(player_types, strengths).items():
+            wv = WeightedVotingGame(player_types=player_types, type_strengths=strengths, crit=quota)
+            same = wv.get_shapley_values() == shapley and wv.get_banzhaf_values() == banzhaf
+            print(quota, 'shapley', shapley, 'banzhaf', banzhaf, '' if same else 'MISMATCH')
+        sys.exit()
+
+    if args.types:
+        wv = WeightedVotingGame(player_types=player_types, type_strengths=strengths, crit=args.crit)
+    else:
+        wv = create_weighted_voting_game(player_strengths=strengths, crit=args.crit)
+
+    if args.indices:
+        indices = wv.get_power_indices()
+        table = typed_value_table(player_types, lambda counts: int(sum([strengths[type_] * count
+                                                                         for type_, count in counts]) >= args.crit))
+        tabled = TypedCoalitionalGame(player_types, TypedValueTable(player_types, table)).get_power_indices()
+        for name in indices:
+            same = all([abs(indices[name][type_] - tabled[name][type_]) < 1e-12 for type_ in player_types])
+            print(name, indices[name], '' if same else 'MISMATCH')
+        print('minimal winning coalitions', wv.find_minimal_winning_coalitions())
+        sys.exit()
+
+    print('shapley values', wv.get_shapley_values())
+    print('banzhaf values', wv.get_banzhaf_values())
+    print('pivot counts', wv.get_pivot_counts())
+    print('swing counts', wv.get_swing_counts())
+
+    if args.compare:
+        cg = create_typed_voting_game(player_types=player_types, type_strengths=strengths, crit=args.crit)
+        print('cg shapley values', cg.get_shapley_values())
+        print('cg banzhaf values', cg.get_banzhaf_values())
+
+# Values from the counting engine must match the enumerated typed game.
+
+# ./test_weighted_voting.py --types "{0:3, 1:2, 2:2}" --strengths "{0:1, 1:1, 2:2}" --crit 5 --compare
+
+# Un security council old, permanent members have a veto, Maschler 813
+# ./test_weighted_voting.py --types "{'P':5, 'T':6}" --strengths "{'P':5, 'T':1}" --crit 27 --compare
+
+# Power for every quota from one sweep. At quota 1 any player wins alone, at quota 3 the player of
+# strength 3 is a dictator, and at quota 5 all three are needed
+# ./test_weighted_voting.py --quotas --strengths "{'a':1, 'b':1, 'c':3}"
+
+# Other power indices from the pruned search. Only {a, b, c} and {a, b, d} are minimal winning, so c and d,
+# each in one of them, get half the deegan-packel and holler-packel power of a and b
+# ./test_weighted_voting.py --indices --strengths "{'a':4, 'b':3, 'c':2, 'd':2}" --crit 9
+
+# ./test_weighted_voting.py --indices --types "{'P':5, 'T':6}" --strengths "{'P':5, 'T':1}" --crit 27
+
+# a parliament with a few large parties
+# ./test_weighted_voting.py --strengths "{'a':153, 'b':118, 'c':64, 'd':52, 'e':39, 'f':22}" --crit 225